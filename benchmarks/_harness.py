@@ -0,0 +1,155 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Run a benchmark from the project root, e.g.:
+
+    python -m benchmarks.bench_search --notes 500000
+
+Benchmarks run against DATABASE_URL (Postgres in a real deployment) but on a
+throwaway test database, never the live one. Without DATABASE_URL they fall
+back to an in-memory SQLite database.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORDS = (
+    "patient tolerated infusion well vitals stable blood pressure heart rate "
+    "creatinine renal function hydration premedication acetaminophen diphenhydramine "
+    "headache nausea fatigue weakness ptosis diplopia dyspnea rash fever labs "
+    "hemoglobin platelets sodium potassium titration dose mg kg weekly monthly "
+    "follow up monitoring baseline history allergies none known reports denies "
+    "improvement worsening stable neuromuscular assessment education counseling "
+    "before after ivig"
+).split()
+
+MEDICATIONS = ["IVIG", "Humira", "Ocrevus", "Entyvio", "Soliris", "Vyvgart", "Remicade"]
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT))
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv(ROOT / ".env")
+    except ImportError:
+        pass
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lamar_project.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark-only")
+    os.environ.setdefault("DATABASE_URL", "sqlite://:memory:")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def scratch_database():
+    """Create (and afterwards destroy) a migrated test database for the run."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+# Filler vocabulary so clinical terms are as selective as in real charts
+FILLER = [f"w{n:04d}" for n in range(5000)]
+
+
+def synthetic_note(rng, words=120, clinical_rate=0.03):
+    return " ".join(
+        rng.choice(WORDS) if rng.random() < clinical_rate else rng.choice(FILLER)
+        for _ in range(words)
+    ) + "."
+
+
+def create_orders(count, note=synthetic_note, batch_size=5000, seed=1234, care_plans=False, spread_dates=False):
+    """
+    Bulk-create `count` orders spread over distinct patients/dates so the
+    hard-duplicate constraint never fires. Returns the order ids.
+    `spread_dates` cycles order dates through the last ten years instead of
+    filling them one day at a time.
+    """
+    from careplans.models import CarePlan, Order, Patient, Provider
+
+    rng = random.Random(seed)
+    provider, _ = Provider.objects.get_or_create(npi="1000000000", defaults={"name": "Dr Bench"})
+    patient_count = min(count, 999_999)
+    start = date.today() - timedelta(days=3650)
+
+    existing = Patient.objects.count()
+    for lo in range(existing, patient_count, batch_size):
+        Patient.objects.bulk_create(
+            Patient(mrn=f"{i + 1:06d}", first_name="Bench", last_name=f"P{i}")
+            for i in range(lo, min(lo + batch_size, patient_count))
+        )
+    patient_ids = list(Patient.objects.order_by("id").values_list("id", flat=True)[:patient_count])
+
+    ids = []
+    for lo in range(0, count, batch_size):
+        batch = [
+            Order(
+                patient_id=patient_ids[i % patient_count],
+                provider=provider,
+                medication_name=MEDICATIONS[(i // patient_count) % len(MEDICATIONS)],
+                order_date=start + timedelta(
+                    days=(i if spread_dates else i // (patient_count * len(MEDICATIONS))) % 3650
+                ),
+                primary_diagnosis_icd10="G70.0",
+                patient_records_text=note(rng),
+            )
+            for i in range(lo, min(lo + batch_size, count))
+        ]
+        created = Order.objects.bulk_create(batch)
+        batch_ids = [o.pk for o in created]
+        if None in batch_ids:  # backends without RETURNING
+            batch_ids = list(Order.objects.order_by("-id").values_list("id", flat=True)[: len(batch)])
+        ids.extend(batch_ids)
+        if care_plans:
+            CarePlan.objects.bulk_create(
+                CarePlan(order_id=pk, generated_text=note(rng)) for pk in batch_ids
+            )
+        progress(f"created {min(lo + batch_size, count):,}/{count:,} orders")
+    progress("", end="\n")
+    return ids
+
+
+def progress(message, end="\r"):
+    sys.stderr.write(f"\033[K{message}{end}")
+    sys.stderr.flush()
+
+
+def measure(fn, repeat=50, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<40} n={len(samples):<5} "
+        f"p50={statistics.median(ordered) * 1000:8.2f} ms  "
+        f"p95={p95 * 1000:8.2f} ms  "
+        f"mean={statistics.fmean(ordered) * 1000:8.2f} ms"
+    )
@@ -0,0 +1,96 @@
+"""
+Intake validation latency (OrderIntakeForm.is_valid: hard + soft duplicate
+and provider checks) with every order in the live table, then again after
+`archive_orders` has moved everything past the retention window out.
+
+    python -m benchmarks.bench_archive --orders 10000000
+
+Orders are spread evenly over ten years, so with the default three-year
+retention about 70% of them end up in the archive.
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks._harness import MEDICATIONS, create_orders, measure, progress, report, scratch_database, setup_django
+
+
+def short_note(rng):
+    # Notes don't affect validation; keep the 10M-row setup fast
+    return f"Clinical notes {rng.random():.6f}."
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.utils import timezone
+
+    from careplans import archive
+    from careplans.forms import OrderIntakeForm
+    from careplans.models import Order, OrderArchive, Patient
+
+    def validate(order_date, medication):
+        mrns = list(Patient.objects.order_by("?").values_list("mrn", flat=True)[:args.repeat])
+        it = iter(mrns * 2)
+
+        def run():
+            form = OrderIntakeForm(data={
+                "provider_name": "Dr Bench",
+                "provider_npi": "1000000000",
+                "patient_first_name": "Bench",
+                "patient_last_name": "P",
+                "patient_mrn": next(it),
+                "medication_name": medication,
+                "order_date": order_date,
+                "primary_diagnosis_icd10": "G70.0",
+                "additional_diagnoses": "",
+                "medication_history": "",
+                "patient_records_text": "Clinical notes.",
+            })
+            form.is_valid()
+
+        return run
+
+    today = timezone.localdate()
+    cases = [
+        ("recent date", today - timedelta(days=1)),
+        ("archived date", today - timedelta(days=settings.ORDER_RETENTION_DAYS + 200)),
+    ]
+
+    def run_cases(label):
+        for name, order_date in cases:
+            for medication in (MEDICATIONS[0], "Kesimpta"):  # existing / new medication
+                samples = measure(validate(order_date, medication), repeat=args.repeat, warmup=0)
+                report(f"{label:<7} {name} {medication}", samples)
+
+    with scratch_database() as connection:
+        print(f"backend={connection.vendor} orders={args.orders:,} retention={settings.ORDER_RETENTION_DAYS}d")
+        create_orders(args.orders, note=short_note, batch_size=args.batch_size, spread_dates=True)
+
+        run_cases("before")
+
+        started = time.perf_counter()
+        moved = 0
+        while True:
+            step = archive.archive_orders(batch_size=args.batch_size, limit=args.batch_size * 20)
+            if not step:
+                break
+            moved += step
+            progress(f"archived {moved:,} orders")
+        progress("", end="\n")
+        print(
+            f"archived {OrderArchive.objects.count():,} orders in {time.perf_counter() - started:.1f}s, "
+            f"{Order.objects.count():,} left live"
+        )
+
+        run_cases("after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-intake cost of connection setup with and without connection reuse.
+
+Each simulated intake runs inside Django's request_started/request_finished
+signals (which is where CONN_MAX_AGE is enforced), then validates and saves
+an OrderIntakeForm. Modes:
+
+  fresh       CONN_MAX_AGE=0: new connection every request (the old default)
+  persistent  CONN_MAX_AGE=60 + CONN_HEALTH_CHECKS
+  pool        psycopg 3 native pool (Postgres + psycopg>=3 only)
+
+    DATABASE_URL=postgres://... python -m benchmarks.bench_connection_pool --intakes 500
+
+Only meaningful against a server database; in-memory SQLite never reconnects.
+"""
+import argparse
+import time
+
+from benchmarks._harness import report, scratch_database, setup_django
+
+
+def _payload(i):
+    return {
+        "provider_name": "Dr Bench",
+        "provider_npi": "1000000000",
+        "patient_first_name": "Bench",
+        "patient_last_name": f"P{i}",
+        "patient_mrn": f"{i + 1:06d}",
+        "medication_name": "IVIG",
+        "order_date": "2025-01-01",
+        "primary_diagnosis_icd10": "G70.0",
+        "additional_diagnoses": "",
+        "medication_history": "",
+        "patient_records_text": "Clinical notes...",
+    }
+
+
+def _configure(connection, mode):
+    connection.close()
+    settings_dict = connection.settings_dict
+    settings_dict.setdefault("OPTIONS", {}).pop("pool", None)
+    if mode == "fresh":
+        settings_dict.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    elif mode == "persistent":
+        settings_dict.update(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+    elif mode == "pool":
+        settings_dict.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+        settings_dict["OPTIONS"]["pool"] = {"min_size": 2, "max_size": 4}
+
+
+def _pool_supported(connection):
+    if connection.vendor != "postgresql":
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--intakes", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core import signals
+    from careplans.forms import OrderIntakeForm
+
+    with scratch_database() as connection:
+        modes = ["fresh", "persistent"] + (["pool"] if _pool_supported(connection) else [])
+        print(f"backend={connection.vendor} intakes/mode={args.intakes}")
+
+        offset = 0
+        for mode in modes:
+            _configure(connection, mode)
+            connect, total = [], []
+            for i in range(offset, offset + args.intakes):
+                signals.request_started.send(sender=None)
+                t0 = time.perf_counter()
+                connection.ensure_connection()
+                t1 = time.perf_counter()
+                form = OrderIntakeForm(data=_payload(i))
+                form.is_valid()
+                form.save()
+                t2 = time.perf_counter()
+                signals.request_finished.send(sender=None)
+                connect.append(t1 - t0)
+                total.append(t2 - t0)
+            offset += args.intakes
+
+            report(f"{mode:<10} connection setup", connect)
+            report(f"{mode:<10} whole intake", total)
+        _configure(connection, "fresh")
+
+
+if __name__ == "__main__":
+    main()
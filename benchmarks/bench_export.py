@@ -0,0 +1,55 @@
+"""
+Peak memory while streaming an export of N orders (default 1M) through
+QuerySet.iterator + the CSV/gzip encoders, compared with materialising the
+queryset first (what a naive list(Order.objects.all()) export does).
+
+    python -m benchmarks.bench_export --rows 1000000
+
+Peak RSS is a process-wide high-water mark, so the streamed runs go first;
+the materialised run goes last and shows the jump.
+"""
+import argparse
+import resource
+import time
+
+from benchmarks._harness import create_orders, scratch_database, setup_django
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-materialised", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from careplans import exports
+
+    with scratch_database() as connection:
+        create_orders(args.rows, care_plans=True)
+        print(f"backend={connection.vendor} rows={args.rows:,}")
+
+        runs = [("streamed", "csv", False), ("streamed", "csv", True), ("streamed", "ndjson", True)]
+        if not args.skip_materialised:
+            runs.append(("materialised", "csv", False))
+
+        baseline = _peak_rss_mb()
+        print(f"peak RSS after seeding: {baseline:.1f} MB")
+        for mode, fmt, compress in runs:
+            qs = exports.export_queryset()
+            t0 = time.perf_counter()
+            rows = list(qs) if mode == "materialised" else exports.iter_rows(qs)
+            written = sum(len(chunk) for chunk in exports.export_stream(rows, fmt, compress))
+            del rows
+            peak = _peak_rss_mb()
+            print(
+                f"{mode:<13} {fmt:<7} gzip={str(compress):<5} {time.perf_counter() - t0:7.1f} s  "
+                f"{written / 1e6:9.1f} MB out  peak RSS {peak:7.1f} MB (+{peak - baseline:.1f} MB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
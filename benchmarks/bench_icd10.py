@@ -0,0 +1,122 @@
+"""
+Per-worker memory and lookup latency of the ICD-10-CM code index.
+
+Forks N workers (like gunicorn without --preload). Each loads the code set
+after the fork, touches it with random lookups, then reports from
+/proc/self/smaps_rollup while all workers are still alive, so shared pages
+are split between them in Pss. Modes:
+
+  mmap   careplans.icd10.Icd10Index (what the app uses)
+  dict   the same table parsed into a per-process {code: (description, billable)}
+
+    python -m benchmarks.bench_icd10 --workers 4 --lookups 200000
+
+Linux only (smaps_rollup).
+"""
+import argparse
+import gzip
+import multiprocessing
+import random
+import time
+
+from benchmarks._harness import setup_django
+
+
+def _smaps():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), private
+
+
+def _load_dict():
+    from careplans import icd10
+
+    table = {}
+    with gzip.open(icd10.SOURCE_PATH, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            code, billable, description = line.rstrip("\n").split("\t", 2)
+            table[icd10.normalize(code)] = (description, billable == "1")
+    return table
+
+
+def _worker(mode, probes, barrier, results):
+    from careplans import icd10
+
+    # Touch the inherited probe list first: refcount updates copy its pages,
+    # which would otherwise be charged to the index
+    for code in probes:
+        pass
+    before = _smaps()
+    if mode == "mmap":
+        index = icd10.get_index()
+        lookup = index.get
+    else:
+        table = _load_dict()
+
+        def lookup(code):
+            return table.get(icd10.normalize(code))
+
+    t0 = time.perf_counter()
+    hits = sum(lookup(code) is not None for code in probes)
+    elapsed = time.perf_counter() - t0
+
+    barrier.wait()  # every worker loaded: Pss now reflects sharing
+    after = _smaps()
+    results.put((
+        (after[0] - before[0]) / 1024,
+        (after[1] - before[1]) / 1024,
+        (after[2] - before[2]) / 1024,
+        elapsed / len(probes) * 1e6,
+        hits,
+    ))
+    barrier.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from careplans import icd10
+
+    if icd10.index_problem(settings.ICD10_INDEX_PATH):
+        icd10.build_index(settings.ICD10_INDEX_PATH)  # as `manage.py build_icd10_index` would
+
+    codes = [code for code in _load_dict()]
+    rng = random.Random(0)
+    probes = [rng.choice(codes) for _ in range(args.lookups)]
+    probes[::10] = ["Q99.99"] * len(probes[::10])  # some misses
+
+    ctx = multiprocessing.get_context("fork")
+    print(f"codes={len(codes)} workers={args.workers} lookups/worker={args.lookups}")
+    for mode in ("mmap", "dict"):
+        barrier, results = ctx.Barrier(args.workers), ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(mode, probes, barrier, results)) for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        rows = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        def avg(i):
+            return sum(r[i] for r in rows) / len(rows)
+
+        print(
+            f"{mode:<5} per worker: rss +{avg(0):6.1f}MB  pss +{avg(1):6.1f}MB  "
+            f"private +{avg(2):6.1f}MB  lookup {avg(3):5.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start import cost of the app, with and without the OpenAI SDK.
+
+Each run is a fresh interpreter under `python -X importtime` that sets up
+Django and imports the URLconf (everything a manage.py command or worker
+boot loads). Modes:
+
+  lazy   the app as shipped: the SDK is imported on the first LLM call
+  eager  the same, plus `import openai` (what every boot paid before the
+         backends were made lazy)
+
+    python -m benchmarks.bench_importtime --runs 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from benchmarks._harness import ROOT
+
+STARTUP = "import django; django.setup(); import careplans.urls"
+MODES = {
+    "lazy": STARTUP,
+    "eager": STARTUP + "; import openai",
+}
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _run(code):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "lamar_project.settings",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-only"),
+        "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite://:memory:"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us, modules, openai_us = 0, 0, 0
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        modules += 1
+        cumulative, depth, name = int(match[2]), len(match[3]), match[4]
+        if depth == 1:  # top-level imports; their cumulative covers the rest
+            total_us += cumulative
+            if name == "openai":
+                openai_us = cumulative
+    return total_us / 1e6, modules, openai_us / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, code in MODES.items():
+        _run(code)  # warm the filesystem / .pyc cache
+        samples = [_run(code) for _ in range(args.runs)]
+        totals = [s[0] for s in samples]
+        results[mode] = statistics.median(totals)
+        print(
+            f"{mode:<6} import time p50={results[mode] * 1000:8.1f}ms "
+            f"min={min(totals) * 1000:8.1f}ms modules={samples[0][1]:5d} "
+            f"openai={statistics.median(s[2] for s in samples) * 1000:6.1f}ms"
+        )
+
+    saved = results["eager"] - results["lazy"]
+    print(f"saved per cold start: {saved * 1000:.1f}ms ({saved / results['eager']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Intake page load against a local server: the HTML plus every static file
+it references, as a browser would fetch them.
+
+  cold     empty browser cache: HTML + every asset
+  repeat   warm cache: HTML, plus a revalidation for any asset that isn't
+           served as immutable (hashed files are skipped entirely)
+
+each with `Accept-Encoding: br, gzip` and with `identity` (no compression).
+The server is `runserver --nostatic` with DEBUG off, so WhiteNoise serves
+the collectstatic output (hashed, precompressed) from a scratch STATIC_ROOT.
+
+    python -m benchmarks.bench_page_load --loads 50
+
+The old CDN-hosted page can't be compared offline, and its third-party
+DNS/TLS cost depends on the network anyway.
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks._harness import ROOT, report
+
+_ASSET = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _manage(env, *args, **kwargs):
+    return subprocess.run([sys.executable, "manage.py", *args], cwd=ROOT, env=env, check=True, **kwargs)
+
+
+def _get(url, headers):
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as exc:  # 304 / 404
+        return exc.code, exc.headers, exc.read()
+
+
+def _wait(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return
+        except urllib.error.HTTPError:
+            return  # up, but erroring: reported with the statuses
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} didn't start")
+
+
+def load_page(base, encoding, cache=None):
+    """
+    Fetch the page and its assets. `cache` maps asset path -> response
+    headers from an earlier load (a warm browser cache). Returns
+    (bytes transferred, requests made, {path: status}).
+    """
+    headers = {"Accept-Encoding": encoding}
+    status, _, html = _get(f"{base}/intake/", headers)
+    transferred, requests, statuses = len(html), 1, {"/intake/": status}
+    for path in _ASSET.findall(html.decode()):
+        cached = (cache or {}).get(path)
+        if cached is not None and "immutable" in cached.get("Cache-Control", ""):
+            continue
+        conditional = dict(headers)
+        if cached is not None:
+            if cached.get("ETag"):
+                conditional["If-None-Match"] = cached["ETag"]
+            if cached.get("Last-Modified"):
+                conditional["If-Modified-Since"] = cached["Last-Modified"]
+        status, response_headers, body = _get(f"{base}{path}", conditional)
+        transferred += len(body)
+        requests += 1
+        statuses[path] = status
+        if cache is not None and status == 200:
+            cache[path] = response_headers
+    return transferred, requests, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loads", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        port = _free_port()
+        env = {
+            **os.environ,
+            "DEBUG": "false",
+            "ALLOWED_HOSTS": "127.0.0.1",
+            "SECRET_KEY": "benchmark-only",
+            "DATABASE_URL": f"sqlite:///{scratch}/db.sqlite3",
+            "STATIC_ROOT": f"{scratch}/static",
+        }
+        _manage(env, "build_icd10_index", stdout=subprocess.DEVNULL)
+        _manage(env, "migrate", "--noinput", stdout=subprocess.DEVNULL)
+        _manage(env, "collectstatic", "--noinput", stdout=subprocess.DEVNULL)
+        server = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload", "--nostatic"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            _wait(f"{base}/intake/")
+            _, _, statuses = load_page(base, "br, gzip")
+            for path, status in statuses.items():
+                print(f"{status}  {path}")
+            for encoding in ("br, gzip", "identity"):
+                for mode in ("cold", "repeat"):
+                    cache = {}
+                    if mode == "repeat":
+                        load_page(base, encoding, cache)
+                    samples = []
+                    for _ in range(args.loads):
+                        t0 = time.perf_counter()
+                        transferred, requests, _ = load_page(base, encoding, dict(cache) if mode == "repeat" else None)
+                        samples.append(time.perf_counter() - t0)
+                    report(f"{mode} {encoding} ({requests} req, {transferred / 1024:.1f} KiB)", samples)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+PDF clinical-note extraction: wall time and peak memory by page count and
+pool size, cold and with the per-page cache warm. Times include starting
+the pool, since each extraction gets its own.
+
+    python -m benchmarks.bench_pdf --pages 100 1000 5000 --workers 0 2 4
+
+Peak memory is the high-water RSS of this process and of the largest pool
+worker (ru_maxrss); both should stay flat as the page count grows. Each
+configuration runs in a fresh interpreter so the high-water marks don't
+carry over.
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._harness import ROOT, WORDS, setup_django
+
+
+def write_pdf(path, pages, seed=1234):
+    """Write a `pages`-page text PDF to `path` without holding it in memory."""
+    rng = random.Random(seed)
+    offsets = []
+    with open(path, "wb") as f:
+        def obj(body):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (len(offsets), body))
+
+        f.write(b"%PDF-1.4\n")
+        obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = b" ".join(b"%d 0 R" % (4 + 2 * i + 1) for i in range(pages))
+        obj(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages))
+        obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for _ in range(pages):
+            lines = [
+                b"(%s) Tj T*" % " ".join(rng.choice(WORDS) for _ in range(12)).encode()
+                for _ in range(45)
+            ]
+            stream = b"BT /F1 10 Tf 12 TL 40 760 Td " + b" ".join(lines) + b" ET"
+            obj(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+            obj(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(offsets))
+            )
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        f.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+def run_one(path, workers):
+    """Child mode: extract `path` twice (cold, warm) and print one result line."""
+    os.environ["PDF_WORKERS"] = str(workers)
+    setup_django()
+    from careplans import pdfs
+
+    timings = []
+    for _ in range(2):
+        t0 = time.perf_counter()
+        extracted = pdfs.extract_path(path)
+        timings.append(time.perf_counter() - t0)
+    self_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{extracted.pages} {timings[0]:.3f} {timings[1]:.3f} {self_mb:.0f} {child_mb:.0f} {len(extracted.text)}")
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        return run_one(sys.argv[2], int(sys.argv[3]))
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{'pages':>6}{'workers':>8}{'cold s':>9}{'cached s':>10}{'web MB':>8}{'worker MB':>11}{'text KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"chart-{pages}.pdf")
+            write_pdf(path, pages)
+            for workers in args.workers:
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_pdf", "--child", path, str(workers)],
+                    cwd=ROOT, capture_output=True, text=True, check=True,
+                ).stdout.split()
+                count, cold, warm, self_mb, child_mb, chars = out
+                print(
+                    f"{count:>6}{workers:>8}{float(cold):>9.2f}{float(warm):>10.3f}"
+                    f"{self_mb:>8}{child_mb if workers else '-':>11}{int(chars) // 1024:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cost of a client re-fetching an order's care plan
+(GET /orders/<id>/care-plan/) while polling for a regeneration. Modes:
+
+  uncached    every poll queries and renders the plan (caches cleared)
+  cached      no validator sent; the rendered plan comes from the cache
+  revalidate  If-None-Match with the last ETag; 304 from the cached state
+
+    python -m benchmarks.bench_plan_poll --orders 200 --polls 2000
+
+Queries per poll include the session and user lookups staff auth makes.
+"""
+import argparse
+import random
+
+from benchmarks._harness import measure, report, scratch_database, setup_django
+
+PLAN = """### 1. Problem List / Drug Therapy Problems (DTPs)
+- Infusion reaction risk with IVIG
+- Renal impairment: creatinine trending up
+
+### 2. SMART Goals
+1. Primary: improve ptosis within 4 weeks.
+2. Safety: no infusion reactions.
+
+### 3. Pharmacist Interventions
+- Premedicate with acetaminophen and diphenhydramine.
+- Hydrate with 500 mL NS before each dose.
+
+### 4. Monitoring Plan & Lab Schedule
+- BUN and creatinine before each infusion.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    from benchmarks._harness import create_orders
+    from careplans import regeneration
+    from careplans.models import Order
+
+    with scratch_database():
+        ids = create_orders(args.orders)
+        for order in Order.objects.filter(pk__in=ids):
+            regeneration.save_care_plan(order, PLAN)
+        client = Client()
+        client.force_login(get_user_model().objects.create_user("bench", is_staff=True))
+        urls = [reverse("care_plan_fragment", args=[pk]) for pk in ids]
+        etags = {url: client.get(url)["ETag"] for url in urls}
+        rng = random.Random(1234)
+        print(f"backend={connection.vendor} orders={args.orders:,} polls={args.polls:,}")
+
+        def uncached():
+            cache.clear()
+            return client.get(rng.choice(urls))
+
+        def cached():
+            return client.get(rng.choice(urls))
+
+        def revalidate():
+            url = rng.choice(urls)
+            return client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+
+        for label, poll in [("uncached", uncached), ("cached", cached), ("revalidate", revalidate)]:
+            for url in urls:  # fill the caches this mode reads from
+                client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                status = poll().status_code
+            report(f"{label} ({status}, {len(queries)} queries)", measure(poll, repeat=args.polls))
+
+
+if __name__ == "__main__":
+    main()
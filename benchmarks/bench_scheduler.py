@@ -0,0 +1,79 @@
+"""
+Interactive latency and backlog drain time under a backlog import.
+
+A backlog of N orders is queued at t=0 while same-day intake orders arrive
+at a steady rate; each "LLM call" sleeps for a fixed service time. Modes:
+
+  fifo  one class, first come first served (what a plain semaphore does)
+  wfq   careplans.scheduler defaults: weighted fair queueing + backlog cap
+  wfq1  the same with the backlog allowed every slot (SCHEDULER_BACKLOG_SHARE=1)
+
+    python -m benchmarks.bench_scheduler --slots 4 --backlog 200 --service 0.05
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks._harness import setup_django
+
+
+def _run(sched, args, backlog_class, urgent_class):
+    latencies, done = [], []
+
+    def call(priority, sink):
+        start = time.perf_counter()
+        with sched.slot(priority):
+            time.sleep(args.service)
+        sink.append(time.perf_counter() - start)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=call, args=(backlog_class, done)) for _ in range(args.backlog)]
+    for thread in threads:
+        thread.start()
+    for _ in range(args.interactive):
+        time.sleep(args.interval)
+        thread = threading.Thread(target=call, args=(urgent_class, latencies))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--backlog", type=int, default=200)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--service", type=float, default=0.05)
+    args = parser.parse_args()
+
+    setup_django()
+    from careplans import scheduler
+
+    fifo = {"all": scheduler.PriorityClass("all", weight=1, deadline=3600)}
+    modes = {
+        "fifo": (scheduler.Scheduler(args.slots, fifo), "all", "all"),
+        "wfq": (scheduler.Scheduler(args.slots), scheduler.BACKLOG, scheduler.URGENT),
+        "wfq1": (
+            scheduler.Scheduler(args.slots, scheduler.priority_classes(backlog_share=1.0)),
+            scheduler.BACKLOG,
+            scheduler.URGENT,
+        ),
+    }
+    ideal = args.backlog * args.service / args.slots
+    print(f"slots={args.slots} backlog={args.backlog} interactive={args.interactive} service={args.service}s")
+    for mode, (sched, backlog_class, urgent_class) in modes.items():
+        latencies, total = _run(sched, args, backlog_class, urgent_class)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{mode:<5} interactive p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+            f"p95 {p95 * 1000:7.1f}ms   all done in {total:5.2f}s (ideal {ideal:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
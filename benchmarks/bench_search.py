@@ -0,0 +1,52 @@
+"""
+Full-text search latency over synthetic clinical notes and care plans,
+compared with the naive icontains scan it replaces.
+
+    python -m benchmarks.bench_search --notes 500000
+"""
+import argparse
+
+from benchmarks._harness import create_orders, measure, report, scratch_database, setup_django
+
+QUERIES = [
+    "hydration before IVIG",
+    "creatinine renal function",
+    "premedication acetaminophen diphenhydramine",
+    "ptosis diplopia",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--skip-icontains", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from careplans.models import Order
+    from careplans.search import search_clinical_text
+
+    with scratch_database() as connection:
+        print(f"backend={connection.vendor} notes={args.notes:,} (+ one care plan each)")
+        create_orders(args.notes, care_plans=True)
+
+        for query in QUERIES:
+            report(f"fts  '{query}'", measure(lambda: search_clinical_text(query), args.repeat))
+
+        if not args.skip_icontains:
+            for query in QUERIES:
+                term = query.split()[0]
+                # Ranking needs every match, so the naive equivalent is a full scan
+                report(
+                    f"icontains '{term}'",
+                    measure(
+                        lambda: Order.objects.filter(patient_records_text__icontains=term).count(),
+                        repeat=max(3, args.repeat // 10),
+                        warmup=1,
+                    ),
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Near-duplicate note lookup latency as the number of stored notes grows.
+
+All orders are created up front, then signed and banded in stages (e.g.
+10k -> 100k -> 1M indexed notes). After each stage the LSH lookup is timed for edited copies of existing notes, both scoped to the
+note's patient (what intake does) and across all patients. The naive
+alternative, scoring every stored signature, is timed alongside until it
+gets too slow to bother.
+
+    python -m benchmarks.bench_similarity --notes 1000000
+"""
+import argparse
+import random
+
+from benchmarks._harness import create_orders, measure, progress, report, scratch_database, setup_django
+
+NAIVE_LIMIT = 200_000
+
+
+def _stages(total):
+    stage, stages = 10_000, []
+    while stage < total:
+        stages.append(stage)
+        stage *= 10
+    return stages + [total]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from careplans import similarity
+    from careplans.models import Order
+
+    rng = random.Random(0)
+    with scratch_database() as connection:
+        print(f"backend={connection.vendor} notes={args.notes:,}")
+        ids = create_orders(args.notes)
+        ids.sort()
+        for stored in _stages(args.notes):
+            progress(f"signing notes up to {stored:,}")
+            similarity.index_orders(Order.objects.filter(pk__lte=ids[stored - 1]), batch_size=5000)
+            progress("", end="\n")
+
+            probes = list(
+                Order.objects.filter(pk__in=[rng.choice(ids[:stored]) for _ in range(args.repeat)])
+                .values_list("patient_id", "patient_records_text")
+            )
+            edited = [(pid, text + " vitals stable bp 128 82") for pid, text in probes]
+            it = iter(edited * 4)
+
+            def scoped():
+                pid, text = next(it)
+                assert similarity.find_similar_orders(text, patient_id=pid, threshold=0.8)
+
+            def unscoped():
+                _, text = next(it)
+                similarity.find_similar_orders(text, threshold=0.8)
+
+            report(f"{stored:>9,} notes  lsh, same patient", measure(scoped, repeat=len(edited), warmup=0))
+            report(f"{stored:>9,} notes  lsh, all patients", measure(unscoped, repeat=len(edited), warmup=0))
+
+            if stored <= NAIVE_LIMIT:
+                def naive():
+                    sig = similarity.signature(edited[0][1])
+                    signed = Order.objects.filter(records_signature__isnull=False)
+                    for stored_sig in signed.values_list("records_signature", flat=True).iterator(5000):
+                        similarity.similarity(sig, bytes(stored_sig))
+
+                report(f"{stored:>9,} notes  scan every signature", measure(naive, repeat=3, warmup=0))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,128 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-# Register your models here.
+from .models import Patient, Provider, Order, CarePlan, CarePlanVersion, GenerationRun
+
+# Below this many rows an exact COUNT(*) is cheap enough to keep
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Avoids COUNT(*) over the whole table on unfiltered changelists.
+    On Postgres the planner's row estimate (pg_class.reltuples) is used once
+    the table is large; filtered/searched changelists still get an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        connection = connections[qs.db]
+        if connection.vendor == "postgresql" and not qs.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [qs.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class DeferredTextChangeList(ChangeList):
+    # Changelist rows never show the clinical text blobs, so don't load them.
+    # The change form still gets the full row.
+    def get_queryset(self, request, *args, **kwargs):
+        qs = super().get_queryset(request, *args, **kwargs)
+        return qs.defer(*self.model_admin.changelist_deferred_fields)
+
+
+# Search: MRN/NPI are matched with `__exact`, which their unique btree indexes
+# serve; the `=` prefix is `__iexact` (UPPER(col) = UPPER(%s) on Postgres),
+# which only medication_name has an Upper() index for (migration 0006).
+
+class PerformantAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skips the second COUNT(*) on filtered pages
+    changelist_deferred_fields = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredTextChangeList
+
+
+@admin.register(Patient)
+class PatientAdmin(PerformantAdmin):
+    list_display = ("mrn", "last_name", "first_name", "date_of_birth")
+    search_fields = ("mrn__exact",)
+    ordering = ("-id",)
+
+
+@admin.register(Provider)
+class ProviderAdmin(PerformantAdmin):
+    list_display = ("npi", "name")
+    search_fields = ("npi__exact",)
+    ordering = ("-id",)
+
+
+@admin.register(Order)
+class OrderAdmin(PerformantAdmin):
+    list_display = (
+        "id",
+        "patient",
+        "provider",
+        "medication_name",
+        "order_date",
+        "is_possible_duplicate_order",
+        "created_at",
+    )
+    list_filter = ("is_possible_duplicate_order",)
+    list_select_related = ("patient", "provider")
+    search_fields = ("patient__mrn__exact", "provider__npi__exact", "=medication_name")
+    autocomplete_fields = ("patient", "provider")
+    changelist_deferred_fields = ("patient_records_text", "records_signature")
+    ordering = ("-id",)
+
+
+@admin.register(CarePlan)
+class CarePlanAdmin(PerformantAdmin):
+    list_display = ("id", "order", "is_draft", "sections_parse_failed", "prompt_version", "cached_tokens", "created_at")
+    list_filter = ("sections_parse_failed",)
+    list_select_related = ("order__patient",)
+    search_fields = ("order__patient__mrn__exact", "=order__medication_name")
+    raw_id_fields = ("order",)
+    changelist_deferred_fields = ("generated_text", "sections", "order__patient_records_text")
+    ordering = ("-id",)
+
+
+@admin.register(CarePlanVersion)
+class CarePlanVersionAdmin(PerformantAdmin):
+    list_display = ("id", "order", "version", "mode", "prompt_tokens", "full_prompt_tokens", "created_at")
+    list_filter = ("mode",)
+    list_select_related = ("order__patient",)
+    search_fields = ("=order__id",)
+    raw_id_fields = ("order",)
+    changelist_deferred_fields = ("generated_text", "order__patient_records_text")
+    ordering = ("-id",)
+
+
+@admin.register(GenerationRun)
+class GenerationRunAdmin(PerformantAdmin):
+    list_display = (
+        "id", "created_at", "order_id", "medication_name", "prompt_version", "attempt",
+        "outcome", "latency_ms", "prompt_tokens", "cached_tokens", "completion_tokens",
+    )
+    list_filter = ("outcome",)
+    date_hierarchy = "created_at"
+    search_fields = ("=order__id",)
+    raw_id_fields = ("order",)
+    ordering = ("-id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
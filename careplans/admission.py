@@ -0,0 +1,145 @@
+"""
+Admission control for intake POSTs.
+
+Each intake submission is checked against the current LLM load before the
+view runs:
+
+  accept  generate the plan inline, as usual
+  defer   save the order and its draft plan, skip the LLM call and answer at
+          once; `manage.py generate_deferred_plans` generates it later
+  reject  503 + Retry-After, only when deferring can't keep up either (too
+          many plans already deferred, or this process is swamped with
+          intake requests)
+
+Load is read per process (the scheduler's slots and this process's intake
+requests) and across processes (cache counters kept by
+scheduler.generation_slot; cross-process only with a shared CACHE_URL, see
+scheduler.counts_are_shared). The numbers behind each decision, the
+thresholds and decision totals are served at /metrics/admission/.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import scheduler
+from .models import CarePlan
+
+logger = logging.getLogger(__name__)
+
+ACCEPT = "accept"
+DEFER = "defer"
+REJECT = "reject"
+DECISIONS = (ACCEPT, DEFER, REJECT)
+
+DECISION_KEY = "careplans:admission:{}"
+
+PLAN_QUEUED = (
+    "The AI service is busy. The order is saved and its care plan has been queued; "
+    "the draft below stands until then."
+)
+
+
+@dataclass(frozen=True)
+class Load:
+    process_running: int
+    process_queued: int
+    global_running: int
+    global_queued: int
+    active_requests: int  # intake POSTs in progress in this process
+
+
+_active_requests = 0
+_lock = threading.Lock()
+
+
+@contextmanager
+def intake_request():
+    """Count an intake POST as in progress in this process while it runs."""
+    global _active_requests
+    with _lock:
+        _active_requests += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _active_requests -= 1
+
+
+def current_load():
+    snapshot = scheduler.get_scheduler().snapshot()
+    global_running, global_queued = scheduler.global_counts()
+    return Load(
+        process_running=sum(c["running"] for c in snapshot.values()),
+        process_queued=sum(c["queued"] for c in snapshot.values()),
+        global_running=global_running,
+        global_queued=global_queued,
+        active_requests=_active_requests,
+    )
+
+
+def deferred_count():
+    return CarePlan.objects.filter(generation_deferred=True).count()
+
+
+def thresholds():
+    return {
+        "defer_process_queued": settings.ADMISSION_DEFER_QUEUED,
+        "defer_global_in_flight": settings.ADMISSION_DEFER_IN_FLIGHT,
+        "reject_active_requests": settings.ADMISSION_REJECT_ACTIVE_REQUESTS,
+        "reject_deferred": settings.ADMISSION_REJECT_DEFERRED,
+    }
+
+
+def decide(load):
+    """Return (decision, reason) for one intake submission under `load`."""
+    if load.active_requests >= settings.ADMISSION_REJECT_ACTIVE_REQUESTS:
+        return REJECT, f"{load.active_requests} intake requests in progress"
+
+    if load.process_queued >= settings.ADMISSION_DEFER_QUEUED:
+        reason = f"{load.process_queued} generations waiting for a slot in this process"
+    elif load.global_running + load.global_queued >= settings.ADMISSION_DEFER_IN_FLIGHT:
+        reason = f"{load.global_running + load.global_queued} generations in flight"
+    else:
+        return ACCEPT, ""
+
+    # Deferring is only a way out while the deferred backlog stays bounded
+    deferred = deferred_count()
+    if deferred >= settings.ADMISSION_REJECT_DEFERRED:
+        return REJECT, f"{deferred} plans already deferred"
+    return DEFER, reason
+
+
+# ---------------------
+# Metrics
+# ---------------------
+
+_process_decisions = dict.fromkeys(DECISIONS, 0)
+
+
+def record_decision(decision, reason=""):
+    with _lock:
+        _process_decisions[decision] += 1
+    key = DECISION_KEY.format(decision)
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+    if decision != ACCEPT:
+        logger.warning("Intake %s: %s", decision, reason)
+
+
+def metrics():
+    totals = cache.get_many([DECISION_KEY.format(d) for d in DECISIONS])
+    with _lock:
+        process_decisions = dict(_process_decisions)
+    return {
+        "load": asdict(current_load()),
+        "deferred": deferred_count(),
+        "thresholds": thresholds(),
+        "global_counts_shared": scheduler.counts_are_shared(),
+        "decisions": {d: totals.get(DECISION_KEY.format(d), 0) for d in DECISIONS},
+        "process_decisions": process_decisions,
+        "scheduler": scheduler.get_scheduler().snapshot(),
+    }
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _repair_search_triggers(sender, using, **kwargs):
+    from django.db import connections
+    from .search import ensure_sqlite_triggers
+
+    ensure_sqlite_triggers(connections[using])
 
 
 class CareplansConfig(AppConfig):
     name = "careplans"
+
+    def ready(self):
+        # Compiles and validates the prompt templates once, at startup
+        from . import drafts, prompts  # noqa: F401
+        from . import assets  # noqa: F401  (registers the vendored-files check)
+        from . import scheduler  # noqa: F401  (registers the shared-counters check)
+
+        drafts.build_index()
+
+        post_migrate.connect(_repair_search_triggers, sender=self)
@@ -0,0 +1,190 @@
+"""
+Archiving of orders past the retention window (OrderArchive).
+
+`manage.py archive_orders` moves orders dated before retention_boundary()
+out of Order, together with their notes, care plan and plan history, so the
+live table and its indexes (the hard-duplicate constraint, the duplicate
+lookups, the search index, note bands) only cover recent orders.
+
+Postgres: OrderArchive is range-partitioned by order_date, one partition per
+calendar year plus a DEFAULT partition; archiving creates the year
+partitions it needs. Order itself stays unpartitioned: a partitioned table's
+primary key has to include the partition column, which Order's id-only key
+(and every foreign key pointing at it) cannot.
+SQLite (local dev + tests): OrderArchive is a plain table.
+
+The hard-duplicate rule (patient + medication + order_date) holds across
+the boundary: intake checks OrderArchive as well for order dates old enough
+to have been archived, and both intake and archiving take the patient's row
+lock before writing so neither can slip past the other.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderArchive, Patient
+
+TABLE = OrderArchive._meta.db_table
+
+
+# ---------------------
+# Partitions (the table itself is created by migration 0016)
+# ---------------------
+
+def ensure_partitions(years):
+    """Create the yearly OrderArchive partitions for `years` (Postgres only)."""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for year in sorted(set(years)):
+            # A new partition can't be attached while the DEFAULT partition
+            # holds rows for its range; those only get there if a year was
+            # archived before its partition existed, which this prevents.
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE}_y{year} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+
+
+# ---------------------
+# Retention boundary + duplicate checks
+# ---------------------
+
+def retention_boundary():
+    """Orders dated before this day may be archived."""
+    return timezone.localdate() - timedelta(days=settings.ORDER_RETENTION_DAYS)
+
+
+def may_be_archived(order_date):
+    return order_date < retention_boundary()
+
+
+def archived_duplicate_exists(mrn, medication_name, order_date):
+    """
+    True if an archived order breaks the hard-duplicate rule. Recent dates
+    can't be in the archive, so they cost no query.
+    """
+    if not may_be_archived(order_date):
+        return False
+    return OrderArchive.objects.filter(
+        patient__mrn=mrn,
+        medication_name__iexact=medication_name,
+        order_date=order_date,
+    ).exists()
+
+
+# ---------------------
+# Payload
+# ---------------------
+
+def pack(order):
+    """The order's notes, care plan and plan history as compressed JSON."""
+    care_plan = getattr(order, "care_plan", None)
+    data = {
+        "patient_records_text": order.patient_records_text,
+        "care_plan": None if care_plan is None else {
+            "generated_text": care_plan.generated_text,
+            "prompt_version": care_plan.prompt_version,
+            "cached_tokens": care_plan.cached_tokens,
+            "is_draft": care_plan.is_draft,
+            "generation_deferred": care_plan.generation_deferred,
+            "sections": care_plan.sections,
+            "sections_parse_failed": care_plan.sections_parse_failed,
+            "created_at": care_plan.created_at.isoformat(),
+        },
+        "versions": [
+            {
+                "version": v.version,
+                "mode": v.mode,
+                "generated_text": v.generated_text,
+                "source_order_id": v.source_order_id,
+                "prompt_version": v.prompt_version,
+                "prompt_tokens": v.prompt_tokens,
+                "completion_tokens": v.completion_tokens,
+                "cached_tokens": v.cached_tokens,
+                "full_prompt_tokens": v.full_prompt_tokens,
+                "created_at": v.created_at.isoformat(),
+            }
+            for v in sorted(order.care_plan_versions.all(), key=lambda v: v.version)
+        ],
+    }
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(bytes(payload)).decode("utf-8"))
+
+
+# ---------------------
+# Archiving
+# ---------------------
+
+def archive_cutoff(boundary=None):
+    # Never past the retention boundary: intake only checks the archive for
+    # dates before it
+    cutoff = retention_boundary()
+    return cutoff if boundary is None else min(boundary, cutoff)
+
+
+def archivable_orders(boundary=None):
+    return Order.objects.filter(order_date__lt=archive_cutoff(boundary))
+
+
+def archive_batch(order_ids):
+    """
+    Move one batch of orders into OrderArchive. Returns the number moved.
+    Deleting the orders cascades to their care plans, versions, note bands
+    and idempotency keys; GenerationRun rows are kept (order set to NULL).
+    """
+    with transaction.atomic():
+        # Same lock intake takes before its archive re-check (OrderIntakeForm.save)
+        patient_ids = Order.objects.filter(pk__in=order_ids).values("patient_id")
+        list(Patient.objects.select_for_update().filter(pk__in=patient_ids).order_by("pk").values_list("pk", flat=True))
+        orders = list(
+            Order.objects.filter(pk__in=order_ids)
+            .select_related("care_plan")
+            .prefetch_related("care_plan_versions")
+            .order_by("pk")
+        )
+        if not orders:
+            return 0
+        ensure_partitions(o.order_date.year for o in orders)
+        OrderArchive.objects.bulk_create(
+            OrderArchive(
+                id=o.pk,
+                patient_id=o.patient_id,
+                provider_id=o.provider_id,
+                medication_name=o.medication_name,
+                order_date=o.order_date,
+                primary_diagnosis_icd10=o.primary_diagnosis_icd10,
+                additional_diagnoses=o.additional_diagnoses,
+                medication_history=o.medication_history,
+                is_possible_duplicate_order=o.is_possible_duplicate_order,
+                duplicate_reason=o.duplicate_reason,
+                payload=pack(o),
+                created_at=o.created_at,
+            )
+            for o in orders
+        )
+        Order.objects.filter(pk__in=[o.pk for o in orders]).delete()
+    return len(orders)
+
+
+def archive_orders(boundary=None, batch_size=1000, limit=None):
+    """Archive every order dated before `boundary`, one transaction per batch."""
+    moved, last_id = 0, 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        # Keyset over the primary key so each batch starts where the last ended
+        ids = list(
+            archivable_orders(boundary).filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:size]
+        )
+        if not ids:
+            break
+        moved += archive_batch(ids)
+        last_id = ids[-1]
+    return moved
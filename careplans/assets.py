@@ -0,0 +1,96 @@
+"""
+Third-party static files the templates load, vendored under
+careplans/static/careplans/vendor/ so pages don't depend on a CDN (and keep
+working on networks with no internet access).
+
+`manage.py vendor_static` fetches the pinned files once, checks each
+against its published SRI hash, and writes it for committing. Templates
+reference them with plain {% static %}, so a missing file is a system
+check error: with the manifest storage the page would fail to render.
+The page styles themselves are first-party (careplans/css/careplans.css).
+
+Serving: `collectstatic` writes content-hashed copies with .gz and .br
+variants to STATIC_ROOT (whitenoise's CompressedManifestStaticFilesStorage,
+so compression happens at build time), and WhiteNoiseMiddleware serves
+them with the best encoding the browser accepts and, for hashed names, a
+one-year `immutable` Cache-Control.
+"""
+import base64
+import hashlib
+import re
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.core import checks
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+
+BOOTSTRAP_VERSION = "5.3.3"
+_BOOTSTRAP_CDN = f"https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist"
+
+# collectstatic's manifest storage rewrites sourceMappingURL references and
+# fails when the .map isn't there; the maps aren't vendored, so drop them
+_SOURCE_MAP = re.compile(rb"\n?/\*# sourceMappingURL=\S+ \*/\s*$|\n?//# sourceMappingURL=\S+\s*$")
+
+
+@dataclass(frozen=True)
+class VendorAsset:
+    path: str  # static path, as given to {% static %}
+    url: str
+    integrity: str  # SRI hash published upstream
+
+    @property
+    def file(self):
+        return STATIC_DIR / self.path
+
+
+VENDOR_ASSETS = (
+    VendorAsset(
+        "careplans/vendor/bootstrap/bootstrap.bundle.min.js",
+        f"{_BOOTSTRAP_CDN}/js/bootstrap.bundle.min.js",
+        "sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz",
+    ),
+)
+
+
+class VendorError(Exception):
+    pass
+
+
+def sri_hash(content):
+    return "sha384-" + base64.b64encode(hashlib.sha384(content).digest()).decode()
+
+
+def get_asset(path):
+    for asset in VENDOR_ASSETS:
+        if asset.path == path:
+            return asset
+    raise LookupError(f"{path} is not a vendored asset (see careplans.assets.VENDOR_ASSETS).")
+
+
+def missing_assets():
+    return [asset for asset in VENDOR_ASSETS if not asset.file.exists()]
+
+
+def fetch(asset, timeout=30):
+    """Download `asset`, verify it and write it under STATIC_DIR."""
+    with urllib.request.urlopen(asset.url, timeout=timeout) as response:
+        content = response.read()
+    actual = sri_hash(content)
+    if actual != asset.integrity:
+        raise VendorError(f"{asset.url}: expected {asset.integrity}, got {actual}")
+    asset.file.parent.mkdir(parents=True, exist_ok=True)
+    asset.file.write_bytes(_SOURCE_MAP.sub(b"\n", content))
+
+
+@checks.register(checks.Tags.staticfiles)
+def check_vendor_assets(app_configs, **kwargs):
+    return [
+        checks.Error(
+            f"Vendored static file {asset.path} is missing.",
+            hint="Run `python manage.py vendor_static` and commit the files.",
+            id="careplans.E002",
+        )
+        for asset in missing_assets()
+    ]
@@ -0,0 +1,397 @@
+"""
+Deterministic draft care plans from the structured intake fields.
+
+A draft is rendered from local lookup tables keyed by medication and ICD-10
+code, in the same four sections as the LLM plan. It takes well under a
+millisecond and needs no network, so every order has a plan to show even
+when the LLM is slow or unavailable; the LLM plan replaces it when it
+arrives. The tables are compiled into an in-memory index once, at startup
+(CareplansConfig.ready).
+"""
+import re
+from dataclasses import dataclass
+
+DRAFT_HEADER = "DRAFT CARE PLAN (rules-based; replaced by the AI care plan when available)"
+
+
+@dataclass(frozen=True)
+class MedicationRule:
+    name: str
+    drug_class: str
+    aliases: tuple = ()
+    problems: tuple = ()
+    goals: tuple = ()
+    interventions: tuple = ()
+    monitoring: tuple = ()
+
+
+@dataclass(frozen=True)
+class DiagnosisRule:
+    prefix: str  # ICD-10 code or category, without the dot
+    label: str
+    problems: tuple = ()
+    goals: tuple = ()
+    monitoring: tuple = ()
+
+
+# ---------------------
+# Lookup tables
+# ---------------------
+
+MEDICATION_RULES = (
+    MedicationRule(
+        name="IVIG",
+        drug_class="immune globulin",
+        aliases=("immune globulin", "Gamunex", "Privigen", "Octagam", "Gammagard"),
+        problems=(
+            "Infusion-related reactions (headache, chills, flushing, myalgia).",
+            "Risk of thrombosis and acute kidney injury, higher with dehydration or sucrose-containing products.",
+            "Aseptic meningitis risk with high-dose courses.",
+        ),
+        goals=(
+            "Safety: complete each infusion without a grade 2 or higher infusion reaction.",
+            "Safety: keep serum creatinine within 0.3 mg/dL of baseline through the course.",
+        ),
+        interventions=(
+            "Dosing: verify g/kg dose against actual or adjusted body weight and total grams per day.",
+            "Premeds: acetaminophen and diphenhydramine 30-60 minutes before the infusion.",
+            "Hydration: 250-500 mL normal saline before the infusion unless fluid-restricted.",
+            "Titration: start at the product's lowest rate and step up per labeling as tolerated.",
+        ),
+        monitoring=(
+            "Vitals before, every 15 minutes for the first hour, then hourly and at completion.",
+            "BMP / serum creatinine at baseline and before each course.",
+            "Watch for thrombosis, hemolysis (CBC if suspected) and headache after the infusion.",
+        ),
+    ),
+    MedicationRule(
+        name="Humira",
+        drug_class="TNF inhibitor",
+        aliases=("adalimumab",),
+        problems=(
+            "Serious infection risk (TNF inhibitor).",
+            "Latent TB and hepatitis B reactivation risk.",
+        ),
+        goals=(
+            "Process: negative TB screen and HBV serologies documented before the first dose.",
+            "Process: patient self-injects correctly after one teaching session.",
+        ),
+        interventions=(
+            "Confirm TB test and HBV serologies before starting.",
+            "Counsel on injection technique, storage and sharps disposal.",
+            "Review vaccinations; avoid live vaccines during therapy.",
+        ),
+        monitoring=(
+            "Screen for signs of infection at every contact.",
+            "CBC and LFTs every 3-6 months.",
+            "Annual TB screening when risk factors are present.",
+        ),
+    ),
+    MedicationRule(
+        name="Remicade",
+        drug_class="TNF inhibitor",
+        aliases=("infliximab", "Inflectra", "Renflexis"),
+        problems=(
+            "Infusion reactions, including delayed hypersensitivity.",
+            "Serious infection risk; latent TB and hepatitis B reactivation.",
+        ),
+        goals=(
+            "Safety: no infusion reaction requiring the infusion to be stopped.",
+            "Process: TB screen and HBV serologies documented before the first dose.",
+        ),
+        interventions=(
+            "Dosing: verify mg/kg dose for the indication against current weight.",
+            "Premeds per protocol (acetaminophen, antihistamine, +/- corticosteroid).",
+            "Infuse over at least 2 hours.",
+        ),
+        monitoring=(
+            "Vitals during the infusion and for 1 hour after.",
+            "CBC and LFTs periodically; screen for infection at every visit.",
+        ),
+    ),
+    MedicationRule(
+        name="Ocrevus",
+        drug_class="anti-CD20",
+        aliases=("ocrelizumab",),
+        problems=(
+            "Infusion reactions, most common with the first infusion.",
+            "Infection risk, hepatitis B reactivation and hypogammaglobulinemia.",
+        ),
+        goals=(
+            "Process: HBV screen and immunoglobulin levels documented before the first dose.",
+            "Safety: complete each infusion without a serious infusion reaction.",
+        ),
+        interventions=(
+            "Dosing: 300 mg IV on day 1 and day 15, then 600 mg every 6 months.",
+            "Premeds: methylprednisolone 100 mg IV and an antihistamine, +/- antipyretic.",
+            "Complete live vaccines at least 4 weeks before starting.",
+        ),
+        monitoring=(
+            "Observe for at least 1 hour after the infusion.",
+            "Immunoglobulin levels before each course; screen for infection.",
+        ),
+    ),
+    MedicationRule(
+        name="Entyvio",
+        drug_class="integrin receptor antagonist",
+        aliases=("vedolizumab",),
+        problems=(
+            "Infusion reactions and infection risk.",
+            "Rare progressive multifocal leukoencephalopathy (PML).",
+        ),
+        goals=(
+            "Process: complete induction doses at weeks 0, 2 and 6 on schedule.",
+        ),
+        interventions=(
+            "Dosing: 300 mg IV at weeks 0, 2 and 6, then every 8 weeks.",
+            "Bring vaccinations up to date before starting.",
+        ),
+        monitoring=(
+            "LFTs periodically.",
+            "New neurological symptoms (possible PML) at every visit.",
+        ),
+    ),
+    MedicationRule(
+        name="Soliris",
+        drug_class="complement inhibitor",
+        aliases=("eculizumab",),
+        problems=(
+            "Life-threatening meningococcal infection risk (boxed warning; REMS program).",
+        ),
+        goals=(
+            "Process: meningococcal vaccination documented at least 2 weeks before the first dose.",
+        ),
+        interventions=(
+            "Confirm REMS enrollment and give the patient safety card.",
+            "Meningococcal vaccines (MenACWY and MenB), or antibiotic prophylaxis if dosing sooner.",
+            "Counsel on early signs of meningococcal infection and when to seek care.",
+        ),
+        monitoring=(
+            "Signs of meningococcal infection at every contact.",
+            "Disease markers per indication (e.g. LDH for PNH) before each dose.",
+        ),
+    ),
+    MedicationRule(
+        name="Vyvgart",
+        drug_class="FcRn blocker",
+        aliases=("efgartigimod",),
+        problems=(
+            "Infection risk from lowered IgG.",
+            "Lowers levels of IgG-based therapies (IVIG, monoclonal antibodies) given alongside.",
+        ),
+        goals=(
+            "Process: complete each 4-infusion cycle on schedule.",
+        ),
+        interventions=(
+            "Dosing: 10 mg/kg IV weekly for 4 weeks per cycle (max 1200 mg per infusion).",
+            "Review timing of any IgG-based therapies and vaccinations.",
+        ),
+        monitoring=(
+            "Infusion reactions and signs of infection.",
+            "Disease score at the start and end of each cycle.",
+        ),
+    ),
+)
+
+DIAGNOSIS_RULES = (
+    DiagnosisRule(
+        "G70", "Myasthenia gravis",
+        goals=("Primary: improve MG-ADL score by 2 or more points within 8 weeks.",),
+        monitoring=("MG-ADL at each visit; watch for crisis (dyspnea, dysphagia).",),
+    ),
+    DiagnosisRule(
+        "G61", "Inflammatory polyneuropathy (GBS / CIDP)",
+        goals=("Primary: stable or improved INCAT disability score within 12 weeks.",),
+        monitoring=("Grip strength and INCAT score each course.",),
+    ),
+    DiagnosisRule(
+        "G35", "Multiple sclerosis",
+        goals=("Primary: no new relapses over the next 12 months.",),
+        monitoring=("MRI per neurology schedule; relapse history at each visit.",),
+    ),
+    DiagnosisRule(
+        "M05", "Seropositive rheumatoid arthritis",
+        goals=("Primary: reach low disease activity (CDAI 10 or less) within 6 months.",),
+        monitoring=("CDAI every 3 months.",),
+    ),
+    DiagnosisRule(
+        "M06", "Rheumatoid arthritis",
+        goals=("Primary: reach low disease activity (CDAI 10 or less) within 6 months.",),
+        monitoring=("CDAI every 3 months.",),
+    ),
+    DiagnosisRule(
+        "K50", "Crohn's disease",
+        goals=("Primary: clinical remission by week 14.",),
+        monitoring=("Symptom score and CRP at each visit.",),
+    ),
+    DiagnosisRule(
+        "K51", "Ulcerative colitis",
+        goals=("Primary: clinical remission by week 14.",),
+        monitoring=("Symptom score and CRP / fecal calprotectin at each visit.",),
+    ),
+    DiagnosisRule(
+        "D595", "Paroxysmal nocturnal hemoglobinuria",
+        goals=("Primary: LDH at or below 1.5x ULN within 3 months.",),
+        monitoring=("LDH, CBC and transfusion needs before each dose.",),
+    ),
+    DiagnosisRule(
+        "L40", "Psoriasis",
+        goals=("Primary: PASI 75 by week 16.",),
+        monitoring=("PASI / BSA at each visit.",),
+    ),
+    DiagnosisRule(
+        "D80", "Immunodeficiency (antibody defects)",
+        goals=("Primary: fewer than 2 serious bacterial infections over the next 12 months.",),
+        monitoring=("IgG trough level every 6-12 months.",),
+    ),
+    DiagnosisRule(
+        "D83", "Common variable immunodeficiency",
+        goals=("Primary: fewer than 2 serious bacterial infections over the next 12 months.",),
+        monitoring=("IgG trough level every 6-12 months.",),
+    ),
+    DiagnosisRule(
+        "I10", "Hypertension",
+        problems=("Hypertension: check blood pressure before infusions and after steroid premeds.",),
+    ),
+    DiagnosisRule(
+        "E11", "Type 2 diabetes",
+        problems=("Diabetes: corticosteroid premeds may raise blood glucose.",),
+        monitoring=("Blood glucose on infusion days if steroid premeds are given.",),
+    ),
+    DiagnosisRule(
+        "N18", "Chronic kidney disease",
+        problems=("CKD: higher risk of nephrotoxicity; confirm renal dose adjustments and slower rates.",),
+        monitoring=("Serum creatinine before each dose.",),
+    ),
+    DiagnosisRule(
+        "I50", "Heart failure",
+        problems=("Heart failure: limit infusion and hydration volume; watch for fluid overload.",),
+        monitoring=("Weight and signs of fluid overload around infusions.",),
+    ),
+)
+
+
+# ---------------------
+# In-memory index
+# ---------------------
+
+def _normalize_code(code):
+    return re.sub(r"[^A-Z0-9]", "", (code or "").upper())
+
+
+def _name_keys(name):
+    tokens = re.findall(r"[A-Z0-9]+", (name or "").upper())
+    # Whole name first ("IMMUNE GLOBULIN"), then single words ("IVIG 10%")
+    return ["".join(tokens)] + tokens if tokens else []
+
+
+class DraftIndex:
+    def __init__(self, medication_rules, diagnosis_rules):
+        self.medications = {}
+        for rule in medication_rules:
+            for name in (rule.name,) + rule.aliases:
+                self.medications["".join(re.findall(r"[A-Z0-9]+", name.upper()))] = rule
+        self.diagnoses = {rule.prefix: rule for rule in diagnosis_rules}
+        self._longest_prefix = max((len(p) for p in self.diagnoses), default=0)
+
+    def medication(self, name):
+        for key in _name_keys(name):
+            if key in self.medications:
+                return self.medications[key]
+        return None
+
+    def diagnosis(self, code):
+        # Most specific match wins: D59.5 -> "D595" before "D59"
+        code = _normalize_code(code)
+        for n in range(min(len(code), self._longest_prefix), 2, -1):
+            if code[:n] in self.diagnoses:
+                return self.diagnoses[code[:n]]
+        return None
+
+
+_index = None
+
+
+def build_index():
+    global _index
+    _index = DraftIndex(MEDICATION_RULES, DIAGNOSIS_RULES)
+    return _index
+
+
+def get_index():
+    return _index or build_index()
+
+
+# ---------------------
+# Rendering
+# ---------------------
+
+def build_draft(medication_name, primary_icd10, additional_diagnoses=(), medication_history=()):
+    index = get_index()
+    med = index.medication(medication_name)
+    primary = index.diagnosis(primary_icd10)
+
+    problems, goals, interventions, monitoring = [], [], [], []
+
+    if primary:
+        problems.append(f"Primary diagnosis {primary_icd10}: {primary.label}.")
+    else:
+        problems.append(f"Primary diagnosis {primary_icd10}: no draft rule; review the clinical notes.")
+    problems.extend(primary.problems if primary else ())
+
+    for code in additional_diagnoses:
+        rule = index.diagnosis(code)
+        if rule and rule.problems:
+            problems.extend(rule.problems)
+        elif rule:
+            problems.append(f"Comorbidity {code}: {rule.label}.")
+        else:
+            problems.append(f"Comorbidity {code}: review relevance to therapy.")
+        monitoring.extend(rule.monitoring if rule else ())
+
+    if med:
+        problems.extend(med.problems)
+        for home_med in medication_history:
+            other = index.medication(home_med)
+            if other is med:
+                problems.append(f"Therapy duplication: {home_med} is already on the medication history.")
+            elif other and other.drug_class == med.drug_class:
+                problems.append(
+                    f"Possible therapy duplication: {home_med} is also a {med.drug_class}."
+                )
+    else:
+        problems.append(f"{medication_name}: no draft rule; verify dose, route and frequency manually.")
+
+    if medication_history:
+        interventions.append("Reconcile home medications: " + ", ".join(medication_history) + ".")
+
+    goals.extend(primary.goals if primary else ())
+    goals.extend(med.goals if med else ())
+    goals.append("Process: AI care plan reviewed and signed off by a pharmacist.")
+
+    interventions[:0] = med.interventions if med else ()
+    monitoring[:0] = (primary.monitoring if primary else ()) + (med.monitoring if med else ())
+    if not monitoring:
+        monitoring.append("Labs and vitals per prescriber orders and product labeling.")
+
+    sections = [
+        ("1. Problem List / Drug Therapy Problems (DTPs)", problems),
+        ("2. SMART Goals (Primary, Safety, and Process goals)", goals),
+        ("3. Pharmacist Interventions (Dosing, Premeds, Titration, Hydration, Interactions)", interventions),
+        ("4. Monitoring Plan & Lab Schedule", monitoring),
+    ]
+    lines = [DRAFT_HEADER, f"Medication: {medication_name} | Primary Dx: {primary_icd10}", ""]
+    for title, items in sections:
+        lines.append(title)
+        lines.extend(f"- {item}" for item in items or ["None identified from intake fields."])
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def render_draft(order):
+    return build_draft(
+        order.medication_name,
+        order.primary_diagnosis_icd10,
+        order.additional_diagnoses,
+        order.medication_history,
+    )
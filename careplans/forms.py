@@ -1,9 +1,20 @@
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
-from .models import Provider, Patient, Order
+from . import archive, icd10, pdfs, similarity
+from .models import ICD10_VALIDATOR, Provider, Patient, Order
+from .routers import primary_only
+
+# Reason strings persisted in Order.duplicate_reason (review queue counts key off these)
+REASON_POSSIBLE_DUPLICATE = "Possible duplicate order (same patient + medication on a different date)."
+REASON_PROVIDER_NPI_CONFLICT = "Provider name matches existing provider but NPI differs."
+REASON_PROVIDER_NAME_MISMATCH = "Provider NPI matches existing record but has a different provider name."
+REASON_PATIENT_NAME_MISMATCH = "Patient MRN exists but name differs."
+
+DUPLICATE_ORDER = "Duplicate order: same patient MRN, same medication, same date."
 
 
 class OrderIntakeForm(forms.Form):
@@ -31,7 +42,13 @@ class OrderIntakeForm(forms.Form):
         help_text="Comma-separated medication strings"
     )
 
-    patient_records_text = forms.CharField(widget=forms.Textarea)
+    # Clinical notes: pasted, or uploaded as a PDF (read later by careplans.pdfs)
+    patient_records_text = forms.CharField(widget=forms.Textarea, required=False)
+    patient_records_pdf = forms.FileField(
+        required=False,
+        label="Clinical Notes (PDF)",
+        widget=forms.ClearableFileInput(attrs={"accept": "application/pdf"}),
+    )
 
     # prevents PHI leaks
     def __init__(self, *args, **kwargs):
@@ -62,6 +79,17 @@ class OrderIntakeForm(forms.Form):
             raise ValidationError("MRN must be exactly 6 digits.")
         return mrn
 
+    def clean_primary_diagnosis_icd10(self):
+        code = self.cleaned_data["primary_diagnosis_icd10"].strip().upper()
+        ICD10_VALIDATOR(icd10.format_code(code))
+        icd10.validate_icd10_code(code)
+        return icd10.format_code(code)
+
+    def clean_additional_diagnoses(self):
+        codes = [d.strip().upper() for d in self.cleaned_data["additional_diagnoses"].split(",") if d.strip()]
+        icd10.validate_icd10_list(codes)
+        return ", ".join(icd10.format_code(c) for c in codes)
+
     def clean_order_date(self):
         d = self.cleaned_data["order_date"]
         if d > timezone.localdate():
@@ -71,27 +99,40 @@ class OrderIntakeForm(forms.Form):
     # ---------------------
     # Cross-field validation
     # ---------------------
+    # Duplicate checks must see the latest writes, never a lagging replica
+    @primary_only()
     def clean(self):
         cleaned = super().clean()
         if self.errors:
             return cleaned
 
+        pdf = cleaned.get("patient_records_pdf")
+        if pdf and cleaned["patient_records_text"].strip():
+            raise ValidationError("Paste the clinical notes or upload a PDF, not both.")
+        if not pdf and not cleaned["patient_records_text"].strip():
+            raise ValidationError("Clinical notes are required: paste them or upload a PDF.")
+        if pdf and pdf.size > settings.PDF_MAX_UPLOAD_BYTES:
+            raise ValidationError(
+                f"The PDF is larger than {settings.PDF_MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+            )
+        if pdf and not pdfs.is_pdf(pdf):
+            raise ValidationError("The uploaded notes file is not a PDF.")
+
         mrn = cleaned["patient_mrn"]
         med = cleaned["medication_name"].strip()
         date = cleaned["order_date"]
 
-        # HARD duplicate — block
+        # HARD duplicate — block (live orders, or archived ones for old dates)
         existing = Order.objects.filter(
             patient__mrn=mrn,
             medication_name__iexact=med,
             order_date=date,
         )
-        if existing.exists():
-            raise ValidationError(
-                "Duplicate order: same patient MRN, same medication, same date."
-            )
+        if existing.exists() or archive.archived_duplicate_exists(mrn, med, date):
+            raise ValidationError(DUPLICATE_ORDER)
 
-        # SOFT duplicate — allow with flag
+        # SOFT duplicate — allow with flag (live orders only; archived ones
+        # are past the retention window)
         soft = Order.objects.filter(
             patient__mrn=mrn,
             medication_name__iexact=med,
@@ -114,6 +155,7 @@ class OrderIntakeForm(forms.Form):
     # ---------------------
     # Save() Implementation
     # ---------------------
+    @primary_only()
     def save(self):
         if not self.is_valid():
             raise ValueError("Cannot save invalid form")
@@ -147,6 +189,15 @@ class OrderIntakeForm(forms.Form):
                 },
             )
 
+            # Order's unique constraint can't see the archive: re-check under
+            # the patient's row lock, which archive_orders takes as well
+            if archive.may_be_archived(cd["order_date"]):
+                list(Patient.objects.select_for_update().filter(pk=patient.pk).values_list("pk", flat=True))
+                if archive.archived_duplicate_exists(
+                    cd["patient_mrn"], cd["medication_name"].strip(), cd["order_date"]
+                ):
+                    raise IntegrityError(DUPLICATE_ORDER)
+
             patient_name_mismatch = (
                 patient.first_name.lower() != cd["patient_first_name"].strip().lower() or
                 patient.last_name.lower() != cd["patient_last_name"].strip().lower()
@@ -161,6 +212,8 @@ class OrderIntakeForm(forms.Form):
                 additional_diagnoses=addl_dx,
                 medication_history=med_hist,
                 patient_records_text=cd["patient_records_text"],
+                # Read later by generate_deferred_plans, never in the request
+                notes_pdf=cd["patient_records_pdf"] or "",
                 is_possible_duplicate_order=cd.get("__possible_duplicate_order", False),
                 duplicate_reason=self._build_reason(
                     cd,
@@ -169,16 +222,52 @@ class OrderIntakeForm(forms.Form):
                 ),
             )
 
+            # Near-duplicate note lookup (signature + LSH bands); PDF notes
+            # are indexed once they have been read
+            if not order.notes_pdf:
+                similarity.index_order(order)
+
         return order
 
     def _build_reason(self, cd, provider_name_mismatch, patient_name_mismatch):
         reasons = []
         if cd.get("__possible_duplicate_order"):
-            reasons.append("Possible duplicate order (same patient + medication on a different date).")
+            reasons.append(REASON_POSSIBLE_DUPLICATE)
         if cd.get("__provider_npi_conflict"):
-            reasons.append("Provider name matches existing provider but NPI differs.")
+            reasons.append(REASON_PROVIDER_NPI_CONFLICT)
         if provider_name_mismatch:
-            reasons.append("Provider NPI matches existing record but has a different provider name.")
+            reasons.append(REASON_PROVIDER_NAME_MISMATCH)
         if patient_name_mismatch:
-            reasons.append("Patient MRN exists but name differs.")
+            reasons.append(REASON_PATIENT_NAME_MISMATCH)
         return " | ".join(reasons)
+
+
+class ExportFilterForm(forms.Form):
+    FLAG_CHOICES = [
+        ("", "All orders"),
+        ("flagged", "Flagged for review"),
+        ("possible_duplicate", "Possible duplicates"),
+        ("unflagged", "Not flagged"),
+    ]
+
+    format = forms.ChoiceField(choices=[("csv", "CSV"), ("ndjson", "NDJSON")], required=False)
+    start = forms.DateField(required=False, label="Order date from")
+    end = forms.DateField(required=False, label="Order date to")
+    flag = forms.ChoiceField(choices=FLAG_CHOICES, required=False)
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or "csv"
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get("start"), cleaned.get("end")
+        if start and end and start > end:
+            raise ValidationError("Start date must be on or before end date.")
+        return cleaned
+
+
+class RegenerateCarePlanForm(forms.Form):
+    # The full, updated records text; only its difference from the stored
+    # text is sent to the model
+    patient_records_text = forms.CharField(widget=forms.Textarea)
@@ -0,0 +1,239 @@
+"""
+ICD-10-CM validation against the full code set.
+
+The code table ships with the app (data/icd10cm_2026.tsv.gz: CDC/NCHS
+ICD-10-CM, public domain). It is compiled once into a flat binary index:
+
+    header      magic, count, category count
+    categories  n x (4 + 4) bytes  3-character category -> first key position
+    keys        count x 8 bytes    codes without the dot, NUL-padded, sorted
+    flags       count x 1 byte     1 = billable (leaf) code
+    offsets     (count + 1) x u32  into the description blob
+    blob        UTF-8 descriptions
+
+and read through mmap, so every gunicorn worker maps the same page-cache
+pages instead of holding its own copy of ~98k codes. Only the small
+category directory (~1.9k entries) is loaded into each process; a lookup
+is a binary search within one category's slice of the key array.
+
+The index is built at deploy time (`manage.py build_icd10_index`) into
+settings.ICD10_INDEX_PATH, never inside a request. A missing or stale
+index fails worker startup (lamar_project/wsgi.py, asgi.py) and the
+careplans.E001 system check.
+"""
+import bisect
+import gzip
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+
+SOURCE_PATH = Path(__file__).resolve().parent / "data" / "icd10cm_2026.tsv.gz"
+MAGIC = b"ICD10CM2"
+KEY_WIDTH = 8  # longest code is 7 characters without the dot
+
+_HEADER = struct.Struct("<8sII")
+_CATEGORY = struct.Struct("<4sI")
+_SPAN = struct.Struct("<II")
+
+
+@dataclass(frozen=True)
+class Icd10Code:
+    code: str
+    description: str
+    billable: bool
+
+
+def normalize(code):
+    return (code or "").strip().upper().replace(".", "")
+
+
+def format_code(code):
+    key = normalize(code)
+    return key if len(key) <= 3 else f"{key[:3]}.{key[3:]}"
+
+
+# ---------------------
+# Build
+# ---------------------
+
+def build_index(target, source=SOURCE_PATH):
+    """Compile the code table into the binary index at `target`. Returns the code count."""
+    rows = []
+    with gzip.open(source, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            code, billable, description = line.rstrip("\n").split("\t", 2)
+            rows.append((normalize(code).encode("ascii"), billable == "1", description.encode("utf-8")))
+    rows.sort()
+
+    categories = {}
+    for i, (key, _, _) in enumerate(rows):
+        categories.setdefault(key[:3], i)
+
+    offsets, position = [], 0
+    for _, _, description in rows:
+        offsets.append(position)
+        position += len(description)
+    offsets.append(position)
+
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(rows), len(categories)))
+        f.write(b"".join(_CATEGORY.pack(c, i) for c, i in categories.items()))
+        f.write(b"".join(key.ljust(KEY_WIDTH, b"\0") for key, _, _ in rows))
+        f.write(bytes(billable for _, billable, _ in rows))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(b"".join(description for _, _, description in rows))
+    # Atomic, so a worker never maps a half-written file
+    os.replace(tmp, target)
+    return len(rows)
+
+
+# ---------------------
+# Lookup
+# ---------------------
+
+class _Keys:
+    """The mmapped key array as a sequence, so bisect can search it in place."""
+
+    def __init__(self, buf, start, count):
+        self._buf, self._start, self._count = buf, start, count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        at = self._start + i * KEY_WIDTH
+        return self._buf[at:at + KEY_WIDTH]
+
+
+class Icd10Index:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, n_categories = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a current ICD-10-CM index")
+        starts = [
+            _CATEGORY.unpack_from(self._buf, _HEADER.size + i * _CATEGORY.size)
+            for i in range(n_categories)
+        ]
+        # category -> (lo, hi) slice of the key array
+        bounds = [start for _, start in starts[1:]] + [self.count]
+        self._categories = {
+            key.rstrip(b"\0").decode("ascii"): (start, end)
+            for (key, start), end in zip(starts, bounds)
+        }
+        keys_at = _HEADER.size + n_categories * _CATEGORY.size
+        self._flags_at = keys_at + self.count * KEY_WIDTH
+        self._offsets_at = self._flags_at + self.count
+        self._blob_at = self._offsets_at + (self.count + 1) * 4
+        self._keys = _Keys(self._buf, keys_at, self.count)
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, key):
+        bounds = self._categories.get(key[:3])
+        if bounds is None or len(key) > KEY_WIDTH or not key.isascii():
+            return -1
+        lo, hi = bounds
+        probe = key.encode("ascii").ljust(KEY_WIDTH, b"\0")
+        i = bisect.bisect_left(self._keys, probe, lo, hi)
+        return i if i < hi and self._keys[i] == probe else -1
+
+    def __contains__(self, code):
+        return self._find(normalize(code)) >= 0
+
+    def get(self, code):
+        i = self._find(normalize(code))
+        if i < 0:
+            return None
+        start, end = _SPAN.unpack_from(self._buf, self._offsets_at + i * 4)
+        return Icd10Code(
+            code=format_code(code),
+            description=self._buf[self._blob_at + start:self._blob_at + end].decode("utf-8"),
+            billable=self._buf[self._flags_at + i] == 1,
+        )
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def index_problem(path):
+    """Why the index at `path` can't be used, or None."""
+    if not path.exists():
+        return f"ICD-10-CM index {path} does not exist"
+    if path.stat().st_mtime < SOURCE_PATH.stat().st_mtime:
+        return f"ICD-10-CM index {path} is older than the bundled code table"
+    return None
+
+
+def get_index():
+    """The shared index at settings.ICD10_INDEX_PATH, mapped on first use."""
+    path = Path(settings.ICD10_INDEX_PATH)
+    index = _indexes.get(path)
+    if index is None:
+        with _lock:
+            index = _indexes.get(path)
+            if index is None:
+                problem = index_problem(path)
+                if problem:
+                    raise ImproperlyConfigured(f"{problem}; run `python manage.py build_icd10_index`.")
+                index = _indexes[path] = Icd10Index(path)
+    return index
+
+
+@checks.register()
+def check_index(app_configs, **kwargs):
+    problem = index_problem(Path(settings.ICD10_INDEX_PATH))
+    if problem is None:
+        return []
+    return [
+        checks.Error(
+            f"{problem}.",
+            hint="Run `python manage.py build_icd10_index` (set ICD10_INDEX_PATH to a writable location).",
+            id="careplans.E001",
+        )
+    ]
+
+
+def lookup(code):
+    return get_index().get(code)
+
+
+def unknown_codes(codes):
+    index = get_index()
+    return [code for code in codes if not isinstance(code, str) or code not in index]
+
+
+# ---------------------
+# Validators
+# ---------------------
+
+def validate_icd10_code(value):
+    if value not in get_index():
+        raise ValidationError(
+            "Unknown ICD-10-CM code: %(code)s.", code="unknown_icd10", params={"code": value}
+        )
+
+
+def validate_icd10_list(value):
+    unknown = unknown_codes(value or [])
+    if unknown:
+        raise ValidationError(
+            "Unknown ICD-10-CM code(s): %(codes)s.",
+            code="unknown_icd10",
+            params={"codes": ", ".join(map(str, unknown))},
+        )
@@ -0,0 +1,135 @@
+"""
+Idempotency keys for intake submissions.
+
+The intake form carries a one-time hidden token (API clients may send an
+Idempotency-Key header instead). The first submission claims the key and
+records its outcome; a retry or double-click with the same key is answered
+from that record in one keyed lookup, skipping validation and the LLM call.
+
+A key only ever replays to the session that claimed it, and only for the
+same submission: keys are stored hashed together with a per-session scope,
+next to a fingerprint of the normalized POST payload. Reusing a key for a
+different payload is rejected (422) rather than replayed, so it can neither
+skip creating a new order nor hand back another submission's care plan.
+
+An in-flight claim is a short lease (IDEMPOTENCY_LEASE_SECONDS); only a
+finished submission's record is kept for IDEMPOTENCY_KEY_TTL. A worker that
+dies mid-submission therefore blocks retries of that key only briefly.
+"""
+import hashlib
+import re
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .admission import PLAN_QUEUED
+from .models import IdempotencyKey
+
+FORM_FIELD = "idempotency_key"
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+KEY_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+SESSION_SCOPE = "_idempotency_scope"
+
+# Not part of the submission itself
+_UNFINGERPRINTED = frozenset({FORM_FIELD, "csrfmiddlewaretoken"})
+
+
+def new_key():
+    return secrets.token_urlsafe(24)
+
+
+def session_scope(request):
+    """
+    This session's random scope id, created on first use. Setting it also
+    makes the session persist, so the form page issues the cookie that a
+    retried POST will carry.
+    """
+    scope = request.session.get(SESSION_SCOPE)
+    if scope is None:
+        scope = request.session[SESSION_SCOPE] = secrets.token_hex(16)
+    return scope
+
+
+def key_from_request(request):
+    """The stored (session-scoped, hashed) form of the request's key, or None."""
+    key = request.META.get(HEADER) or request.POST.get(FORM_FIELD, "")
+    key = key.strip()
+    if not KEY_RE.match(key):
+        return None
+    return hashlib.sha256(f"{session_scope(request)}:{key}".encode()).hexdigest()
+
+
+def _normalize(value):
+    return " ".join(value.replace("\r\n", "\n").split())
+
+
+def fingerprint(request):
+    """SHA-256 over the normalized POST fields and uploaded file contents."""
+    digest = hashlib.sha256()
+    for name in sorted(set(request.POST) - _UNFINGERPRINTED):
+        for value in request.POST.getlist(name):
+            digest.update(f"{name}\0{_normalize(value)}\0".encode())
+    for name in sorted(request.FILES):
+        for upload in request.FILES.getlist(name):
+            digest.update(f"{name}\0".encode())
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            upload.seek(0)
+    return digest.hexdigest()
+
+
+def lookup(key):
+    """The live record for `key` (with order + care plan joined), or None."""
+    return (
+        IdempotencyKey.objects.select_related("order__care_plan")
+        .defer("order__patient_records_text")
+        .filter(key=key, expires_at__gt=timezone.now())
+        .first()
+    )
+
+
+def claim(key, fingerprint):
+    """Lease `key` for a new submission. False if another request holds it."""
+    now = timezone.now()
+    IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def release(key):
+    # Submission failed before producing an outcome; let the key be reused
+    if key:
+        IdempotencyKey.objects.filter(key=key, result__isnull=True).delete()
+
+
+def record(key, order, result):
+    # Done: keep the outcome for replays for the full TTL
+    if key:
+        IdempotencyKey.objects.filter(key=key).update(
+            order=order,
+            result=result,
+            expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+        )
+
+
+def replay(record):
+    """Rebuild the original submission's session messages from its record."""
+    result = dict(record.result)
+    care_plan = getattr(record.order, "care_plan", None) if record.order_id else None
+    if care_plan is not None:
+        result["plan_text"] = care_plan.generated_text
+        result["plan_is_draft"] = care_plan.is_draft
+        if care_plan.generation_deferred:
+            result["plan_queued"] = PLAN_QUEUED
+    return result
@@ -0,0 +1,152 @@
+"""
+Ledger of LLM call attempts (GenerationRun) and the analytics over it.
+
+services._complete records every attempt. The order it belongs to comes
+from attribute(), which scheduler.generation_slot enters around each
+call, so the service functions keep their (text, error, usage)
+signatures. A failed ledger write is logged and never fails the
+generation.
+
+Cost estimates use settings.LLM_PRICES (USD per million tokens, per model).
+"""
+import logging
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import GenerationRun
+
+logger = logging.getLogger(__name__)
+
+_context = ContextVar("careplans_generation", default=None)
+
+
+@contextmanager
+def attribute(order, priority=""):
+    """Attribute LLM calls made inside the block to `order`."""
+    token = _context.set({"order": order, "priority": priority})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def record(template, backend, attempt, started, completion=None, error=None):
+    """Write one GenerationRun for an attempt that began at perf_counter() `started`."""
+    context = _context.get() or {}
+    order = context.get("order")
+    cached = completion.cached_tokens if completion is not None else None
+    try:
+        return GenerationRun.objects.create(
+            order=order,
+            medication_name=order.medication_name if order is not None else "",
+            priority=context.get("priority", ""),
+            backend=type(backend).__name__,
+            model=(completion is not None and completion.model) or getattr(backend, "model", ""),
+            prompt_version=template.key,
+            attempt=attempt,
+            outcome=GenerationRun.OUTCOME_SUCCESS if error is None else GenerationRun.OUTCOME_ERROR,
+            error_type=type(error).__name__ if error is not None else "",
+            latency_ms=round((time.perf_counter() - started) * 1000),
+            prompt_tokens=completion.prompt_tokens if completion is not None else None,
+            completion_tokens=completion.completion_tokens if completion is not None else None,
+            cached_tokens=cached,
+            cache_hit=bool(cached),
+        )
+    except DatabaseError:
+        logger.exception("Could not record LLM generation run")
+        return None
+
+
+# ---------------------
+# Analytics
+# ---------------------
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def _prices(model):
+    # The API reports dated snapshots ("gpt-4o-2024-08-06"): longest prefix wins
+    matches = [name for name in settings.LLM_PRICES if model and model.startswith(name)]
+    return settings.LLM_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    """USD at settings.LLM_PRICES; None for models without a price."""
+    prices = _prices(model)
+    if prices is None:
+        return None
+    uncached = max((prompt_tokens or 0) - (cached_tokens or 0), 0)
+    return (
+        uncached * prices["input"]
+        + (cached_tokens or 0) * prices.get("cached_input", prices["input"])
+        + (completion_tokens or 0) * prices["output"]
+    ) / 1_000_000
+
+
+@dataclass
+class RunSummary:
+    key: str
+    runs: int = 0
+    failures: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    unpriced: int = 0
+    p50_ms: int = None
+    p95_ms: int = None
+
+    @property
+    def failure_rate(self):
+        return self.failures / self.runs if self.runs else 0.0
+
+    @property
+    def cache_rate(self):
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+def summarize(queryset, key):
+    """
+    RunSummary per group, `key` being "day" or "medication". Latency
+    percentiles are computed here rather than in SQL so SQLite and Postgres
+    agree; rows are streamed and only the latencies are held in memory.
+    """
+    columns = [
+        "created_at", "medication_name", "model", "outcome", "attempt", "latency_ms",
+        "prompt_tokens", "cached_tokens", "completion_tokens",
+    ]
+    summaries, latencies = {}, defaultdict(list)
+    for row in queryset.values_list(*columns).iterator(chunk_size=5000):
+        created_at, medication, model, outcome, attempt, latency, prompt, cached, completion = row
+        group = timezone.localdate(created_at).isoformat() if key == "day" else (medication.strip().lower() or "(none)")
+        s = summaries.setdefault(group, RunSummary(group))
+        s.runs += 1
+        s.failures += outcome == GenerationRun.OUTCOME_ERROR
+        s.retries += attempt > 1
+        s.prompt_tokens += prompt or 0
+        s.cached_tokens += cached or 0
+        s.completion_tokens += completion or 0
+        cost = estimate_cost(model, prompt, cached, completion)
+        if cost is None:
+            s.unpriced += outcome == GenerationRun.OUTCOME_SUCCESS
+        else:
+            s.cost += cost
+        latencies[group].append(latency)
+
+    for group, s in summaries.items():
+        values = sorted(latencies.pop(group))
+        s.p50_ms, s.p95_ms = percentile(values, 0.5), percentile(values, 0.95)
+    return sorted(summaries.values(), key=lambda s: s.key)
@@ -0,0 +1,161 @@
+"""
+Pluggable LLM backends, selected by settings.LLM_BACKEND.
+
+Vendor SDKs are imported on first use rather than at module import, so
+manage.py commands, test runs and worker boots that never generate a plan
+don't pay for loading them (the OpenAI SDK pulls in httpx and pydantic).
+"""
+import abc
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+BACKEND_ALIASES = {
+    "openai": "careplans.llm_backends.OpenAIBackend",
+    "openai-async": "careplans.llm_backends.AsyncOpenAIBackend",
+    "stub": "careplans.llm_backends.StubBackend",
+}
+
+
+@dataclass
+class Completion:
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    model: Optional[str] = None
+
+
+class LLMBackend(abc.ABC):
+    requires_api_key = True
+
+    @abc.abstractmethod
+    def complete(self, messages, api_key=None, timeout=None):
+        """
+        Run one chat completion, giving up after `timeout` seconds. Raises on
+        failure; returns a Completion. Exactly one attempt: retries are
+        services._complete's job.
+        """
+
+    def is_retryable(self, exc):
+        """Whether a failed call is worth another attempt (timeouts, dropped connections)."""
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+    async def acomplete(self, messages, api_key=None, timeout=None):
+        return await asyncio.to_thread(self.complete, messages, api_key, timeout)
+
+
+def _int_or_none(value):
+    return value if isinstance(value, int) else None
+
+
+def _completion_from_response(response):
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    model = getattr(response, "model", None)
+    return Completion(
+        # FIX: Access the text via choices[0].message.content
+        text=response.choices[0].message.content,
+        prompt_tokens=_int_or_none(getattr(usage, "prompt_tokens", None)),
+        completion_tokens=_int_or_none(getattr(usage, "completion_tokens", None)),
+        cached_tokens=_int_or_none(getattr(details, "cached_tokens", None)),
+        model=model if isinstance(model, str) else None,
+    )
+
+
+class OpenAIBackend(LLMBackend):
+    model = "gpt-4o"
+    max_tokens = 800  # Standard param for Chat Completions
+    temperature = 0.2
+
+    def __init__(self):
+        self._clients = {}
+
+    def _client(self, api_key):
+        # One client per key: reuses its HTTP connection pool across calls.
+        # The SDK's own retries are off so LLM_MAX_ATTEMPTS is the only policy.
+        if api_key not in self._clients:
+            from openai import OpenAI
+
+            self._clients[api_key] = OpenAI(api_key=api_key, max_retries=0)
+        return self._clients[api_key]
+
+    def _request(self, messages, timeout):
+        # FIX: Changed 'responses.create' to 'chat.completions.create'
+        # FIX: Changed 'input' to 'messages'
+        # FIX: Changed 'max_output_tokens' to 'max_tokens'
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "response_format": {"type": "text"},
+            "timeout": timeout or settings.LLM_TIMEOUT,
+        }
+
+    def complete(self, messages, api_key=None, timeout=None):
+        response = self._client(api_key).chat.completions.create(**self._request(messages, timeout))
+        return _completion_from_response(response)
+
+    def is_retryable(self, exc):
+        # The SDK is loaded by the time a call has failed
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+
+        # APITimeoutError is an APIConnectionError
+        return isinstance(exc, (APIConnectionError, InternalServerError, RateLimitError)) or super().is_retryable(exc)
+
+
+class AsyncOpenAIBackend(OpenAIBackend):
+    """AsyncOpenAI for async callers; sync callers are bridged with async_to_sync."""
+
+    def _client(self, api_key):
+        # AsyncOpenAI's connection pool is tied to an event loop, so one
+        # client is created per call rather than cached
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    async def acomplete(self, messages, api_key=None, timeout=None):
+        async with self._client(api_key) as client:
+            response = await client.chat.completions.create(**self._request(messages, timeout))
+        return _completion_from_response(response)
+
+    def complete(self, messages, api_key=None, timeout=None):
+        return async_to_sync(self.acomplete)(messages, api_key, timeout)
+
+
+class StubBackend(LLMBackend):
+    """Offline backend for local development: a canned plan, no network, no key."""
+
+    requires_api_key = False
+
+    def complete(self, messages, api_key=None, timeout=None):
+        prompt = "".join(m["content"] for m in messages)
+        text = (
+            "1. Problem List / Drug Therapy Problems (DTPs)\n- [stub] Review clinical notes.\n"
+            "2. SMART Goals\n- [stub]\n"
+            "3. Pharmacist Interventions\n- [stub]\n"
+            "4. Monitoring Plan & Lab Schedule\n- [stub]\n"
+        )
+        return Completion(
+            text=text,
+            prompt_tokens=max(1, len(prompt) // 4),
+            completion_tokens=max(1, len(text) // 4),
+            cached_tokens=0,
+            model="stub",
+        )
+
+
+_backends = {}
+
+
+def get_backend():
+    """The configured backend; one shared instance per backend class path."""
+    path = BACKEND_ALIASES.get(settings.LLM_BACKEND, settings.LLM_BACKEND)
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
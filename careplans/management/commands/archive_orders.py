@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from careplans import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders dated before the retention window (ORDER_RETENTION_DAYS) into the "
+        "compressed order archive, with their care plans and plan history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help="Only archive orders dated before this day (YYYY-MM-DD); capped at the retention boundary",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--limit", type=int, help="Archive at most this many orders")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the orders that would move")
+
+    def handle(self, *args, **options):
+        boundary = None
+        if options["before"]:
+            boundary = parse_date(options["before"])
+            if boundary is None:
+                raise CommandError("--before must be YYYY-MM-DD.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if options["dry_run"]:
+            count = archive.archivable_orders(boundary).count()
+            if options["limit"] is not None:
+                count = min(count, options["limit"])
+            self.stdout.write(f"Would archive {count} order(s) dated before {archive.archive_cutoff(boundary)}.")
+            return
+
+        moved = archive.archive_orders(boundary, batch_size=options["batch_size"], limit=options["limit"])
+        self.stdout.write(f"Archived {moved} order(s).")
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from careplans import icd10
+
+
+class Command(BaseCommand):
+    help = "Compile the bundled ICD-10-CM code table into the memory-mapped lookup index."
+    # Runs at deploy time, before the index exists for careplans.E001 to find
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        path = settings.ICD10_INDEX_PATH
+        count = icd10.build_index(path)
+        self.stdout.write(f"Wrote {count} ICD-10-CM codes to {path}.")
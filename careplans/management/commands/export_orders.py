@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from careplans import exports
+from careplans.forms import ExportFilterForm
+from careplans.routers import replica_reads
+
+
+class Command(BaseCommand):
+    help = "Stream orders + care plans as CSV/NDJSON in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--start", help="Earliest order_date (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Latest order_date (YYYY-MM-DD)")
+        parser.add_argument(
+            "--flag", default="", choices=[c for c, _ in ExportFilterForm.FLAG_CHOICES]
+        )
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output on the fly")
+        parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=exports.DEFAULT_CHUNK_SIZE)
+
+    @replica_reads()
+    def handle(self, *args, **options):
+        form = ExportFilterForm(data={
+            "format": options["format"],
+            "start": options["start"],
+            "end": options["end"],
+            "flag": options["flag"],
+            "gzip": options["gzip"],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        cd = form.cleaned_data
+        qs = exports.export_queryset(cd["start"], cd["end"], cd["flag"])
+        stream = exports.export_stream(
+            exports.iter_rows(qs, options["chunk_size"]), cd["format"], cd["gzip"]
+        )
+
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                for chunk in stream:
+                    fh.write(chunk)
+        else:
+            out = sys.stdout.buffer
+            for chunk in stream:
+                out.write(chunk)
+            out.flush()
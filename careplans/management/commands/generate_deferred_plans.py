@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from careplans import drafts, pdfs, regeneration, similarity
+from careplans.models import CarePlan, CarePlanVersion, Order
+
+# Another run (overlapping cron, or a manual one) got to the order first
+SKIPPED = object()
+
+
+def _claim(order):
+    # Conditional UPDATE: only one run sees rowcount 1 for a deferred plan,
+    # so overlapping runs never generate (and pay for) the same order twice.
+    # A run killed mid-generation leaves its order a plain draft, which the
+    # regenerate endpoint still replaces.
+    return CarePlan.objects.filter(order=order, generation_deferred=True).update(generation_deferred=False) == 1
+
+
+def _release(order):
+    # Generation failed: defer the draft again so a later run retries it
+    # (not after an unreadable notes PDF, which no retry fixes)
+    CarePlan.objects.filter(order=order, is_draft=True, order__notes_pdf_error="").update(generation_deferred=True)
+
+
+def _read_notes(order):
+    """
+    Extract the order's uploaded notes PDF into patient_records_text and
+    delete the file. Returns None, or an error message; the order then keeps
+    its draft plan, with notes_pdf_error shown on it.
+    """
+    try:
+        extracted = pdfs.extract_path(order.notes_pdf.path)
+        if not extracted.text:
+            raise pdfs.PdfError(pdfs.NO_TEXT)
+    except pdfs.PdfError as e:
+        error = str(e)
+    else:
+        error = None
+
+    pdf_name = order.notes_pdf.name
+    order.notes_pdf = ""
+    with transaction.atomic():
+        if error is None:
+            order.patient_records_text = extracted.text
+            Order.objects.filter(pk=order.pk).update(patient_records_text=extracted.text, notes_pdf="")
+            similarity.index_order(order)
+        else:
+            order.notes_pdf_error = error
+            Order.objects.filter(pk=order.pk).update(notes_pdf_error=error, notes_pdf="")
+            # A new version, so pollers of the plan see the error
+            regeneration.save_care_plan(order, drafts.render_draft(order), mode=CarePlanVersion.MODE_DRAFT)
+    Order._meta.get_field("notes_pdf").storage.delete(pdf_name)
+    return error
+
+
+def _generate(order):
+    """Returns an error message, SKIPPED, or None once the order has its LLM plan."""
+    if not _claim(order):
+        return SKIPPED
+    error = "Deferred generation failed."
+    try:
+        # Notes uploaded as a PDF are read here, not in the intake request
+        if order.notes_pdf:
+            notes_error = _read_notes(order)
+            if notes_error:
+                return notes_error
+        if regeneration.reuse_similar_plan(order, live=False) is not None:
+            error = None
+        else:
+            _, error = regeneration.regenerate(order, order.patient_records_text, live=False)
+    finally:
+        if error:
+            _release(order)
+    return error
+
+
+def _generate_in_thread(order):
+    try:
+        return _generate(order)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate LLM care plans for orders whose generation intake deferred under load. "
+        "Oldest first; run from cron or a loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Concurrent generations (default: LLM_MAX_CONCURRENCY).",
+        )
+
+    def handle(self, *args, **options):
+        orders = list(
+            Order.objects.filter(care_plan__generation_deferred=True)
+            .order_by("created_at", "id")[:options["limit"]]
+        )
+        workers = options["workers"] or settings.LLM_MAX_CONCURRENCY
+        if workers > 1:
+            # Backlog class: the scheduler caps these at SCHEDULER_BACKLOG_SHARE
+            # of this process's slots while live generations are active
+            with ThreadPoolExecutor(workers) as pool:
+                errors = list(pool.map(_generate_in_thread, orders))
+        else:
+            errors = [_generate(order) for order in orders]
+
+        skipped = sum(1 for e in errors if e is SKIPPED)
+        failed = [e for e in errors if e and e is not SKIPPED]
+        self.stdout.write(
+            f"Generated {len(orders) - skipped - len(failed)} deferred plan(s), {len(failed)} failed."
+            + (f" {skipped} already taken by another run." if skipped else "")
+        )
+        for error in sorted(set(failed)):
+            self.stderr.write(error)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from careplans.models import Order
+from careplans.similarity import index_orders
+
+
+class Command(BaseCommand):
+    help = "Backfill near-duplicate signatures and LSH bands for orders that have none."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = index_orders(Order.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(f"Indexed {count} order(s).")
@@ -0,0 +1,73 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from careplans import ledger
+from careplans.models import GenerationRun
+from careplans.routers import replica_reads
+
+
+def _day(value, option):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"--{option} must be YYYY-MM-DD.")
+    return day
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Command(BaseCommand):
+    help = "LLM latency (p50/p95), token spend, estimated cost and failure rates per day and per medication."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Look back this many days (default 30)")
+        parser.add_argument("--start", help="First day (YYYY-MM-DD); overrides --days")
+        parser.add_argument("--end", help="Last day, inclusive (YYYY-MM-DD)")
+        parser.add_argument("--by", choices=["day", "medication", "both"], default="both")
+
+    @replica_reads()
+    def handle(self, *args, **options):
+        if options["start"]:
+            start = _day(options["start"], "start")
+        else:
+            start = timezone.localdate() - timedelta(days=options["days"] - 1)
+        runs = GenerationRun.objects.filter(created_at__gte=_day_start(start))
+        if options["end"]:
+            runs = runs.filter(created_at__lt=_day_start(_day(options["end"], "end") + timedelta(days=1)))
+
+        keys = ["day", "medication"] if options["by"] == "both" else [options["by"]]
+        for i, key in enumerate(keys):
+            if i:
+                self.stdout.write("")
+            self._table(key, ledger.summarize(runs, key))
+
+    def _table(self, key, summaries):
+        self.stdout.write(
+            f"{key:<20}{'runs':>7}{'failed':>8}{'retries':>8}{'p50 ms':>8}{'p95 ms':>8}"
+            f"{'in tok':>10}{'cached':>8}{'out tok':>10}{'est USD':>10}"
+        )
+        if not summaries:
+            self.stdout.write("(no runs)")
+            return
+        total = ledger.RunSummary("total")
+        for s in summaries:
+            self._row(s)
+            for field in ("runs", "failures", "retries", "prompt_tokens", "cached_tokens", "completion_tokens", "unpriced"):
+                setattr(total, field, getattr(total, field) + getattr(s, field))
+            total.cost += s.cost
+        self._row(total)
+        if total.unpriced:
+            self.stdout.write(f"({total.unpriced} successful run(s) on models without a price in LLM_PRICES)")
+
+    def _row(self, s):
+        def ms(value):
+            return "-" if value is None else str(value)
+
+        self.stdout.write(
+            f"{s.key[:19]:<20}{s.runs:>7}{s.failure_rate:>8.1%}{s.retries:>8}{ms(s.p50_ms):>8}{ms(s.p95_ms):>8}"
+            f"{s.prompt_tokens:>10}{s.cache_rate:>8.0%}{s.completion_tokens:>10}{s.cost:>10.2f}"
+        )
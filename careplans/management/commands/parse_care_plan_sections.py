@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from careplans import sections
+from careplans.models import CarePlan
+
+
+class Command(BaseCommand):
+    help = "Backfill parsed sections for care plans saved before sections were stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="Re-parse every plan, not just unparsed ones")
+
+    def handle(self, *args, **options):
+        plans = CarePlan.objects.all() if options["all"] else CarePlan.objects.filter(sections__isnull=True)
+        parsed = failed = 0
+        batch = []
+        for plan in plans.only("id", "generated_text").order_by("pk").iterator(chunk_size=options["batch_size"]):
+            result = sections.parse(plan.generated_text)
+            plan.sections, plan.sections_parse_failed = result.as_json(), result.failed
+            batch.append(plan)
+            failed += result.failed
+            if len(batch) >= options["batch_size"]:
+                CarePlan.objects.bulk_update(batch, ["sections", "sections_parse_failed"])
+                parsed += len(batch)
+                batch = []
+        if batch:
+            CarePlan.objects.bulk_update(batch, ["sections", "sections_parse_failed"])
+            parsed += len(batch)
+        self.stdout.write(f"Parsed {parsed} care plan(s); {failed} failed to parse.")
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from careplans import profiling
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.95 + 0.5) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Summarize the slowest profiled requests (PROFILING_DIR) by stage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Capture directory (default: PROFILING_DIR)")
+        parser.add_argument("--limit", type=int, default=10, help="How many of the slowest requests to list")
+        parser.add_argument("--path", default="", help="Only requests whose path starts with this")
+        parser.add_argument("--functions", type=int, default=0, help="Top N functions of the slowest request")
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or settings.PROFILING_DIR
+        if not directory:
+            raise CommandError("Set PROFILING_DIR or pass --dir.")
+        profiles = [p for p in profiling.load_profiles(directory) if p["path"].startswith(options["path"])]
+        if not profiles:
+            self.stdout.write("No captured requests.")
+            return
+
+        seen = {name for p in profiles for name in p["stages"]}
+        stages = [s for s in profiling.STAGES if s in seen] + sorted(seen - set(profiling.STAGES))
+        profiles.sort(key=lambda p: p["total_ms"], reverse=True)
+
+        # Slowest requests, ms per stage
+        slowest = profiles[:options["limit"]]
+        self.stdout.write(f"Slowest {len(slowest)} of {len(profiles)} captured request(s), ms:")
+        header = f"{'total':>9}" + "".join(f"{s:>10}" for s in stages) + f"{'queries':>9}  request"
+        self.stdout.write(header)
+        for p in slowest:
+            cells = "".join(f"{p['stages'].get(s, {}).get('ms', 0):>10.1f}" for s in stages)
+            self.stdout.write(
+                f"{p['total_ms']:>9.1f}{cells}{len(p['queries']):>9}  "
+                f"{p['method']} {p['path']} {p['status']} ({p['id']})"
+            )
+
+        # Where the time goes across every capture
+        self.stdout.write("")
+        self.stdout.write(f"{'stage':<10}{'mean ms':>10}{'p95 ms':>10}{'share':>8}{'queries':>9}{'sql ms':>9}")
+        grand_total = sum(p["total_ms"] for p in profiles) or 1
+        for s in stages:
+            rows = [p["stages"].get(s, {}) for p in profiles]
+            times = [r.get("ms", 0) for r in rows]
+            self.stdout.write(
+                f"{s:<10}{sum(times) / len(times):>10.1f}{_p95(times):>10.1f}"
+                f"{sum(times) / grand_total:>8.0%}"
+                f"{sum(r.get('queries', 0) for r in rows) / len(rows):>9.1f}"
+                f"{sum(r.get('query_ms', 0) for r in rows) / len(rows):>9.1f}"
+            )
+
+        if options["functions"]:
+            self.stdout.write("")
+            self.stdout.write(f"Top functions of {slowest[0]['id']} (cumulative ms):")
+            for row in slowest[0]["top_functions"][:options["functions"]]:
+                self.stdout.write(f"{row['cum_ms']:>10.1f}  {row['calls']:>7}  {row['function']}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from careplans import assets
+
+
+class Command(BaseCommand):
+    help = "Download the pinned third-party static files (careplans.assets) into careplans/static."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-download files that already exist.")
+
+    def handle(self, *args, **options):
+        pending = assets.VENDOR_ASSETS if options["force"] else assets.missing_assets()
+        for asset in pending:
+            try:
+                assets.fetch(asset)
+            except (OSError, assets.VendorError) as exc:
+                raise CommandError(f"Could not vendor {asset.path}: {exc}")
+            self.stdout.write(f"Wrote {asset.path} ({asset.integrity}).")
+        self.stdout.write(f"{len(assets.VENDOR_ASSETS) - len(assets.missing_assets())}/{len(assets.VENDOR_ASSETS)} vendored files present.")
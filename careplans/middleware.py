@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import reverse
+
+from . import admission, profiling, routers
+
+STICKY_SESSION_KEY = "_db_primary_until"
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica routing: once a request writes careplans
+    data, the session reads from the primary until the sticky window passes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, "session", None)
+        pinned = session is not None and session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+        with routers.request_routing(pinned) as state:
+            response = self.get_response(request)
+
+        window = settings.DATABASE_STICKY_WRITE_SECONDS
+        if state["wrote"] and session is not None and window > 0:
+            session[STICKY_SESSION_KEY] = time.time() + window
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Load shedding for intake POSTs (see careplans.admission). Sets
+    request.admission to ACCEPT or DEFER for the view; REJECT is answered
+    here with a 503 before any session or database work.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._intake_path = None
+
+    def __call__(self, request):
+        if self._intake_path is None:
+            self._intake_path = reverse("intake")
+        if request.method != "POST" or request.path_info != self._intake_path:
+            return self.get_response(request)
+
+        with admission.intake_request():
+            decision, reason = admission.decide(admission.current_load())
+            admission.record_decision(decision, reason)
+            if decision == admission.REJECT:
+                response = HttpResponse(
+                    "The intake service is overloaded. Please retry shortly.",
+                    status=503,
+                    content_type="text/plain",
+                )
+                response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER)
+                return response
+
+            request.admission = decision
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """Opt-in request profiling (see careplans.profiling). Needs request.user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        return profiling.profile_request(request, self.get_response)
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0004_alter_order_additional_diagnoses_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_possible_duplicate_order", True),
+                    ("duplicate_reason__gt", ""),
+                    _connector="OR",
+                ),
+                fields=["-created_at", "-id"],
+                name="order_review_queue_idx",
+            ),
+        ),
+    ]
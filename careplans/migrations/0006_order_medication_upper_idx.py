@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-19 07:25
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0005_order_review_queue_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                django.db.models.functions.text.Upper("medication_name"),
+                name="order_medication_upper_idx",
+            ),
+        ),
+    ]
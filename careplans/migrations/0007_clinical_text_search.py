@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations
+
+# (table, text column) pairs indexed for full-text search. The DDL is frozen
+# here rather than imported from careplans.search so this migration keeps
+# doing the same thing whatever later happens to the app code.
+SOURCES = [
+    ("careplans_order", "patient_records_text"),
+    ("careplans_careplan", "generated_text"),
+]
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column in SOURCES:
+        if vendor == "postgresql":
+            schema_editor.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('english', coalesce({column}, ''))) STORED"
+            )
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_search_gin ON {table} USING gin (search_vector)"
+            )
+        elif vendor == "sqlite":
+            fts = f"{table}_fts"
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{column}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, _ in SOURCES:
+        if vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_gin")
+            schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        elif vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0006_order_medication_upper_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_versions(apps, schema_editor):
+    # Existing plans become version 1 of their order's history
+    CarePlan = apps.get_model("careplans", "CarePlan")
+    CarePlanVersion = apps.get_model("careplans", "CarePlanVersion")
+    batch = []
+    for plan in CarePlan.objects.only("order_id", "generated_text").iterator(
+        chunk_size=1000
+    ):
+        batch.append(
+            CarePlanVersion(
+                order_id=plan.order_id, version=1, generated_text=plan.generated_text
+            )
+        )
+        if len(batch) >= 1000:
+            CarePlanVersion.objects.bulk_create(batch)
+            batch = []
+    CarePlanVersion.objects.bulk_create(batch)
+    CarePlanVersion.objects.update(
+        created_at=models.Subquery(
+            CarePlan.objects.filter(order_id=models.OuterRef("order_id")).values(
+                "created_at"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0008_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CarePlanVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField()),
+                ("generated_text", models.TextField()),
+                (
+                    "mode",
+                    models.CharField(
+                        choices=[
+                            ("full", "Full generation"),
+                            ("incremental", "Incremental update"),
+                        ],
+                        default="full",
+                        max_length=16,
+                    ),
+                ),
+                ("prompt_tokens", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "completion_tokens",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "full_prompt_tokens",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="care_plan_versions",
+                        to="careplans.order",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["order", "-version"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("order", "version"), name="careplan_version_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0009_careplanversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplan",
+            name="cached_tokens",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="careplan",
+            name="prompt_version",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="careplanversion",
+            name="cached_tokens",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="careplanversion",
+            name="prompt_version",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0010_prompt_tracking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplan",
+            name="is_draft",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="careplanversion",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Rules-based draft"),
+                    ("full", "Full generation"),
+                    ("incremental", "Incremental update"),
+                ],
+                default="full",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:30
+
+import careplans.icd10
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0011_careplan_is_draft"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="additional_diagnoses",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                validators=[careplans.icd10.validate_icd10_list],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="primary_diagnosis_icd10",
+            field=models.CharField(
+                max_length=10,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        "^[A-TV-Z][0-9][A-Z0-9](\\.[A-Z0-9]{1,4})?$",
+                        "Invalid ICD-10 format.",
+                    ),
+                    careplans.icd10.validate_icd10_code,
+                ],
+            ),
+        ),
+    ]
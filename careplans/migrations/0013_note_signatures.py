@@ -0,0 +1,83 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0012_icd10_code_validation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplanversion",
+            name="source_order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="careplans.order",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="records_signature",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="careplanversion",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Rules-based draft"),
+                    ("full", "Full generation"),
+                    ("incremental", "Incremental update"),
+                    ("reused", "Reused from a near-duplicate order"),
+                ],
+                default="full",
+                max_length=16,
+            ),
+        ),
+        migrations.CreateModel(
+            name="NoteBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField()),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="note_bands",
+                        to="careplans.order",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="careplans.patient",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["bucket", "patient"], name="noteband_bucket_patient_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0013_note_signatures"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplan",
+            name="generation_deferred",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
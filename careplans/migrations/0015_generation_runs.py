@@ -0,0 +1,80 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0014_care_plan_generation_deferred"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenerationRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "medication_name",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("priority", models.CharField(blank=True, default="", max_length=16)),
+                ("backend", models.CharField(max_length=64)),
+                ("model", models.CharField(blank=True, default="", max_length=64)),
+                ("prompt_version", models.CharField(max_length=64)),
+                ("attempt", models.PositiveSmallIntegerField(default=1)),
+                (
+                    "outcome",
+                    models.CharField(
+                        choices=[("success", "Success"), ("error", "Error")],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "error_type",
+                    models.CharField(blank=True, default="", max_length=128),
+                ),
+                ("latency_ms", models.PositiveIntegerField()),
+                ("prompt_tokens", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "completion_tokens",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                ("cached_tokens", models.PositiveIntegerField(blank=True, null=True)),
+                ("cache_hit", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="generation_runs",
+                        to="careplans.order",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["created_at"], name="genrun_created_idx"),
+                    models.Index(
+                        fields=["medication_name", "created_at"],
+                        name="genrun_med_created_idx",
+                    ),
+                    models.Index(
+                        fields=["outcome", "created_at"],
+                        name="genrun_outcome_created_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
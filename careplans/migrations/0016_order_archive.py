@@ -0,0 +1,132 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:05
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+# Postgres DDL, frozen here (not imported from careplans.archive) so this
+# migration keeps doing the same thing whatever later happens to the app code
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE careplans_orderarchive (
+        id bigint NOT NULL,
+        patient_id bigint NOT NULL
+            REFERENCES careplans_patient (id) DEFERRABLE INITIALLY DEFERRED,
+        provider_id bigint NOT NULL
+            REFERENCES careplans_provider (id) DEFERRABLE INITIALLY DEFERRED,
+        medication_name varchar(200) NOT NULL,
+        order_date date NOT NULL,
+        primary_diagnosis_icd10 varchar(10) NOT NULL,
+        additional_diagnoses jsonb NOT NULL,
+        medication_history jsonb NOT NULL,
+        is_possible_duplicate_order boolean NOT NULL,
+        duplicate_reason text NULL,
+        payload bytea NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, order_date),
+        CONSTRAINT unique_archived_order_constraint
+            UNIQUE (patient_id, medication_name, order_date)
+    ) PARTITION BY RANGE (order_date)
+    """,
+    "CREATE TABLE careplans_orderarchive_default PARTITION OF careplans_orderarchive DEFAULT",
+    "CREATE INDEX orderarchive_duplicate_idx "
+    "ON careplans_orderarchive (patient_id, UPPER(medication_name), order_date)",
+    "CREATE INDEX careplans_orderarchive_provider_id ON careplans_orderarchive (provider_id)",
+]
+
+
+def create_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(apps.get_model("careplans", "OrderArchive"))
+        return
+    for sql in POSTGRES_CREATE:
+        schema_editor.execute(sql)
+
+
+def drop_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.delete_model(apps.get_model("careplans", "OrderArchive"))
+        return
+    # Dropping the parent drops every partition with it
+    schema_editor.execute("DROP TABLE IF EXISTS careplans_orderarchive CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0015_generation_runs"),
+    ]
+
+    operations = [
+        # Postgres needs the table range-partitioned by order_date, which
+        # CreateModel can't express; create_archive_table emits the DDL there
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="OrderArchive",
+                    fields=[
+                        (
+                            "id",
+                            models.BigIntegerField(primary_key=True, serialize=False),
+                        ),
+                        ("medication_name", models.CharField(max_length=200)),
+                        ("order_date", models.DateField()),
+                        ("primary_diagnosis_icd10", models.CharField(max_length=10)),
+                        (
+                            "additional_diagnoses",
+                            models.JSONField(blank=True, default=list),
+                        ),
+                        (
+                            "medication_history",
+                            models.JSONField(blank=True, default=list),
+                        ),
+                        (
+                            "is_possible_duplicate_order",
+                            models.BooleanField(default=False),
+                        ),
+                        ("duplicate_reason", models.TextField(blank=True, null=True)),
+                        ("payload", models.BinaryField()),
+                        ("created_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField(auto_now_add=True)),
+                        (
+                            "patient",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.PROTECT,
+                                related_name="archived_orders",
+                                to="careplans.patient",
+                            ),
+                        ),
+                        (
+                            "provider",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.PROTECT,
+                                related_name="archived_orders",
+                                to="careplans.provider",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                models.F("patient"),
+                                django.db.models.functions.text.Upper(
+                                    "medication_name"
+                                ),
+                                models.F("order_date"),
+                                name="orderarchive_duplicate_idx",
+                            )
+                        ],
+                        "constraints": [
+                            models.UniqueConstraint(
+                                fields=("patient", "medication_name", "order_date"),
+                                name="unique_archived_order_constraint",
+                            )
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
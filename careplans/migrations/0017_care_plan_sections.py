@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:30
+
+from django.db import migrations, models
+
+
+def install_sections_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS careplans_careplan_sections_gin "
+            "ON careplans_careplan USING gin (sections jsonb_path_ops)"
+        )
+
+
+def uninstall_sections_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS careplans_careplan_sections_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0016_order_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplan",
+            name="sections",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="careplan",
+            name="sections_parse_failed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="careplan",
+            index=models.Index(
+                condition=models.Q(("sections_parse_failed", True)),
+                fields=["-id"],
+                name="careplan_sections_failed_idx",
+            ),
+        ),
+        # GIN (jsonb_path_ops) on Postgres for section/term containment queries
+        migrations.RunPython(install_sections_index, uninstall_sections_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0017_care_plan_sections"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="fingerprint",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+def backfill_reused(apps, schema_editor):
+    # Reused plans sent nothing, so their estimate is known; other rows may
+    # hold an API-reported count and are left without one (no savings shown)
+    CarePlanVersion = apps.get_model("careplans", "CarePlanVersion")
+    CarePlanVersion.objects.filter(mode="reused").update(estimated_prompt_tokens=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0018_idempotency_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="careplanversion",
+            name="estimated_prompt_tokens",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_reused, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+import careplans.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("careplans", "0019_careplanversion_estimated_prompt_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="notes_pdf",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                storage=careplans.models.notes_pdf_storage,
+                upload_to=careplans.models.notes_pdf_name,
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="notes_pdf_error",
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+    ]
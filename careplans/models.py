@@ -1,6 +1,14 @@
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Upper
 from django.core.validators import RegexValidator
 
+from .icd10 import validate_icd10_code, validate_icd10_list
+
 # --- P0 Validators ---
 MRN_VALIDATOR = RegexValidator(r"^\d{6}$", "MRN must be exactly 6 digits.")
 NPI_VALIDATOR = RegexValidator(r"^\d{10}$", "NPI must be exactly 10 digits.")
@@ -9,6 +17,19 @@ ICD10_VALIDATOR = RegexValidator(
     "Invalid ICD-10 format."
 )
 
+# Orders needing pharmacist review (soft duplicate or any integrity warning).
+# Shared by the review queue and its partial index so the planner can match them.
+FLAGGED_ORDER_Q = Q(is_possible_duplicate_order=True) | Q(duplicate_reason__gt="")
+
+
+def notes_pdf_storage():
+    return FileSystemStorage(location=settings.PDF_PENDING_DIR)
+
+
+def notes_pdf_name(instance, filename):
+    # Random: the uploaded file's name may identify the patient
+    return f"{uuid.uuid4().hex}.pdf"
+
 
 class Patient(models.Model):
     # MRN = Single Source of Truth
@@ -41,13 +62,26 @@ class Order(models.Model):
     # Required for LLM input
     patient_records_text = models.TextField()
 
+    # Notes uploaded as a PDF wait here, with patient_records_text empty,
+    # until generate_deferred_plans reads them (careplans.pdfs); the file is
+    # deleted once read. notes_pdf_error says why it couldn't be.
+    notes_pdf = models.FileField(
+        upload_to=notes_pdf_name, storage=notes_pdf_storage, blank=True, editable=False
+    )
+    notes_pdf_error = models.CharField(max_length=200, blank=True, editable=False)
+
     # P0-required clinical fields
-    primary_diagnosis_icd10 = models.CharField(max_length=10, validators=[ICD10_VALIDATOR])
+    primary_diagnosis_icd10 = models.CharField(
+        max_length=10, validators=[ICD10_VALIDATOR, validate_icd10_code]
+    )
 
     # Store lists properly (per brief)
-    additional_diagnoses = models.JSONField(default=list, blank=True)
+    additional_diagnoses = models.JSONField(default=list, blank=True, validators=[validate_icd10_list])
     medication_history = models.JSONField(default=list, blank=True)
 
+    # MinHash of patient_records_text (careplans.similarity); bands in NoteBand
+    records_signature = models.BinaryField(null=True, blank=True, editable=False)
+
     # Soft duplicate + provider conflict flags
     is_possible_duplicate_order = models.BooleanField(default=False)
     duplicate_reason = models.TextField(blank=True, null=True)
@@ -62,15 +96,222 @@ class Order(models.Model):
                 name="unique_order_constraint",
             )
         ]
+        indexes = [
+            # Review queue: newest-first keyset scan over flagged orders only
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="order_review_queue_idx",
+                condition=FLAGGED_ORDER_Q,
+            ),
+            # Case-insensitive medication lookups (duplicate checks, admin search)
+            models.Index(Upper("medication_name"), name="order_medication_upper_idx"),
+        ]
 
     def __str__(self):
         return f"Order for {self.patient.mrn} - {self.medication_name} on {self.order_date}"
 
 
+class OrderArchive(models.Model):
+    """
+    Orders past the retention window, moved out of Order by
+    `manage.py archive_orders` (careplans.archive). Range-partitioned by
+    order_date on Postgres (one partition per year), so the primary key is
+    (id, order_date) there. On SQLite it is a plain table. The notes, care
+    plan and plan history are kept as one zlib-compressed JSON payload.
+    """
+
+    # The archived Order's id
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(Patient, on_delete=models.PROTECT, related_name="archived_orders")
+    provider = models.ForeignKey(Provider, on_delete=models.PROTECT, related_name="archived_orders")
+    medication_name = models.CharField(max_length=200)
+    order_date = models.DateField()
+    primary_diagnosis_icd10 = models.CharField(max_length=10)
+    additional_diagnoses = models.JSONField(default=list, blank=True)
+    medication_history = models.JSONField(default=list, blank=True)
+    is_possible_duplicate_order = models.BooleanField(default=False)
+    duplicate_reason = models.TextField(blank=True, null=True)
+    payload = models.BinaryField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Same HARD duplicate rule as Order; intake checks both tables
+            models.UniqueConstraint(
+                fields=["patient", "medication_name", "order_date"],
+                name="unique_archived_order_constraint",
+            )
+        ]
+        indexes = [
+            models.Index(
+                F("patient"), Upper("medication_name"), F("order_date"),
+                name="orderarchive_duplicate_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.pk} - {self.medication_name} on {self.order_date}"
+
+
 class CarePlan(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="care_plan")
     generated_text = models.TextField()
+    # Prompt template key (careplans.prompts) and prefix-cache hits for the
+    # call that produced this text; blank/NULL for plans made before tracking
+    prompt_version = models.CharField(max_length=64, blank=True, default="")
+    cached_tokens = models.PositiveIntegerField(null=True, blank=True)
+    # Rules-based placeholder (careplans.drafts) awaiting the LLM plan
+    is_draft = models.BooleanField(default=False)
+    # Intake shed the LLM call under load (careplans.admission); the draft
+    # stands until `manage.py generate_deferred_plans` replaces it
+    generation_deferred = models.BooleanField(default=False, db_index=True)
+    # The four plan sections parsed from generated_text when it is saved
+    # (careplans.sections); NULL until parsed for plans saved before this
+    sections = models.JSONField(null=True, blank=True, editable=False)
+    # Some of the four section headings couldn't be found in the text
+    sections_parse_failed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-id"],
+                name="careplan_sections_failed_idx",
+                condition=Q(sections_parse_failed=True),
+            ),
+        ]
+
     def __str__(self):
         return f"CarePlan for Order {self.order.id}"
+
+
+class NoteBand(models.Model):
+    """One LSH band bucket of an order's records signature (careplans.similarity)."""
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="note_bands")
+    # Denormalized from order so per-patient lookups stay on this table's index
+    patient = models.ForeignKey(
+        Patient, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["bucket", "patient"], name="noteband_bucket_patient_idx"),
+        ]
+
+
+class CarePlanVersion(models.Model):
+    """
+    Append-only history of an order's care plans. CarePlan holds the current
+    text; each generation or regeneration adds a row here.
+    """
+
+    MODE_DRAFT = "draft"
+    MODE_FULL = "full"
+    MODE_INCREMENTAL = "incremental"
+    MODE_REUSED = "reused"
+    MODE_CHOICES = [
+        (MODE_DRAFT, "Rules-based draft"),
+        (MODE_FULL, "Full generation"),
+        (MODE_INCREMENTAL, "Incremental update"),
+        (MODE_REUSED, "Reused from a near-duplicate order"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="care_plan_versions")
+    version = models.PositiveIntegerField()
+    generated_text = models.TextField()
+    mode = models.CharField(max_length=16, choices=MODE_CHOICES, default=MODE_FULL)
+    # Earlier order whose plan this one was reused or updated from
+    source_order = models.ForeignKey(
+        Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    prompt_version = models.CharField(max_length=64, blank=True, default="")
+    # Input tokens sent (API-reported, else estimated)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    cached_tokens = models.PositiveIntegerField(null=True, blank=True)
+    # Savings compare estimates only: the prompt as sent vs. what a full rerun
+    # over the whole records text would have sent, both by estimate_tokens
+    estimated_prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    full_prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["order", "-version"]
+        constraints = [
+            models.UniqueConstraint(fields=["order", "version"], name="careplan_version_unique"),
+        ]
+
+    @property
+    def tokens_saved(self):
+        if self.estimated_prompt_tokens is None or self.full_prompt_tokens is None:
+            return None
+        return max(self.full_prompt_tokens - self.estimated_prompt_tokens, 0)
+
+    def __str__(self):
+        return f"CarePlan v{self.version} for Order {self.order_id}"
+
+
+class GenerationRun(models.Model):
+    """
+    One LLM call attempt (careplans.ledger): every try, including retries and
+    failures, with its tokens and latency. Kept when the order is deleted.
+    """
+
+    OUTCOME_SUCCESS = "success"
+    OUTCOME_ERROR = "error"
+    OUTCOME_CHOICES = [
+        (OUTCOME_SUCCESS, "Success"),
+        (OUTCOME_ERROR, "Error"),
+    ]
+
+    order = models.ForeignKey(
+        Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="generation_runs"
+    )
+    # Denormalized from order so per-medication reports survive deletes/archiving
+    medication_name = models.CharField(max_length=255, blank=True, default="")
+    priority = models.CharField(max_length=16, blank=True, default="")
+    backend = models.CharField(max_length=64)
+    model = models.CharField(max_length=64, blank=True, default="")
+    prompt_version = models.CharField(max_length=64)
+    attempt = models.PositiveSmallIntegerField(default=1)
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES)
+    # Exception class only: messages may echo request content
+    error_type = models.CharField(max_length=128, blank=True, default="")
+    latency_ms = models.PositiveIntegerField()
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    cached_tokens = models.PositiveIntegerField(null=True, blank=True)
+    cache_hit = models.BooleanField(default=False)  # provider prompt-prefix cache
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="genrun_created_idx"),
+            models.Index(fields=["medication_name", "created_at"], name="genrun_med_created_idx"),
+            models.Index(fields=["outcome", "created_at"], name="genrun_outcome_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.prompt_version} attempt {self.attempt}: {self.outcome}"
+
+
+class IdempotencyKey(models.Model):
+    # One intake submission: SHA-256 of the session scope + the hidden form
+    # token or Idempotency-Key header (careplans.idempotency)
+    key = models.CharField(max_length=64, unique=True)
+    # SHA-256 of the normalized POST payload; a replay must match it
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    order = models.ForeignKey(Order, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+
+    # Messages shown for the original submission; NULL while still in flight
+    result = models.JSONField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Lease end while in flight, then end of the replay window once recorded
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyKey {self.key}"
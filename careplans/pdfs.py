@@ -0,0 +1,230 @@
+"""
+Clinical notes uploaded as a PDF (OrderIntakeForm.patient_records_pdf).
+
+Uploads never sit in web-worker memory: FILE_UPLOAD_HANDLERS streams them
+to a temporary file (BoundedTemporaryFileUploadHandler), which also stops
+writing past PDF_MAX_UPLOAD_BYTES so an oversized packet costs no more disk
+than the limit.
+
+Nothing is extracted in the request. Intake only checks the upload is a PDF,
+moves it to Order.notes_pdf (under PDF_PENDING_DIR) and defers the order's
+generation; `manage.py generate_deferred_plans` extracts the notes and
+then generates the plan.
+
+Text is extracted page by page in a process pool of PDF_WORKERS processes,
+one pool per extraction. Each task opens the file from disk and extracts at
+most PDF_PAGES_PER_TASK pages, so the parsed PDF objects live in a worker
+only for one small range and a worker's memory stays bounded whatever the
+page count. An extraction that overruns PDF_EXTRACT_TIMEOUT is stopped by
+terminating its own pool (a running task can't be cancelled); other
+uploads' extractions, in their own pools, carry on.
+
+Extracted pages are cached (the "pdf_pages" cache) by the file's SHA-256
+and page number, so a packet faxed or uploaded again skips extraction. pypdf only reads a PDF's
+text layer: scanned pages without one come back empty (no OCR).
+"""
+import hashlib
+import logging
+import multiprocessing
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+PAGE_SEPARATOR = "\n\n"
+CACHE_ALIAS = "pdf_pages"
+CACHE_KEY = "careplans:pdfpage:{}:{}"
+_READ_CHUNK = 1024 * 1024
+
+NOTES_QUEUED = (
+    "The order is saved and its PDF notes are being read; the care plan will be generated "
+    "from them. The draft below stands until then."
+)
+NO_TEXT = "No text could be read from the PDF (scanned pages need OCR). Paste the notes instead."
+TOO_SLOW = "Reading the PDF took too long. Paste the notes instead, or upload fewer pages."
+
+
+class PdfError(ValueError):
+    """The upload isn't a readable PDF, or extracting it failed."""
+
+
+@dataclass
+class ExtractedPdf:
+    text: str
+    pages: int
+    empty_pages: int = 0
+    cached_pages: int = 0
+
+
+# ---------------------
+# Upload handling
+# ---------------------
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams each uploaded file to a temporary file, and stops writing once
+    it passes PDF_MAX_UPLOAD_BYTES. The parser still counts the full size,
+    so the form rejects the upload without it ever filling the disk.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) <= settings.PDF_MAX_UPLOAD_BYTES:
+            self.file.write(raw_data)
+
+
+# ---------------------
+# Worker side (no Django here: pool processes don't set it up)
+# ---------------------
+
+def _page_count(path):
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        raise PdfError("The PDF is encrypted.")
+    return len(reader.pages)
+
+
+def _extract_pages(path, start, stop):
+    """Text of pages [start, stop) of the PDF at `path`."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    texts = []
+    for number in range(start, stop):
+        texts.append((reader.pages[number].extract_text() or "").strip())
+    return texts
+
+
+# ---------------------
+# Process pool
+# ---------------------
+
+class _Done:
+    def __init__(self, value=None, error=None):
+        self.value, self.error = value, error
+
+    def get(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _InlinePool:
+    """PDF_WORKERS=0: run tasks in the calling thread (tests, local dev)."""
+
+    def apply_async(self, fn, args):
+        try:
+            return _Done(fn(*args))
+        except Exception as e:
+            return _Done(error=e)
+
+
+@contextmanager
+def _worker_pool():
+    """
+    A process pool for one extraction. It is terminated on the way out,
+    which kills a task still running past the deadline, and only this
+    extraction's workers.
+    """
+    if settings.PDF_WORKERS <= 0:
+        yield _InlinePool()
+        return
+    # spawn, not fork: forking a threaded process (open DB connections,
+    # held locks) into the pool is unsafe
+    pool = multiprocessing.get_context("spawn").Pool(settings.PDF_WORKERS)
+    try:
+        yield pool
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _get(result, deadline):
+    try:
+        return result.get(timeout=max(0, deadline - time.monotonic()))
+    except multiprocessing.TimeoutError:
+        raise PdfError(TOO_SLOW) from None
+
+
+# ---------------------
+# Extraction
+# ---------------------
+
+def is_pdf(uploaded_file):
+    uploaded_file.seek(0)
+    head = uploaded_file.read(len(PDF_MAGIC))
+    uploaded_file.seek(0)
+    return head == PDF_MAGIC
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ranges(numbers, size):
+    """Contiguous runs of the sorted page `numbers`, each at most `size` long."""
+    run = []
+    for number in numbers:
+        if run and (number != run[-1] + 1 or len(run) == size):
+            yield run[0], run[-1] + 1
+            run = []
+        run.append(number)
+    if run:
+        yield run[0], run[-1] + 1
+
+
+def extract_path(path, timeout=None):
+    """ExtractedPdf for the PDF file at `path`, within `timeout` seconds (default PDF_EXTRACT_TIMEOUT)."""
+    deadline = time.monotonic() + (settings.PDF_EXTRACT_TIMEOUT if timeout is None else timeout)
+    digest = sha256_file(path)
+    with _worker_pool() as pool:
+        try:
+            count = _get(pool.apply_async(_page_count, (path,)), deadline)
+        except PdfError:
+            raise
+        except Exception as e:
+            raise PdfError("The file could not be read as a PDF.") from e
+        if count > settings.PDF_MAX_PAGES:
+            raise PdfError(f"The PDF has {count} pages; at most {settings.PDF_MAX_PAGES} can be uploaded.")
+
+        cache = caches[CACHE_ALIAS]
+        keys = [CACHE_KEY.format(digest, number) for number in range(count)]
+        texts = [None] * count
+        cached = cache.get_many(keys)
+        for number, key in enumerate(keys):
+            texts[number] = cached.get(key)
+
+        missing = [number for number, text in enumerate(texts) if text is None]
+        results = {
+            start: pool.apply_async(_extract_pages, (path, start, stop))
+            for start, stop in _ranges(missing, max(1, settings.PDF_PAGES_PER_TASK))
+        }
+        for start, result in results.items():
+            try:
+                pages = _get(result, deadline)
+            except PdfError:
+                raise
+            except Exception as e:
+                logger.warning(f"PDF extraction failed: {type(e).__name__}")
+                raise PdfError("The PDF could not be read.") from e
+            texts[start:start + len(pages)] = pages
+            cache.set_many({keys[start + i]: text for i, text in enumerate(pages)})
+
+    return ExtractedPdf(
+        text=PAGE_SEPARATOR.join(text for text in texts if text),
+        pages=count,
+        empty_pages=sum(1 for text in texts if not text),
+        cached_pages=len(cached),
+    )
+
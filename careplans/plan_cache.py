@@ -0,0 +1,107 @@
+"""
+Cheap re-fetching of an order's current care plan (views.care_plan_fragment).
+
+Two cache entries per order:
+
+  - the plan state, (version, modified): the latest CarePlanVersion number
+    and when it was saved, read from the primary on a miss. It gives the
+    response's ETag and Last-Modified, so a poll whose If-None-Match still
+    matches gets a 304 before any care plan query or template rendering.
+    save_care_plan publishes it when a new version commits. It expires
+    after CARE_PLAN_STATE_TTL, which bounds how stale another process's
+    copy can be while the cache is per-process (LocMemCache). A shared
+    cache backend removes that window.
+  - the rendered fragment, keyed by order and version. A version's plan
+    never changes, so these are never invalidated, only left to expire.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.template.loader import render_to_string
+
+from .models import CarePlan, CarePlanVersion
+from .routers import primary_only
+
+STATE_KEY = "careplans:plan:{}"
+FRAGMENT_KEY = "careplans:plan-html:{}:{}"
+TEMPLATE = "careplans/_care_plan.html"
+
+
+@dataclass(frozen=True)
+class PlanState:
+    order_id: int
+    version: int
+    modified: datetime
+
+    @property
+    def etag(self):
+        return f'"plan-{self.order_id}-v{self.version}"'
+
+
+def _store(state):
+    cache.set(STATE_KEY.format(state.order_id), (state.version, state.modified), settings.CARE_PLAN_STATE_TTL)
+
+
+def publish(version):
+    """Make a just-committed CarePlanVersion the order's cached plan state."""
+    _store(PlanState(version.order_id, version.version, version.created_at))
+
+
+def plan_state(order_id):
+    """The order's PlanState, from the cache when possible; None without a plan."""
+    cached = cache.get(STATE_KEY.format(order_id))
+    if cached is not None:
+        return PlanState(order_id, *cached)
+    # Cached for every poller: read from the primary, never a lagging replica
+    with primary_only():
+        row = (
+            CarePlanVersion.objects.filter(order_id=order_id)
+            .order_by("-version")
+            .values_list("version", "created_at")
+            .first()
+        )
+    if row is None:
+        return None
+    state = PlanState(order_id, *row)
+    _store(state)
+    return state
+
+
+def render_fragment(order_id, state):
+    """
+    (html, state) for the order's plan, read from the replica inside
+    replica_reads(). `state` comes back corrected when the cached one was
+    behind the database, or a lagging replica behind the cache, so the
+    caller's ETag always matches the body. (None, None) if the plan is gone
+    (order deleted or archived since the state was cached).
+    """
+    html = cache.get(FRAGMENT_KEY.format(order_id, state.version))
+    if html is not None:
+        return html, state
+
+    # Plan and version number from one statement, so they always agree
+    latest = CarePlanVersion.objects.filter(order_id=OuterRef("order_id")).order_by("-version")
+    plan = (
+        CarePlan.objects.select_related("order")
+        .annotate(
+            version=Subquery(latest.values("version")[:1]),
+            modified=Subquery(latest.values("created_at")[:1]),
+        )
+        .filter(order_id=order_id)
+        .first()
+    )
+    if plan is None or plan.version is None:
+        cache.delete(STATE_KEY.format(order_id))
+        return None, None
+    if plan.version != state.version:
+        behind = plan.version < state.version
+        state = PlanState(order_id, plan.version, plan.modified)
+        # A replica behind the published state must not roll the cache back
+        if not behind:
+            _store(state)
+    html = render_to_string(TEMPLATE, {"plan": plan, "order": plan.order, "version": plan.version})
+    cache.set(FRAGMENT_KEY.format(order_id, plan.version), html, settings.CARE_PLAN_FRAGMENT_TTL)
+    return html, state
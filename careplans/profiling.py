@@ -0,0 +1,184 @@
+"""
+Opt-in per-request profiling.
+
+ProfilingMiddleware profiles a request when PROFILING_DIR is set and
+either a staff user sends `X-Profile: 1` or the request is sampled at
+PROFILING_SAMPLE_RATE. For a profiled request it records:
+
+  - wall time per stage. Views mark stages with `with profiling.stage(...)`,
+    and time outside any stage counts as "other". Stages are exclusive, so
+    a nested stage's time is not charged to its parent as well.
+  - every SQL query, tagged with its stage and alias
+  - a cProfile of the request's thread
+
+The output is <id>.json (summary, stages, queries, top functions) plus
+<id>.prof (pstats, for snakeviz and friends). `manage.py profile_report`
+summarizes the slowest captures by stage.
+
+Nothing from the request body, headers or query string is written.
+Queries keep their placeholders; any literal is replaced by '?'. The
+profile holds only code locations. Captures can therefore leave the PHI
+boundary.
+"""
+import cProfile
+import json
+import pstats
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+HEADER = "HTTP_X_PROFILE"
+RESPONSE_HEADER = "X-Profile-Id"
+OTHER = "other"
+# Stages marked on the intake path, in request order (report column order)
+STAGES = ("clean", "pdf", "save", "draft", "reuse", "queue", "llm", "save_plan", "render", OTHER)
+TOP_FUNCTIONS = 25
+
+_current = ContextVar("careplans_profile", default=None)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def scrub_sql(sql):
+    return _NUMBER_RE.sub("?", _STRING_RE.sub("'?'", sql))
+
+
+class RequestProfile:
+    def __init__(self):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.stages = defaultdict(float)
+        self.queries = []
+        self.current = OTHER
+        self._start = self._mark = time.perf_counter()
+
+    def switch(self, name):
+        """Charge the time since the last switch to the current stage; enter `name`."""
+        now = time.perf_counter()
+        self.stages[self.current] += now - self._mark
+        self._mark = now
+        previous, self.current = self.current, name
+        return previous
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def log_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "stage": self.current,
+                "alias": context["connection"].alias,
+                "sql": scrub_sql(sql),
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+@contextmanager
+def stage(name):
+    """Attribute the enclosed time and queries to `name` (no-op unless profiling)."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    previous = profile.switch(name)
+    try:
+        yield
+    finally:
+        profile.switch(previous)
+
+
+def should_profile(request):
+    if not settings.PROFILING_DIR:
+        return False
+    user = getattr(request, "user", None)
+    if request.META.get(HEADER) == "1" and user is not None and user.is_staff:
+        return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, calls, _, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{filename}:{line}({func})", "calls": calls, "cum_ms": round(cumtime * 1000, 3)})
+    rows.sort(key=lambda r: r["cum_ms"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def write_profile(profile, profiler, request, response):
+    profile.switch(OTHER)
+    total = profile.elapsed()
+    by_stage = {}
+    for name, seconds in profile.stages.items():
+        queries = [q for q in profile.queries if q["stage"] == name]
+        by_stage[name] = {
+            "ms": round(seconds * 1000, 3),
+            "queries": len(queries),
+            "query_ms": round(sum(q["ms"] for q in queries), 3),
+        }
+
+    target = Path(settings.PROFILING_DIR)
+    target.mkdir(parents=True, exist_ok=True)
+    if profiler is not None:
+        profiler.dump_stats(target / f"{profile.id}.prof")
+    summary = {
+        "id": profile.id,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "total_ms": round(total * 1000, 3),
+        "stages": by_stage,
+        "queries": profile.queries,
+        "top_functions": _top_functions(profiler) if profiler is not None else [],
+    }
+    (target / f"{profile.id}.json").write_text(json.dumps(summary, indent=1))
+    return summary
+
+
+def profile_request(request, get_response):
+    """Run get_response(request) under the profiler and write the capture."""
+    profile = RequestProfile()
+    profiler = cProfile.Profile()
+    token = _current.set(profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile.log_query))
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another thread is being profiled (one tool at a time on
+                # 3.12+): keep the stage timings and queries, skip cProfile
+                profiler = None
+            try:
+                response = get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        _current.reset(token)
+    write_profile(profile, profiler, request, response)
+    response[RESPONSE_HEADER] = profile.id
+    return response
+
+
+def load_profiles(directory=None):
+    """Every captured summary in PROFILING_DIR (or `directory`)."""
+    directory = Path(directory or settings.PROFILING_DIR)
+    profiles = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
@@ -0,0 +1,146 @@
+"""
+Versioned prompt templates for the care plan LLM calls.
+
+Each template is laid out so that everything static (the system prompt,
+extraction/output instructions) comes first and is byte-identical on every
+call; the per-order values (medication, records, previous plan) only appear
+in the final user message. That keeps a long common prefix for the
+provider's prompt caching. Templates are compiled once, at import, and the
+template key ("care_plan@v2") is recorded on each CarePlan it produces.
+
+To change a prompt, register a new version rather than editing one in place.
+settings.PROMPT_VERSIONS can pin a name to an older version.
+"""
+from dataclasses import dataclass, field
+from string import Template
+
+from django.conf import settings
+
+CARE_PLAN = "care_plan"
+CARE_PLAN_UPDATE = "care_plan_update"
+
+
+class UnknownPrompt(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    system: str
+    user: str
+    _compiled: Template = field(init=False, repr=False, compare=False)
+    _system_message: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        compiled = Template(self.user)
+        if not compiled.is_valid():
+            raise ValueError(f"Invalid placeholder in prompt {self.key}")
+        if "$" in self.system:
+            # The static prefix must not vary between calls
+            raise ValueError(f"Prompt {self.key}: variables belong in the user message")
+        object.__setattr__(self, "_compiled", compiled)
+        object.__setattr__(self, "_system_message", {"role": "system", "content": self.system})
+
+    @property
+    def key(self):
+        return f"{self.name}@v{self.version}"
+
+    @property
+    def variables(self):
+        return frozenset(self._compiled.get_identifiers())
+
+    def render(self, **values):
+        """Chat messages for this template. Raises KeyError on a missing variable."""
+        return [
+            self._system_message,
+            {"role": "user", "content": self._compiled.substitute(values)},
+        ]
+
+
+_REGISTRY = {}
+
+
+def register(template):
+    if (template.name, template.version) in _REGISTRY:
+        raise ValueError(f"Prompt {template.key} is already registered")
+    _REGISTRY[(template.name, template.version)] = template
+    return template
+
+
+def get_template(name, version=None):
+    """The pinned (settings.PROMPT_VERSIONS) or latest version of `name`."""
+    if version is None:
+        version = getattr(settings, "PROMPT_VERSIONS", {}).get(name)
+    if version is None:
+        versions = [v for (n, v) in _REGISTRY if n == name]
+        if not versions:
+            raise UnknownPrompt(name)
+        version = max(versions)
+    try:
+        return _REGISTRY[(name, version)]
+    except KeyError:
+        raise UnknownPrompt(f"{name}@v{version}") from None
+
+
+# ---------------------
+# Templates
+# ---------------------
+
+# PRESERVED: Your high-detail clinical prompts
+_PHARMACIST_ROLE = (
+    "You are a Senior Clinical Pharmacist at a specialty pharmacy. "
+    "Your task is to transform unstructured clinical notes into a structured Pharmacist Care Plan. "
+    "CRITICAL RULE: You must extract the patient's Date of Birth (DOB) and ensure it is formatted as YYYY-MM-DD. "
+    "If the DOB is invalid or missing, explicitly flag this in the Problem List."
+)
+
+_TEMPLATE_REFERENCE = """
+### INPUT TEMPLATE REFERENCE
+Follow this structure when extracting data:
+- Name, MRN, DOB (YYYY-MM-DD)
+- Primary/Secondary Diagnoses (ICD-10 when available)
+- Medication History & Home Meds
+- Clinical Status & Vitals
+
+### OUTPUT TEMPLATE REQUIREMENTS
+Produce exactly these sections:
+1. Problem List / Drug Therapy Problems (DTPs)
+2. SMART Goals (Primary, Safety, and Process goals)
+3. Pharmacist Interventions (Dosing, Premeds, Titration, Hydration, Interactions)
+4. Monitoring Plan & Lab Schedule
+"""
+
+# v1 was the original inline f-string, with the medication name in the middle
+register(PromptTemplate(
+    name=CARE_PLAN,
+    version=2,
+    system=_PHARMACIST_ROLE + "\n" + _TEMPLATE_REFERENCE,
+    user="""### PATIENT RECORDS TO PROCESS
+Medication Requested: $medication_name
+
+Records:
+$patient_records_text
+""",
+))
+
+register(PromptTemplate(
+    name=CARE_PLAN_UPDATE,
+    version=1,
+    system=_PHARMACIST_ROLE + "\n" + _TEMPLATE_REFERENCE + """
+### TASK
+You will be given the current Pharmacist Care Plan and the changes made to
+the patient's records since it was written. Revise the care plan to reflect
+the changes. Keep every section that is unaffected as it is and return the
+complete updated plan with the same four sections.
+""",
+    user="""Medication Requested: $medication_name
+
+### CURRENT CARE PLAN
+$previous_plan
+
+### CHANGES TO PATIENT RECORDS
+$records_delta
+""",
+))
@@ -0,0 +1,241 @@
+"""
+Care plan history and incremental regeneration.
+
+CarePlan is the order's current plan; CarePlanVersion keeps every plan ever
+generated for it. When the records text changes, only a line diff against
+the stored text is sent to the model together with the previous plan, and
+each version records how many input tokens that took versus a full rerun.
+"""
+import difflib
+
+from django.db import transaction
+from django.db.models import Max
+
+from . import plan_cache, prompts, scheduler, sections, similarity
+from .models import CarePlan, CarePlanVersion, Order
+from .services import generate_care_plan_from_llm, update_care_plan_from_llm
+
+NO_CHANGES = "The patient records are unchanged; there is nothing to regenerate."
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose. Used for the full-rerun
+    # baseline, and for sent tokens when the API reports no usage.
+    return max(1, len(text) // 4)
+
+
+def _prompt_tokens(name, **variables):
+    messages = prompts.get_template(name).render(**variables)
+    return estimate_tokens("".join(m["content"] for m in messages))
+
+
+def full_prompt_tokens(records_text, medication_name):
+    return _prompt_tokens(
+        prompts.CARE_PLAN, patient_records_text=records_text, medication_name=medication_name
+    )
+
+
+def records_delta(old, new):
+    """A compact 'Added/Removed' description of how `new` differs from `old`."""
+    old = old.rstrip()
+    # The common case: notes or labs appended to the end. Only when the
+    # addition starts on a new line, though: "Cr 1.4" -> "Cr 1.45" is an
+    # edited line, not an added "5", so that goes through the line diff.
+    tail = new[len(old):] if new.startswith(old) else None
+    if tail is not None and (not old or not tail.split("\n", 1)[0].strip()):
+        appended = tail.strip()
+        return f"Added:\n{appended}" if appended else ""
+
+    added, removed = [], []
+    for line in difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0):
+        if line.startswith(("---", "+++", "@@")):
+            continue
+        if line.startswith("+") and line[1:].strip():
+            added.append(line[1:])
+        elif line.startswith("-") and line[1:].strip():
+            removed.append(line[1:])
+
+    parts = []
+    if added:
+        parts.append("Added:\n" + "\n".join(added))
+    if removed:
+        parts.append("Removed:\n" + "\n".join(removed))
+    return "\n\n".join(parts)
+
+
+def _codes(values):
+    return sorted({str(v).strip().upper() for v in values or [] if str(v).strip()})
+
+
+def _entries(values):
+    return sorted({" ".join(str(v).split()).lower() for v in values or [] if str(v).strip()})
+
+
+def _listing(values):
+    return "; ".join(str(v) for v in values or []) or "none"
+
+
+def fields_delta(old, new):
+    """
+    How `new`'s structured clinical fields (primary ICD-10, additional
+    diagnoses, medication history) differ from `old`'s, in the same terse
+    register as records_delta. "" when they match.
+    """
+    changes = []
+    old_primary = old.primary_diagnosis_icd10.strip().upper()
+    new_primary = new.primary_diagnosis_icd10.strip().upper()
+    if old_primary != new_primary:
+        changes.append(f"Primary diagnosis: {new_primary} (was {old_primary})")
+    for label, normalize, attr in (
+        ("Additional diagnoses", _codes, "additional_diagnoses"),
+        ("Medication history", _entries, "medication_history"),
+    ):
+        before, after = normalize(getattr(old, attr)), normalize(getattr(new, attr))
+        if before != after:
+            changes.append(f"{label}: {_listing(getattr(new, attr))} (was {_listing(getattr(old, attr))})")
+    return "Changed fields:\n" + "\n".join(changes) if changes else ""
+
+
+def save_care_plan(order, text, usage=None, deferred=False, **version_fields):
+    """
+    Make `text` the order's current care plan and append it to the history.
+    Token counts reported in `usage` override estimates passed in version_fields;
+    the estimated prompt_tokens is kept as estimated_prompt_tokens, so savings
+    compare it with the (also estimated) full_prompt_tokens.
+    `deferred` marks a draft whose LLM generation was shed under load.
+    """
+    usage = usage or {}
+    tracking = {
+        "prompt_version": usage.get("prompt_version") or "",
+        "cached_tokens": usage.get("cached_tokens"),
+    }
+    is_draft = version_fields.get("mode") == CarePlanVersion.MODE_DRAFT
+    # Parsed once here so reads never re-parse the text
+    parsed = sections.parse(text)
+    version_fields.setdefault("estimated_prompt_tokens", version_fields.get("prompt_tokens"))
+    for name in ("prompt_tokens", "completion_tokens"):
+        if usage.get(name) is not None:
+            version_fields[name] = usage[name]
+
+    with transaction.atomic():
+        # Serialize concurrent saves for one order so version numbers don't collide
+        Order.objects.select_for_update().filter(pk=order.pk).values_list("pk").first()
+        last = order.care_plan_versions.aggregate(last=Max("version"))["last"] or 0
+        version = CarePlanVersion.objects.create(
+            order=order, version=last + 1, generated_text=text, **tracking, **version_fields
+        )
+        CarePlan.objects.update_or_create(
+            order=order,
+            defaults={
+                "generated_text": text,
+                "is_draft": is_draft,
+                "generation_deferred": deferred,
+                "sections": parsed.as_json(),
+                "sections_parse_failed": parsed.failed,
+                **tracking,
+            },
+        )
+        # New ETag for polling clients once the version is visible
+        transaction.on_commit(lambda: plan_cache.publish(version))
+    return version
+
+
+def regenerate(order, new_records_text, live=True):
+    """
+    Regenerate the order's care plan for updated records text.
+    Returns (CarePlanVersion, error). With no current plan, or only a draft,
+    this is a full generation. `live=False` schedules it as backlog work.
+    """
+    baseline = full_prompt_tokens(new_records_text, order.medication_name)
+    current = CarePlan.objects.filter(order=order).only("generated_text", "is_draft").first()
+
+    if current is None or current.is_draft:
+        with scheduler.generation_slot(order, live):
+            text, error, usage = generate_care_plan_from_llm(new_records_text, order.medication_name)
+        mode, sent = CarePlanVersion.MODE_FULL, baseline
+    else:
+        delta = records_delta(order.patient_records_text, new_records_text)
+        if not delta:
+            return None, NO_CHANGES
+        with scheduler.generation_slot(order, live):
+            text, error, usage = update_care_plan_from_llm(
+                current.generated_text, delta, order.medication_name
+            )
+        mode = CarePlanVersion.MODE_INCREMENTAL
+        sent = _prompt_tokens(
+            prompts.CARE_PLAN_UPDATE,
+            previous_plan=current.generated_text,
+            records_delta=delta,
+            medication_name=order.medication_name,
+        )
+
+    if not text:
+        return None, error
+
+    with transaction.atomic():
+        order.patient_records_text = new_records_text
+        order.save(update_fields=["patient_records_text"])
+        similarity.index_order(order)
+        version = save_care_plan(
+            order, text, usage, mode=mode, prompt_tokens=sent, full_prompt_tokens=baseline
+        )
+    return version, None
+
+
+def reuse_similar_plan(order, live=True):
+    """
+    For a new order whose notes nearly duplicate an earlier order's (same
+    patient and medication), reuse that order's plan: copied as-is only when
+    the notes and the structured fields (diagnoses, medication history) all
+    match, otherwise updated from the delta.
+    Returns the saved CarePlanVersion, or None to fall back to full generation.
+    """
+    for match in similarity.find_similar_orders(
+        order.patient_records_text, patient_id=order.patient_id, exclude=order.pk
+    ):
+        source = match.order
+        if source.medication_name.lower() != order.medication_name.lower():
+            continue
+        plan = CarePlan.objects.filter(order=source, is_draft=False).first()
+        if plan is not None:
+            break
+    else:
+        return None
+
+    source_text = Order.objects.values_list("patient_records_text", flat=True).get(pk=source.pk)
+    baseline = full_prompt_tokens(order.patient_records_text, order.medication_name)
+    delta = "\n\n".join(
+        part for part in (records_delta(source_text, order.patient_records_text), fields_delta(source, order)) if part
+    )
+
+    if not delta:
+        return save_care_plan(
+            order,
+            plan.generated_text,
+            {"prompt_version": plan.prompt_version},
+            mode=CarePlanVersion.MODE_REUSED,
+            source_order=source,
+            prompt_tokens=0,
+            completion_tokens=0,
+            full_prompt_tokens=baseline,
+        )
+
+    with scheduler.generation_slot(order, live):
+        text, _, usage = update_care_plan_from_llm(plan.generated_text, delta, order.medication_name)
+    if not text:
+        return None
+    sent = _prompt_tokens(
+        prompts.CARE_PLAN_UPDATE,
+        previous_plan=plan.generated_text,
+        records_delta=delta,
+        medication_name=order.medication_name,
+    )
+    return save_care_plan(
+        order,
+        text,
+        usage,
+        mode=CarePlanVersion.MODE_INCREMENTAL,
+        source_order=source,
+        prompt_tokens=sent,
+        full_prompt_tokens=baseline,
+    )
@@ -0,0 +1,113 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .forms import (
+    REASON_PATIENT_NAME_MISMATCH,
+    REASON_PROVIDER_NAME_MISMATCH,
+    REASON_PROVIDER_NPI_CONFLICT,
+)
+from .models import FLAGGED_ORDER_Q, Order
+
+FLAG_COUNTS_CACHE_KEY = "careplans:review:flag_counts"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# ---------------------
+# Keyset cursor
+# ---------------------
+# The cursor is the (created_at, id) of the last row on the previous page.
+# Seeking past it keeps every page an index range scan, no matter how deep
+# the pharmacist pages (OFFSET would re-read every skipped row).
+
+def encode_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Invalid review queue cursor.") from e
+
+
+def flagged_orders():
+    return (
+        Order.objects.filter(FLAGGED_ORDER_Q)
+        .select_related("patient", "provider")
+        .defer("patient_records_text")
+        .order_by("-created_at", "-id")
+    )
+
+
+def get_review_page(cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (orders, next_cursor) for one page of the review queue, newest first."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    qs = flagged_orders()
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # Fetch one extra row to learn whether another page exists (no COUNT needed)
+    orders = list(qs[: limit + 1])
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return orders[:limit], next_cursor
+
+
+# ---------------------
+# Cached per-flag counts
+# ---------------------
+
+def flag_counts():
+    counts = cache.get(FLAG_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = Order.objects.filter(FLAGGED_ORDER_Q).aggregate(
+            total=Count("id"),
+            possible_duplicate=Count("id", filter=Q(is_possible_duplicate_order=True)),
+            provider_mismatch=Count(
+                "id",
+                filter=Q(duplicate_reason__contains=REASON_PROVIDER_NPI_CONFLICT)
+                | Q(duplicate_reason__contains=REASON_PROVIDER_NAME_MISMATCH),
+            ),
+            patient_name_mismatch=Count(
+                "id", filter=Q(duplicate_reason__contains=REASON_PATIENT_NAME_MISMATCH)
+            ),
+        )
+        cache.set(FLAG_COUNTS_CACHE_KEY, counts, settings.REVIEW_QUEUE_COUNTS_TTL)
+    return counts
+
+
+def invalidate_flag_counts():
+    cache.delete(FLAG_COUNTS_CACHE_KEY)
+
+
+def serialize_order(order):
+    return {
+        "id": order.pk,
+        "created_at": order.created_at.isoformat(),
+        "order_date": order.order_date.isoformat(),
+        "medication_name": order.medication_name,
+        "primary_diagnosis_icd10": order.primary_diagnosis_icd10,
+        "patient": {
+            "mrn": order.patient.mrn,
+            "first_name": order.patient.first_name,
+            "last_name": order.patient.last_name,
+        },
+        "provider": {"npi": order.provider.npi, "name": order.provider.name},
+        "is_possible_duplicate_order": order.is_possible_duplicate_order,
+        "duplicate_reason": order.duplicate_reason or "",
+    }
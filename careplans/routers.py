@@ -0,0 +1,80 @@
+"""
+Primary/replica database routing.
+
+Everything goes to the primary ("default") unless code explicitly opts into
+replica reads with `replica_reads()` (review queue, exports, search, care plan
+retrieval). Writes always go to the primary, `primary_only()` overrides any
+replica context (intake validation + save), and a session that just wrote
+keeps reading from the primary for DATABASE_STICKY_WRITE_SECONDS so users
+never see replication lag on their own changes (see middleware.py).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DB = "default"
+
+_replica_reads = ContextVar("careplans_replica_reads", default=False)
+_primary_only = ContextVar("careplans_primary_only", default=False)
+# Per-request mutable state installed by ReplicaStickinessMiddleware
+_request_state = ContextVar("careplans_request_state", default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, "DATABASE_REPLICA_ALIAS", None)
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def replica_reads():
+    """Route reads to the replica (if one is configured). Also works as a decorator."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_only():
+    """Force reads to the primary, even inside replica_reads(). Also works as a decorator."""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+@contextmanager
+def request_routing(pinned_to_primary):
+    state = {"wrote": False}
+    token = _request_state.set(state)
+    pin_token = _primary_only.set(True) if pinned_to_primary else None
+    try:
+        yield state
+    finally:
+        if pin_token is not None:
+            _primary_only.reset(pin_token)
+        _request_state.reset(token)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _primary_only.get():
+            return replica_alias() or PRIMARY_DB
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label == "careplans":
+            state["wrote"] = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a physical copy of the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,279 @@
+"""
+Priority- and deadline-aware scheduling of LLM generations within a process.
+
+Every generation takes one of settings.LLM_MAX_CONCURRENCY slots. Waiting
+calls are ordered by weighted fair queueing (self-clocked: each call gets a
+virtual finish tag of max(virtual time, its class's last tag) + cost/weight,
+and the smallest tag runs next). A class with weight 8 gets ~8x the slots
+of a weight-1 class while both are queued, but an idle class's share goes
+to whoever is waiting, so a backlog drains at full speed when live intake
+is quiet. While other classes have calls running or queued, the backlog
+class may hold at most SCHEDULER_BACKLOG_SHARE of the slots, so live
+orders get the slots it frees instead of waiting out further backlog calls.
+
+Classes are derived from the order: same-day live intake is urgent, other
+recent live orders standard, and old order dates or batch work backlog.
+Each call has a deadline; misses are counted and logged.
+
+generation_slot() also attributes the calls made in it to the order for the
+GenerationRun ledger, and keeps running/queued totals in the default cache
+for admission control (careplans.admission). Those are totals across all
+processes only when the cache is shared (CACHE_URL); with the per-process
+default each process sees just its own calls.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import ledger
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RUNNING_KEY = "careplans:llm:running"
+GLOBAL_QUEUED_KEY = "careplans:llm:queued"
+
+URGENT = "urgent"
+STANDARD = "standard"
+BACKLOG = "backlog"
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    name: str
+    weight: float
+    deadline: float  # seconds from submission
+    max_share: float = 1.0  # fraction of the slots this class may hold while others are busy
+
+
+def priority_classes(backlog_share=None):
+    if backlog_share is None:
+        backlog_share = settings.SCHEDULER_BACKLOG_SHARE
+    return {
+        URGENT: PriorityClass(URGENT, weight=8, deadline=30),
+        STANDARD: PriorityClass(STANDARD, weight=4, deadline=120),
+        BACKLOG: PriorityClass(BACKLOG, weight=1, deadline=24 * 60 * 60, max_share=backlog_share),
+    }
+
+
+def classify(order, live=True):
+    """Priority class for generating `order`'s plan; `live` means a user is waiting."""
+    age = (timezone.localdate() - order.order_date).days
+    if not live or age > settings.SCHEDULER_BACKLOG_AGE_DAYS:
+        return BACKLOG
+    return URGENT if age <= 0 else STANDARD
+
+
+@dataclass
+class Ticket:
+    priority: str
+    tag: float
+    submitted: float
+    deadline: float
+    started: float = None
+    granted: bool = False
+
+
+@dataclass
+class ClassStats:
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    deadline_missed: int = 0
+    wait_seconds: float = 0.0
+
+
+class Scheduler:
+    def __init__(self, slots, classes=None):
+        self.slots = slots
+        self.classes = classes or priority_classes()
+        self._cond = threading.Condition()
+        self._queues = {name: [] for name in self.classes}
+        self._last_tag = dict.fromkeys(self.classes, 0.0)
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._stats = {name: ClassStats() for name in self.classes}
+
+    def _limit(self, name):
+        # max_share only applies while another class has calls running or
+        # queued: on an otherwise idle scheduler any class may use every slot
+        if not any(s.running or s.queued for other, s in self._stats.items() if other != name):
+            return self.slots
+        return max(1, int(self.slots * self.classes[name].max_share))
+
+    def _running(self):
+        return sum(s.running for s in self._stats.values())
+
+    def acquire(self, priority, cost=1.0):
+        """Block until a slot is granted to this call; returns its Ticket."""
+        cls = self.classes[priority]
+        now = time.monotonic()
+        with self._cond:
+            tag = max(self._virtual_time, self._last_tag[priority]) + cost / cls.weight
+            self._last_tag[priority] = tag
+            ticket = Ticket(priority, tag, now, now + cls.deadline)
+            heapq.heappush(self._queues[priority], (tag, next(self._seq), ticket))
+            self._stats[priority].queued += 1
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+        return ticket
+
+    def release(self, ticket):
+        now = time.monotonic()
+        with self._cond:
+            stats = self._stats[ticket.priority]
+            stats.running -= 1
+            stats.completed += 1
+            if now > ticket.deadline:
+                stats.deadline_missed += 1
+                logger.warning(
+                    "LLM generation missed its %s deadline by %.1fs",
+                    ticket.priority, now - ticket.deadline,
+                )
+            self._dispatch()
+
+    def _dispatch(self):
+        # Caller holds the condition
+        granted = False
+        while self._running() < self.slots:
+            best = None
+            for name, queue in self._queues.items():
+                if queue and self._stats[name].running < self._limit(name):
+                    if best is None or queue[0] < self._queues[best][0]:
+                        best = name
+            if best is None:
+                break
+            tag, _, ticket = heapq.heappop(self._queues[best])
+            self._virtual_time = tag
+            ticket.started, ticket.granted = time.monotonic(), True
+            stats = self._stats[best]
+            stats.queued -= 1
+            stats.running += 1
+            stats.wait_seconds += ticket.started - ticket.submitted
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority, cost=1.0):
+        ticket = self.acquire(priority, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                name: {
+                    "queued": s.queued,
+                    "running": s.running,
+                    "completed": s.completed,
+                    "deadline_missed": s.deadline_missed,
+                    "mean_wait_seconds": s.wait_seconds / s.completed if s.completed else 0.0,
+                }
+                for name, s in self._stats.items()
+            }
+
+
+_schedulers = {}
+_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler for the current LLM_MAX_CONCURRENCY / SCHEDULER_* settings."""
+    key = (settings.LLM_MAX_CONCURRENCY, settings.SCHEDULER_BACKLOG_SHARE)
+    with _lock:
+        if key not in _schedulers:
+            _schedulers[key] = Scheduler(key[0])
+        return _schedulers[key]
+
+
+# ---------------------
+# Cross-process totals
+# ---------------------
+# Plain cache counters. A worker killed mid-call leaves its increment
+# behind, so the keys expire ADMISSION_COUNTER_TTL after creation and start
+# again from zero (reads clamp at 0 while in-flight calls drain).
+
+# Backends whose data lives in one process's memory
+_PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def counts_are_shared():
+    """Whether global_counts() covers every process, not just this one."""
+    return settings.CACHES["default"]["BACKEND"] not in _PER_PROCESS_CACHES
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_counters(app_configs, **kwargs):
+    if counts_are_shared():
+        return []
+    return [
+        checks.Warning(
+            "The default cache is per process, so the cross-process LLM counters "
+            "only count this process's generations: ADMISSION_DEFER_IN_FLIGHT "
+            "applies per worker, not to the deployment as a whole.",
+            hint="Set CACHE_URL to a Redis or Memcached server shared by all workers.",
+            id="careplans.W002",
+        )
+    ]
+
+def _bump(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, max(delta, 0), settings.ADMISSION_COUNTER_TTL)
+
+
+def global_counts():
+    """
+    (running, queued) live LLM generations across every process sharing the
+    cache; only this process's own with a per-process cache (see
+    counts_are_shared).
+    """
+    counts = cache.get_many([GLOBAL_RUNNING_KEY, GLOBAL_QUEUED_KEY])
+    return (
+        max(0, counts.get(GLOBAL_RUNNING_KEY, 0)),
+        max(0, counts.get(GLOBAL_QUEUED_KEY, 0)),
+    )
+
+
+@contextmanager
+def generation_slot(order, live=True):
+    """
+    Hold an LLM slot for generating `order`'s plan. Only live calls count
+    toward the cross-process totals: background drains are bounded by their
+    own worker count and shouldn't make intake shed load.
+    """
+    sched = get_scheduler()
+    priority = classify(order, live)
+    if not live:
+        with sched.slot(priority) as ticket, ledger.attribute(order, priority):
+            yield ticket
+        return
+
+    _bump(GLOBAL_QUEUED_KEY, 1)
+    try:
+        ticket = sched.acquire(priority)
+    finally:
+        _bump(GLOBAL_QUEUED_KEY, -1)
+    _bump(GLOBAL_RUNNING_KEY, 1)
+    try:
+        with ledger.attribute(order, priority):
+            yield ticket
+    finally:
+        _bump(GLOBAL_RUNNING_KEY, -1)
+        sched.release(ticket)
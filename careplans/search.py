@@ -0,0 +1,180 @@
+"""
+Full-text search over clinical notes (Order.patient_records_text) and
+generated care plans (CarePlan.generated_text).
+
+Postgres: a STORED generated tsvector column per table with a GIN index, so
+the database keeps it current on every insert/update without app code.
+SQLite (local dev + tests): FTS5 external-content tables kept current by
+triggers. The rest of the app only calls search_clinical_text().
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Order
+
+# Tables/columns covered by the index: (source label, table, text column)
+SEARCH_SOURCES = [
+    ("notes", "careplans_order", "patient_records_text"),
+    ("care_plan", "careplans_careplan", "generated_text"),
+]
+
+# Control characters can't appear in the escaped output, so they are safe
+# placeholders for the highlight tags until after HTML escaping.
+_HL_START, _HL_STOP = "\x02", "\x03"
+
+
+@dataclass
+class SearchHit:
+    order_id: int
+    source: str
+    rank: float
+    snippet: str
+    order: Order = None
+
+
+# ---------------------
+# Schema upkeep (the index itself is created by migration 0007)
+# ---------------------
+
+def ensure_sqlite_triggers(connection):
+    """
+    (Re)create the FTS5 sync triggers. SQLite migrations that rebuild a table
+    (AddField with a default, AlterField, ...) drop its triggers, so this also
+    runs on post_migrate; if any trigger was missing the index is rebuilt.
+    """
+    if connection.vendor != "sqlite":
+        return
+    tables = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        for _, table, column in SEARCH_SOURCES:
+            fts = f"{table}_fts"
+            if fts not in tables:
+                continue
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f"{fts}_%"],
+            )
+            if cursor.fetchone()[0] == 3:
+                continue
+
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+# ---------------------
+# Querying
+# ---------------------
+
+_POSTGRES_SEARCH_SQL = """
+WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+hits AS (
+    (SELECT o.id AS order_id, 'notes' AS source, o.id AS object_id,
+            ts_rank_cd(o.search_vector, q.query) AS rank
+     FROM careplans_order o, q WHERE o.search_vector @@ q.query)
+    UNION ALL
+    (SELECT c.order_id, 'care_plan', c.id, ts_rank_cd(c.search_vector, q.query)
+     FROM careplans_careplan c, q WHERE c.search_vector @@ q.query)
+    ORDER BY rank DESC
+    LIMIT %s
+)
+SELECT h.order_id, h.source, h.rank,
+       ts_headline('english', coalesce(o.patient_records_text, c.generated_text), q.query, %s)
+FROM hits h
+CROSS JOIN q
+LEFT JOIN careplans_order o ON h.source = 'notes' AND o.id = h.object_id
+LEFT JOIN careplans_careplan c ON h.source = 'care_plan' AND c.id = h.object_id
+ORDER BY h.rank DESC
+"""
+
+# snippet() is costly, so each table first picks its top rows by FTS5's
+# built-in bm25 rank and only those get a snippet.
+_SQLITE_SEARCH_SQL = """
+SELECT order_id, source, rank, snip FROM (
+    SELECT careplans_order_fts.rowid AS order_id, 'notes' AS source,
+           -careplans_order_fts.rank AS rank,
+           snippet(careplans_order_fts, 0, %s, %s, '…', 24) AS snip
+    FROM careplans_order_fts
+    WHERE careplans_order_fts MATCH %s AND careplans_order_fts.rowid IN (
+        SELECT rowid FROM careplans_order_fts WHERE careplans_order_fts MATCH %s
+        ORDER BY rank LIMIT %s
+    )
+    UNION ALL
+    SELECT c.order_id, 'care_plan', -careplans_careplan_fts.rank,
+           snippet(careplans_careplan_fts, 0, %s, %s, '…', 24)
+    FROM careplans_careplan_fts
+    JOIN careplans_careplan c ON c.id = careplans_careplan_fts.rowid
+    WHERE careplans_careplan_fts MATCH %s AND careplans_careplan_fts.rowid IN (
+        SELECT rowid FROM careplans_careplan_fts WHERE careplans_careplan_fts MATCH %s
+        ORDER BY rank LIMIT %s
+    )
+)
+ORDER BY rank DESC
+LIMIT %s
+"""
+
+
+def _fts5_query(query):
+    # Quote every term so user input can't inject FTS5 operators; terms are ANDed
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet or "").replace(_HL_START, "<mark>").replace(_HL_STOP, "</mark>")
+    )
+
+
+def search_clinical_text(query, limit=20, using=None):
+    """Ranked hits across notes and care plans, best first, with highlighted snippets."""
+    query = (query or "").strip()
+    if not query:
+        return []
+
+    using = using or router.db_for_read(Order)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            headline_opts = (
+                f"StartSel={_HL_START}, StopSel={_HL_STOP}, "
+                "MaxFragments=2, MaxWords=30, MinWords=10"
+            )
+            cursor.execute(_POSTGRES_SEARCH_SQL, [query, limit, headline_opts])
+        else:
+            match = _fts5_query(query)
+            if not match:
+                return []
+            per_table = [_HL_START, _HL_STOP, match, match, limit]
+            cursor.execute(_SQLITE_SEARCH_SQL, per_table + per_table + [limit])
+        rows = cursor.fetchall()
+
+    hits = [
+        SearchHit(order_id=order_id, source=source, rank=float(rank), snippet=_highlight(snip))
+        for order_id, source, rank, snip in rows
+    ]
+
+    orders = (
+        Order.objects.using(using)
+        .select_related("patient")
+        .defer("patient_records_text")
+        .in_bulk({h.order_id for h in hits})
+    )
+    for hit in hits:
+        hit.order = orders.get(hit.order_id)
+    return hits
@@ -0,0 +1,157 @@
+"""
+The four care plan sections, parsed out of the plan text once when the plan
+is saved (regeneration.save_care_plan) and stored in CarePlan.sections:
+
+    {
+        "problems": ["...", ...],
+        "goals": [...],
+        "interventions": [...],
+        "monitoring": [...],
+        "terms": {"interventions": ["creatinine", "renal", ...], ...},
+    }
+
+"terms" holds each section's distinct lower-cased words, so questions like
+"every plan with a renal intervention" are a JSON containment query
+(plans_with_term) that the GIN index answers on Postgres.
+
+SectionParser takes the text line by line and can be fed chunks as they
+arrive from a streaming completion; parse() feeds it a whole text at once.
+A plan missing any of the four headings is stored with what could be parsed
+and CarePlan.sections_parse_failed set.
+"""
+import re
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+from .models import CarePlan
+
+SECTION_KEYS = ("problems", "goals", "interventions", "monitoring")
+
+# Heading text per section, in the order the prompt asks for them
+_HEADINGS = (
+    re.compile(r"(problem\s+list|drug\s+therapy\s+problems|dtps?\b)", re.I),
+    re.compile(r"(smart\s+goals|goals\b)", re.I),
+    re.compile(r"(pharmacist\s+interventions|interventions\b)", re.I),
+    re.compile(r"(monitoring\s+plan|monitoring\b|lab\s+schedule)", re.I),
+)
+# Markdown heading/bold markers, then an optional "1." / "1)" / "Section 1:"
+_HEADING_PREFIX = re.compile(r"^(?P<md>#{1,6}\s*|\*\*|__)?\s*(?:section\s+)?(?:(?P<number>[1-4])\s*[.):]\s*)?", re.I)
+_BULLET = re.compile(r"^(?:[-*•]|\d+[.)])\s+")
+_MARKUP = re.compile(r"\*\*|__|`")
+_WORD = re.compile(r"[a-z][a-z0-9]{2,}")
+_MAX_HEADING_LENGTH = 120
+
+STOP_WORDS = frozenset(
+    "and are for from has have into its may not per the then this that was were will with".split()
+)
+
+
+@dataclass
+class ParsedSections:
+    sections: dict = field(default_factory=lambda: {key: [] for key in SECTION_KEYS})
+    missing: list = field(default_factory=list)
+
+    @property
+    def failed(self):
+        return bool(self.missing)
+
+    def as_json(self):
+        return {
+            **self.sections,
+            "terms": {key: terms(items) for key, items in self.sections.items()},
+        }
+
+
+def terms(items):
+    words = set()
+    for item in items:
+        words.update(w for w in _WORD.findall(item.lower()) if w not in STOP_WORDS)
+    return sorted(words)
+
+
+class SectionParser:
+    def __init__(self):
+        self._buffer = ""
+        self._current = None  # index into SECTION_KEYS
+        self._seen = set()
+        self._result = ParsedSections()
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._line(line)
+
+    def close(self):
+        if self._buffer:
+            self._line(self._buffer)
+            self._buffer = ""
+        self._result.missing = [key for i, key in enumerate(SECTION_KEYS) if i not in self._seen]
+        return self._result
+
+    def _heading(self, line):
+        """Index of the section this line opens, or None."""
+        if len(line) > _MAX_HEADING_LENGTH:
+            return None
+        prefix = _HEADING_PREFIX.match(line)
+        rest = line[prefix.end():]
+        # Plain prose mentioning "monitoring" isn't a heading: it needs
+        # markdown, a section number, or a trailing colon
+        if not (prefix.group("md") or prefix.group("number") or line.rstrip("*_ ").endswith(":")):
+            return None
+        number = prefix.group("number")
+        # Sections only move forward, so an item that happens to start with
+        # a later heading's words can't end the current section early
+        start = 0 if self._current is None else self._current + 1
+        for index in range(start, len(SECTION_KEYS)):
+            if number is not None and int(number) != index + 1:
+                continue
+            if _HEADINGS[index].match(rest.strip()):
+                return index
+        return None
+
+    def _line(self, line):
+        line = line.strip()
+        if not line:
+            return
+        index = self._heading(line)
+        if index is not None:
+            self._current = index
+            self._seen.add(index)
+            return
+        if self._current is None:
+            return  # preamble before the first heading
+        items = self._result.sections[SECTION_KEYS[self._current]]
+        bullet = _BULLET.match(line)
+        text = _MARKUP.sub("", line[bullet.end():] if bullet else line).strip()
+        if not text:
+            return
+        if bullet or not items:
+            items.append(text)
+        else:
+            items[-1] = f"{items[-1]} {text}"
+
+
+def parse(text):
+    parser = SectionParser()
+    parser.feed(text)
+    return parser.close()
+
+
+# ---------------------
+# Queries
+# ---------------------
+
+def plans_with_term(section, term, queryset=None):
+    """CarePlans whose `section` mentions the word `term`."""
+    if section not in SECTION_KEYS:
+        raise ValueError(f"Unknown care plan section: {section}")
+    queryset = CarePlan.objects.all() if queryset is None else queryset
+    term = term.strip().lower()
+    if connections[queryset.db].vendor == "postgresql":
+        return queryset.filter(sections__contains={"terms": {section: [term]}})
+    # SQLite has no JSON containment; match the quoted term in the array's
+    # JSON text instead (terms are stored lower-cased)
+    return queryset.filter(**{f"sections__terms__{section}__icontains": f'"{term}"'})
+
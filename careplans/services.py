@@ -1,68 +1,75 @@
 import os
 import logging
-from openai import OpenAI
+import time
 from django.conf import settings
 
+from . import ledger, llm_backends, prompts
+
 logger = logging.getLogger(__name__)
 
-def generate_care_plan_from_llm(patient_records_text: str, medication_name: str):
-    # 1. Initialize inside to prevent startup crashes
-    api_key = getattr(settings, "OPENAI_API_KEY", None)
-    if not api_key:
-        return None, "API Key missing. Please check system configuration."
+def _usage(completion, template):
+    """Prompt version plus token counts; counts are None when the API omits them."""
+    return {
+        "prompt_version": template.key,
+        "prompt_tokens": completion.prompt_tokens,
+        "completion_tokens": completion.completion_tokens,
+        "cached_tokens": completion.cached_tokens,
+    }
 
-    # PRESERVED: Your high-detail clinical prompts
-    system_prompt = (
-        "You are a Senior Clinical Pharmacist at a specialty pharmacy. "
-        "Your task is to transform unstructured clinical notes into a structured Pharmacist Care Plan. "
-        "CRITICAL RULE: You must extract the patient's Date of Birth (DOB) and ensure it is formatted as YYYY-MM-DD. "
-        "If the DOB is invalid or missing, explicitly flag this in the Problem List."
-    )
 
-    user_prompt = f"""
-    ### INPUT TEMPLATE REFERENCE
-    Follow this structure when extracting data:
-    - Name, MRN, DOB (YYYY-MM-DD)
-    - Primary/Secondary Diagnoses (ICD-10 when available)
-    - Medication History & Home Meds
-    - Clinical Status & Vitals
+def _complete(template, failure_message, **variables):
+    backend = llm_backends.get_backend()
 
-    ### OUTPUT TEMPLATE REQUIREMENTS
-    Produce exactly these sections:
-    1. Problem List / Drug Therapy Problems (DTPs)
-    2. SMART Goals (Primary, Safety, and Process goals)
-    3. Pharmacist Interventions (Dosing, Premeds, Titration, Hydration, Interactions)
-    4. Monitoring Plan & Lab Schedule
+    # 1. Initialize inside to prevent startup crashes
+    api_key = getattr(settings, "OPENAI_API_KEY", None)
+    if backend.requires_api_key and not api_key:
+        return None, "API Key missing. Please check system configuration.", None
 
-    ### PATIENT RECORDS TO PROCESS
-    Medication Requested: {medication_name}
+    messages = template.render(**variables)
 
-    Records:
-    {patient_records_text}
-    """
+    # Transient failures (timeouts, rate limits, 5xx) are retried with
+    # exponential backoff; every attempt goes to the ledger. The backends
+    # don't retry on their own, and each attempt's timeout is cut to what is
+    # left of LLM_TOTAL_TIMEOUT, so that bounds the whole call.
+    attempts = max(1, settings.LLM_MAX_ATTEMPTS)
+    deadline = time.monotonic() + settings.LLM_TOTAL_TIMEOUT
+    for attempt in range(1, attempts + 1):
+        started = time.perf_counter()
+        timeout = min(settings.LLM_TIMEOUT, deadline - time.monotonic())
+        try:
+            completion = backend.complete(messages, api_key=api_key, timeout=timeout)
+        except Exception as e:
+            ledger.record(template, backend, attempt, started, error=e)
+            backoff = settings.LLM_RETRY_BACKOFF * 2 ** (attempt - 1)
+            # Only retry if the next attempt would still get a useful slice of time
+            retry = attempt < attempts and backend.is_retryable(e)
+            if retry and deadline - time.monotonic() - backoff >= settings.LLM_MIN_ATTEMPT_TIMEOUT:
+                logger.warning(f"LLM attempt {attempt} failed, retrying: {e}")
+                time.sleep(backoff)
+                continue
+            logger.error(f"LLM integration failed: {e}")
+            return None, failure_message, None
 
-    try:
-        client = OpenAI(api_key=api_key)
+        ledger.record(template, backend, attempt, started, completion=completion)
+        return completion.text, None, _usage(completion, template)
 
-        # FIX: Changed 'responses.create' to 'chat.completions.create'
-        # FIX: Changed 'input' to 'messages'
-        # FIX: Changed 'max_output_tokens' to 'max_tokens'
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=800,  # Standard param for Chat Completions
-            temperature=0.2,
-            response_format={"type": "text"},
-            timeout=20, # Note: some older httpx versions handle this differently
-        )
 
-        # FIX: Access the text via choices[0].message.content
-        care_plan_text = response.choices[0].message.content
-        return care_plan_text, None
+def generate_care_plan_from_llm(patient_records_text: str, medication_name: str):
+    """Returns (text, error, usage); see _usage for the usage dict."""
+    return _complete(
+        prompts.get_template(prompts.CARE_PLAN),
+        "The AI service is currently unavailable. The order has been saved.",
+        patient_records_text=patient_records_text,
+        medication_name=medication_name,
+    )
 
-    except Exception as e:
-        logger.error(f"LLM integration failed: {e}")
-        return None, "The AI service is currently unavailable. The order has been saved."
\ No newline at end of file
+
+def update_care_plan_from_llm(previous_plan: str, records_delta: str, medication_name: str):
+    """Revise an existing care plan from a records delta. Returns (text, error, usage)."""
+    return _complete(
+        prompts.get_template(prompts.CARE_PLAN_UPDATE),
+        "The AI service is currently unavailable. The care plan was not changed.",
+        previous_plan=previous_plan,
+        records_delta=records_delta,
+        medication_name=medication_name,
+    )
@@ -0,0 +1,166 @@
+"""
+Near-duplicate detection for patient_records_text.
+
+Each note gets a 128-slot one-permutation MinHash signature over its word
+3-shingles: every shingle is hashed once, the top bits pick a slot and the
+slot keeps its minimum. Matching slots between two signatures estimate the
+Jaccard similarity of the notes' shingle sets, so a chart pasted again with
+a new vitals line still scores ~0.9+ where an exact hash would miss it.
+
+For lookup the signature is cut into 16 bands of 8 slots, and each band is
+hashed to one bucket stored in NoteBand (indexed on bucket, patient). Notes
+sharing any bucket are candidates: a few index probes, independent of how
+many notes are stored. Candidates are then scored on their full signatures.
+With 16x8 bands a pair at 0.9 similarity shares a bucket with probability
+>0.999, one at 0.5 about 6% of the time.
+"""
+import re
+import struct
+from dataclasses import dataclass
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import NoteBand, Order
+
+SLOTS = 128
+BANDS = 16
+ROWS = SLOTS // BANDS
+SHINGLE_WORDS = 3
+
+_SLOT_BITS = 7  # log2(SLOTS)
+_VALUE_MASK = (1 << (64 - _SLOT_BITS)) - 1
+_EMPTY = _VALUE_MASK + 1
+_SIGNATURE = struct.Struct(f"<{SLOTS}I")
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class SimilarOrder:
+    order: Order
+    similarity: float
+
+
+def _shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """128 x uint32 one-permutation MinHash of `text`, as 512 bytes."""
+    slots = [_EMPTY] * SLOTS
+    for shingle in _shingles(text):
+        h = int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), "little")
+        slot, value = h >> (64 - _SLOT_BITS), h & _VALUE_MASK
+        if value < slots[slot]:
+            slots[slot] = value
+
+    # Densify: an empty slot borrows the next filled slot to its right
+    # (offset by distance), so short notes still compare slot-for-slot
+    filled = [i for i, v in enumerate(slots) if v != _EMPTY]
+    if filled and len(filled) < SLOTS:
+        for i in range(SLOTS):
+            if slots[i] == _EMPTY:
+                j = next((f for f in filled if f > i), filled[0])
+                slots[i] = slots[j] + ((j - i) % SLOTS) * 0x9E3779B1
+    return _SIGNATURE.pack(*(v & 0xFFFFFFFF for v in slots))
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures (fraction of equal slots)."""
+    return sum(x == y for x, y in zip(_SIGNATURE.unpack(a), _SIGNATURE.unpack(b))) / SLOTS
+
+
+def band_buckets(sig):
+    width = ROWS * 4
+    return [
+        int.from_bytes(
+            blake2b(bytes([band]) + sig[band * width:(band + 1) * width], digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+# ---------------------
+# Index maintenance
+# ---------------------
+
+def index_order(order):
+    """(Re)compute the order's signature and band rows. Call after records text changes."""
+    sig = signature(order.patient_records_text)
+    with transaction.atomic():
+        Order.objects.filter(pk=order.pk).update(records_signature=sig)
+        NoteBand.objects.filter(order=order).delete()
+        NoteBand.objects.bulk_create(
+            NoteBand(order_id=order.pk, patient_id=order.patient_id, bucket=bucket)
+            for bucket in band_buckets(sig)
+        )
+    order.records_signature = sig
+    return sig
+
+
+def index_orders(queryset, batch_size=1000):
+    """Backfill signatures for orders that have none. Returns the number indexed."""
+    done = 0
+    pending = queryset.filter(records_signature__isnull=True).only(
+        "id", "patient_id", "patient_records_text"
+    )
+    while True:
+        batch = list(pending.order_by("id")[:batch_size])
+        if not batch:
+            return done
+        bands = []
+        with transaction.atomic():
+            for order in batch:
+                order.records_signature = signature(order.patient_records_text)
+                bands.extend(
+                    NoteBand(order_id=order.pk, patient_id=order.patient_id, bucket=bucket)
+                    for bucket in band_buckets(order.records_signature)
+                )
+            Order.objects.bulk_update(batch, ["records_signature"])
+            NoteBand.objects.filter(order__in=batch).delete()
+            NoteBand.objects.bulk_create(bands)
+        done += len(batch)
+
+
+# ---------------------
+# Lookup
+# ---------------------
+
+def find_similar_orders(text, patient_id=None, exclude=None, threshold=None, limit=5):
+    """
+    Orders whose notes are at least `threshold` similar to `text`, best first.
+    Scoped to one patient when `patient_id` is given.
+    """
+    if threshold is None:
+        threshold = settings.NOTE_SIMILARITY_THRESHOLD
+    sig = signature(text)
+
+    bands = NoteBand.objects.filter(bucket__in=band_buckets(sig))
+    if patient_id is not None:
+        bands = bands.filter(patient_id=patient_id)
+    if exclude is not None:
+        bands = bands.exclude(order_id=exclude)
+    # Most shared buckets first; cap how many candidates get scored
+    candidate_ids = list(
+        bands.values("order_id")
+        .annotate(shared=Count("id"))
+        .order_by("-shared", "-order_id")
+        .values_list("order_id", flat=True)[:limit * 10]
+    )
+
+    matches = []
+    for order in Order.objects.filter(pk__in=candidate_ids).defer("patient_records_text"):
+        if order.records_signature is None:
+            continue
+        score = similarity(sig, bytes(order.records_signature))
+        if score >= threshold:
+            matches.append(SimilarOrder(order, score))
+    matches.sort(key=lambda m: (m.similarity, m.order.pk), reverse=True)
+    return matches[:limit]
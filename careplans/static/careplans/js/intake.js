@@ -0,0 +1,16 @@
+// Kill bfcache repopulation (back/forward/refresh restore)
+window.addEventListener("pageshow", function (event) {
+  const form = document.getElementById("intake-form");
+  if (!form) return;
+
+  // If loaded from bfcache OR navigating back/forward, reset fields
+  if (event.persisted) {
+    form.reset();
+  } else {
+    // Some Chrome cases don’t set event.persisted; detect navigation type
+    const nav = performance.getEntriesByType("navigation");
+    if (nav && nav.length && (nav[0].type === "back_forward")) {
+      form.reset();
+    }
+  }
+});
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from careplans import icd10
+
+
+class TestRunner(DiscoverRunner):
+    """Builds the tests' ICD-10 index before the system checks (careplans.E001) run."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # What `manage.py build_icd10_index` does at deploy time
+        if icd10.index_problem(settings.ICD10_INDEX_PATH):
+            icd10.build_index(settings.ICD10_INDEX_PATH)
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans.models import CarePlan, CarePlanVersion, GenerationRun, Order, Patient, Provider
+
+"""
+Changelist query budgets. Each page must cost a fixed number of queries
+no matter how many rows it shows (no N+1 through Order.__str__), and must
+not select the clinical text columns.
+"""
+
+
+class TestAdminChangelists(TestCase):
+
+    # session + user + COUNT + page rows
+    CHANGELIST_QUERIES = 4
+    # GenerationRun's date_hierarchy adds its date bounds + the distinct days
+    DATE_HIERARCHY_QUERIES = 2
+
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser("admin", password="pw")
+        self.client.force_login(admin_user)
+
+        provider = Provider.objects.create(npi="1111111111", name="Dr House")
+        for i in range(5):
+            patient = Patient.objects.create(mrn=f"{100000 + i}", first_name="A", last_name=f"P{i}")
+            order = Order.objects.create(
+                patient=patient,
+                provider=provider,
+                medication_name="IVIG",
+                order_date=timezone.localdate(),
+                primary_diagnosis_icd10="G70.0",
+                patient_records_text="SECRET CLINICAL NOTE",
+            )
+            CarePlan.objects.create(order=order, generated_text="SECRET PLAN TEXT")
+            CarePlanVersion.objects.create(order=order, version=1, generated_text="SECRET PLAN TEXT")
+            GenerationRun.objects.create(
+                order=order,
+                medication_name="IVIG",
+                backend="StubBackend",
+                prompt_version="care_plan@v2",
+                outcome=GenerationRun.OUTCOME_SUCCESS,
+                latency_ms=900,
+            )
+
+    def _get_changelist(self, model_name, **params):
+        url = reverse(f"admin:careplans_{model_name}_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.response = response
+        return ctx
+
+    def test_changelist_query_counts(self):
+        budgets = dict.fromkeys(("patient", "provider", "order", "careplan", "careplanversion"), self.CHANGELIST_QUERIES)
+        budgets["generationrun"] = self.CHANGELIST_QUERIES + self.DATE_HIERARCHY_QUERIES
+        for model_name, budget in budgets.items():
+            with self.subTest(model=model_name):
+                ctx = self._get_changelist(model_name)
+                self.assertEqual(len(ctx.captured_queries), budget)
+
+    def test_changelists_skip_text_columns(self):
+        for model_name in ("order", "careplan", "careplanversion"):
+            with self.subTest(model=model_name):
+                ctx = self._get_changelist(model_name)
+                sql = " ".join(q["sql"] for q in ctx.captured_queries)
+                self.assertNotIn("patient_records_text", sql)
+                self.assertNotIn("generated_text", sql)
+
+    def test_search_by_mrn_is_exact_not_substring(self):
+        self._get_changelist("order", q="10000")
+        self.assertEqual(self.response.context["cl"].result_count, 0)
+
+        self._get_changelist("order", q="100003")
+        self.assertEqual(self.response.context["cl"].result_count, 1)
+
+    def test_mrn_and_npi_search_is_an_indexable_exact_match(self):
+        for model_name, term, column in (
+            ("patient", "100003", '"careplans_patient"."mrn" = '),
+            ("provider", "1111111111", '"careplans_provider"."npi" = '),
+            ("order", "100003", '"careplans_patient"."mrn" = '),
+        ):
+            with self.subTest(model=model_name):
+                ctx = self._get_changelist(model_name, q=term)
+                self.assertIn(column, ctx.captured_queries[-1]["sql"])
+                self.assertEqual(self.response.context["cl"].result_count, 1)
@@ -0,0 +1,186 @@
+import importlib.util
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import admission, scheduler
+from careplans.models import CarePlan, Order
+from lamar_project.settings import _cache_config
+
+
+def _load(**overrides):
+    values = dict(process_running=0, process_queued=0, global_running=0, global_queued=0, active_requests=1)
+    values.update(overrides)
+    return admission.Load(**values)
+
+
+@override_settings(
+    ADMISSION_DEFER_QUEUED=2,
+    ADMISSION_DEFER_IN_FLIGHT=16,
+    ADMISSION_REJECT_DEFERRED=1000,
+    ADMISSION_REJECT_ACTIVE_REQUESTS=32,
+)
+class TestDecide(TestCase):
+
+    def test_accepts_under_normal_load(self):
+        self.assertEqual(admission.decide(_load(process_running=3, global_running=10))[0], admission.ACCEPT)
+
+    def test_defers_on_process_queue_or_global_in_flight(self):
+        self.assertEqual(admission.decide(_load(process_queued=2))[0], admission.DEFER)
+        self.assertEqual(admission.decide(_load(global_running=12, global_queued=4))[0], admission.DEFER)
+
+    def test_rejects_only_when_deferring_cannot_keep_up(self):
+        with override_settings(ADMISSION_REJECT_DEFERRED=0):
+            self.assertEqual(admission.decide(_load(process_queued=2))[0], admission.REJECT)
+            # Not overloaded: the deferred backlog alone never rejects
+            self.assertEqual(admission.decide(_load())[0], admission.ACCEPT)
+        self.assertEqual(admission.decide(_load(active_requests=32))[0], admission.REJECT)
+
+
+class TestIntakeAdmission(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        }
+
+    @override_settings(ADMISSION_DEFER_IN_FLIGHT=0)
+    @patch("careplans.views.generate_care_plan_from_llm")
+    def test_overload_saves_order_and_defers_generation(self, llm):
+        response = self.client.post(reverse("intake"), self.payload, follow=True)
+
+        llm.assert_not_called()
+        self.assertTrue(response.context["plan_is_draft"])
+        self.assertContains(response, admission.PLAN_QUEUED)
+        plan = CarePlan.objects.get()
+        self.assertTrue(plan.is_draft and plan.generation_deferred)
+
+    @override_settings(ADMISSION_REJECT_ACTIVE_REQUESTS=1)
+    @patch("careplans.views.generate_care_plan_from_llm")
+    def test_last_resort_is_503_with_retry_after(self, llm):
+        response = self.client.post(reverse("intake"), self.payload)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertFalse(Order.objects.exists())
+        llm.assert_not_called()
+
+        # The form itself is still served
+        self.assertEqual(self.client.get(reverse("intake")).status_code, 200)
+
+    @patch("careplans.views.generate_care_plan_from_llm", return_value=("LLM PLAN", None, None))
+    def test_live_generation_counts_in_global_totals(self, llm):
+        seen = []
+
+        def generate(*args):
+            seen.append(scheduler.global_counts())
+            return "LLM PLAN", None, None
+
+        llm.side_effect = generate
+        self.client.post(reverse("intake"), self.payload)
+
+        self.assertEqual(seen, [(1, 0)])
+        self.assertEqual(scheduler.global_counts(), (0, 0))
+
+    @patch("careplans.regeneration.generate_care_plan_from_llm", return_value=("LLM PLAN", None, None))
+    def test_deferred_plans_are_generated_later(self, llm):
+        with override_settings(ADMISSION_DEFER_IN_FLIGHT=0):
+            self.client.post(reverse("intake"), self.payload)
+
+        out = StringIO()
+        call_command("generate_deferred_plans", workers=1, stdout=out)
+
+        llm.assert_called_once_with("Clinical notes...", "IVIG")
+        self.assertIn("Generated 1 deferred plan(s), 0 failed.", out.getvalue())
+        plan = CarePlan.objects.get()
+        self.assertEqual(plan.generated_text, "LLM PLAN")
+        self.assertFalse(plan.is_draft or plan.generation_deferred)
+
+    @patch("careplans.regeneration.generate_care_plan_from_llm")
+    def test_overlapping_runs_generate_each_order_once(self, llm):
+        with override_settings(ADMISSION_DEFER_IN_FLIGHT=0):
+            self.client.post(reverse("intake"), self.payload)
+        order = Order.objects.get()
+        outputs = []
+
+        def generate(*args):
+            # A second run that listed the same order starts mid-generation
+            out = StringIO()
+            with patch("careplans.management.commands.generate_deferred_plans.Order.objects.filter") as listed:
+                listed.return_value.order_by.return_value = [order]
+                call_command("generate_deferred_plans", workers=1, stdout=out)
+            outputs.append(out.getvalue())
+            return "LLM PLAN", None, None
+
+        llm.side_effect = generate
+        call_command("generate_deferred_plans", workers=1, stdout=StringIO())
+
+        llm.assert_called_once()
+        self.assertIn("Generated 0 deferred plan(s), 0 failed. 1 already taken by another run.", outputs[0])
+        self.assertEqual(CarePlan.objects.get().generated_text, "LLM PLAN")
+
+    @patch("careplans.regeneration.generate_care_plan_from_llm", return_value=(None, "unavailable", None))
+    def test_failed_deferred_generation_is_deferred_again(self, llm):
+        with override_settings(ADMISSION_DEFER_IN_FLIGHT=0):
+            self.client.post(reverse("intake"), self.payload)
+
+        out = StringIO()
+        call_command("generate_deferred_plans", workers=1, stdout=out, stderr=StringIO())
+
+        self.assertIn("0 deferred plan(s), 1 failed.", out.getvalue())
+        self.assertTrue(CarePlan.objects.get().generation_deferred)
+
+    def test_metrics_are_staff_only_and_report_decisions(self):
+        with override_settings(ADMISSION_REJECT_ACTIVE_REQUESTS=1):
+            self.client.post(reverse("intake"), self.payload)
+
+        url = reverse("admission_metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        body = self.client.get(url).json()
+
+        self.assertEqual(body["decisions"]["reject"], 1)
+        self.assertEqual(body["thresholds"]["defer_global_in_flight"], 16)
+        self.assertEqual(body["load"]["global_running"], 0)
+        self.assertFalse(body["global_counts_shared"])
+        self.assertIn("urgent", body["scheduler"])
+
+
+class TestSharedCounters(TestCase):
+
+    def test_per_process_cache_is_flagged_for_deploys(self):
+        self.assertFalse(scheduler.counts_are_shared())
+        self.assertEqual([w.id for w in scheduler.check_shared_counters(None)], ["careplans.W002"])
+
+    @skipUnless(importlib.util.find_spec("redis"), "redis is not installed")
+    def test_cache_url_configures_a_shared_cache(self):
+        config = _cache_config("redis://cache.internal:6379/0")
+        self.assertEqual(config["BACKEND"], "django.core.cache.backends.redis.RedisCache")
+        self.assertEqual(config["LOCATION"], "redis://cache.internal:6379/0")
+        with self.assertRaises(ImproperlyConfigured):
+            _cache_config("mongodb://cache.internal")
+
+        with override_settings(CACHES={"default": config}):
+            self.assertTrue(scheduler.counts_are_shared())
+            self.assertEqual(scheduler.check_shared_counters(None), [])
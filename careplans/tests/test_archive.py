@@ -0,0 +1,117 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import archive
+from careplans.forms import OrderIntakeForm
+from careplans.models import CarePlan, CarePlanVersion, GenerationRun, Order, OrderArchive, Patient, Provider
+
+
+@override_settings(ORDER_RETENTION_DAYS=365)
+class TestArchiveOrders(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(mrn="123456", first_name="Alice", last_name="Gray")
+        self.provider = Provider.objects.create(name="Dr House", npi="1111111111")
+        self.old_date = timezone.localdate() - timedelta(days=400)
+
+    def _order(self, order_date, medication="IVIG"):
+        return Order.objects.create(
+            patient=self.patient,
+            provider=self.provider,
+            medication_name=medication,
+            order_date=order_date,
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text="Clinical notes...",
+        )
+
+    def _form(self, order_date, medication="ivig"):
+        return OrderIntakeForm(data=self._data(order_date, medication))
+
+    def _data(self, order_date, medication="ivig"):
+        return {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": medication,
+            "order_date": order_date,
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        }
+
+    def test_moves_old_orders_with_their_care_plans(self):
+        old = self._order(self.old_date)
+        CarePlan.objects.create(order=old, generated_text="OLD PLAN", prompt_version="care_plan@v2")
+        CarePlanVersion.objects.create(order=old, version=1, generated_text="OLD PLAN")
+        GenerationRun.objects.create(order=old, backend="StubBackend", prompt_version="care_plan@v2",
+                                     outcome=GenerationRun.OUTCOME_SUCCESS, latency_ms=10)
+        recent = self._order(timezone.localdate())
+
+        out = StringIO()
+        call_command("archive_orders", stdout=out)
+
+        self.assertIn("Archived 1 order(s)", out.getvalue())
+        self.assertEqual(list(Order.objects.all()), [recent])
+        self.assertFalse(CarePlan.objects.filter(order_id=old.pk).exists())
+
+        archived = OrderArchive.objects.get()
+        self.assertEqual((archived.pk, archived.order_date, archived.patient), (old.pk, self.old_date, self.patient))
+        payload = archive.unpack(archived.payload)
+        self.assertEqual(payload["patient_records_text"], "Clinical notes...")
+        self.assertEqual(payload["care_plan"]["generated_text"], "OLD PLAN")
+        self.assertEqual([v["version"] for v in payload["versions"]], [1])
+        self.assertIsNone(GenerationRun.objects.get().order)
+
+    def test_dry_run_and_before_never_pass_the_retention_boundary(self):
+        self._order(self.old_date)
+        self._order(timezone.localdate() - timedelta(days=30))
+
+        out = StringIO()
+        call_command("archive_orders", dry_run=True, before=timezone.localdate().isoformat(), stdout=out)
+
+        self.assertIn("Would archive 1 order(s)", out.getvalue())
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_intake_blocks_duplicate_of_archived_order(self):
+        self._order(self.old_date)
+        archive.archive_orders()
+
+        form = self._form(self.old_date)
+        self.assertFalse(form.is_valid())
+        self.assertIn("Duplicate order", str(form.errors))
+        self.assertTrue(self._form(self.old_date, medication="Humira").is_valid())
+
+    def test_save_rechecks_archive_after_validation(self):
+        form = self._form(self.old_date)
+        self.assertTrue(form.is_valid())
+        # Archived between clean() and save()
+        self._order(self.old_date)
+        archive.archive_orders()
+
+        with self.assertRaises(IntegrityError):
+            form.save()
+        self.assertFalse(Order.objects.exists())
+
+    def test_intake_reports_an_order_archived_during_submission(self):
+        # Archived between clean() (finds nothing) and save() (finds it)
+        with patch("careplans.forms.archive.archived_duplicate_exists", side_effect=[False, True]):
+            response = self.client.post(reverse("intake"), self._data(self.old_date))
+
+        self.assertRedirects(response, reverse("intake"), fetch_redirect_response=False)
+        self.assertIn("Duplicate order", " ".join(self.client.session["integrity_error"]))
+        self.assertFalse(Order.objects.exists())
+
+    def test_recent_dates_do_not_query_the_archive(self):
+        form = self._form(timezone.localdate())
+        with self.assertNumQueries(3):  # hard duplicate, soft duplicate, provider
+            self.assertTrue(form.is_valid())
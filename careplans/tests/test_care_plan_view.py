@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import regeneration
+from careplans.models import CarePlanVersion, Order, Patient, Provider
+from careplans.tests.test_sections import LLM_PLAN
+
+
+class TestCarePlanFragment(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(self.staff)
+        self.order = Order.objects.create(
+            patient=Patient.objects.create(mrn="123456", first_name="A", last_name="B"),
+            provider=Provider.objects.create(npi="1111111111", name="Dr House"),
+            medication_name="IVIG",
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text="Clinical notes...",
+        )
+        self.url = reverse("care_plan_fragment", args=[self.order.pk])
+
+    def save(self, text, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return regeneration.save_care_plan(self.order, text, **fields)
+
+    def test_plan_is_served_with_validators_and_no_store(self):
+        self.save(LLM_PLAN)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"plan-{self.order.pk}-v1"')
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-store", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertContains(response, "BUN and creatinine before each infusion.")
+
+    def test_matching_etag_gets_304_without_touching_the_plan(self):
+        self.save(LLM_PLAN)
+        etag = self.client.get(self.url)["ETag"]
+
+        # Session and user lookups only
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_new_version_changes_the_etag(self):
+        self.save("draft", mode=CarePlanVersion.MODE_DRAFT)
+        etag = self.client.get(self.url)["ETag"]
+
+        self.save(LLM_PLAN)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"plan-{self.order.pk}-v2"')
+        self.assertContains(response, "Infusion reaction risk")
+
+    def test_rendered_plan_is_reused(self):
+        self.save(LLM_PLAN)
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.content, first.content)
+
+    def test_stale_cached_state_is_corrected(self):
+        self.save("draft", mode=CarePlanVersion.MODE_DRAFT)
+        # Saved without publishing, as by another process with its own cache
+        regeneration.save_care_plan(self.order, LLM_PLAN)
+
+        response = self.client.get(self.url)
+
+        # Cached state says v1, but the body and validators are v2
+        self.assertEqual(response["ETag"], f'"plan-{self.order.pk}-v2"')
+        self.assertContains(response, "Infusion reaction risk")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_order_without_plan_is_404(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_requires_staff(self):
+        self.save(LLM_PLAN)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
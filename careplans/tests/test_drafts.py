@@ -0,0 +1,86 @@
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import drafts
+from careplans.models import CarePlan, Order
+
+
+class TestDraftRules(SimpleTestCase):
+
+    def test_draft_has_the_four_sections_from_lookup_tables(self):
+        text = drafts.build_draft("IVIG", "G70.01", ["N18.3"], ["Pyridostigmine"])
+
+        for section in ("1. Problem List", "2. SMART Goals", "3. Pharmacist Interventions", "4. Monitoring Plan"):
+            self.assertIn(section, text)
+        self.assertIn("Myasthenia gravis", text)
+        self.assertIn("Premeds: acetaminophen", text)
+        self.assertIn("CKD: higher risk of nephrotoxicity", text)
+        self.assertIn("Reconcile home medications: Pyridostigmine.", text)
+
+    def test_lookup_by_alias_and_most_specific_code(self):
+        index = drafts.get_index()
+        self.assertEqual(index.medication("adalimumab 40 mg").name, "Humira")
+        self.assertEqual(index.medication("Immune Globulin").name, "IVIG")
+        self.assertEqual(index.diagnosis("D59.5").label, "Paroxysmal nocturnal hemoglobinuria")
+        self.assertIsNone(index.diagnosis("Z99"))
+
+    def test_same_class_home_medication_is_flagged(self):
+        text = drafts.build_draft("Remicade", "K50.9", [], ["Humira"])
+        self.assertIn("Possible therapy duplication: Humira is also a TNF inhibitor.", text)
+
+    def test_unknown_medication_and_diagnosis_still_render(self):
+        text = drafts.build_draft("Zzzumab", "Q99.9")
+        self.assertIn("Zzzumab: no draft rule", text)
+        self.assertIn("Q99.9: no draft rule", text)
+
+    def test_renders_in_milliseconds(self):
+        start = time.perf_counter()
+        for _ in range(100):
+            drafts.build_draft("IVIG", "G70.01", ["I10", "E11.9"], ["Pyridostigmine", "Prednisone"])
+        self.assertLess((time.perf_counter() - start) / 100, 0.005)
+
+
+class TestDraftInIntake(TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        }
+
+    @patch(
+        "careplans.views.generate_care_plan_from_llm",
+        return_value=(None, "The AI service is currently unavailable.", None),
+    )
+    def test_llm_failure_shows_the_draft(self, _llm):
+        response = self.client.post(reverse("intake"), self.payload, follow=True)
+
+        self.assertTrue(response.context["plan_is_draft"])
+        self.assertContains(response, "Draft Care Plan")
+        self.assertContains(response, drafts.DRAFT_HEADER)
+        self.assertTrue(CarePlan.objects.get().is_draft)
+
+    @patch("careplans.views.generate_care_plan_from_llm", return_value=("LLM PLAN", None, None))
+    def test_llm_plan_replaces_the_draft(self, _llm):
+        response = self.client.post(reverse("intake"), self.payload, follow=True)
+
+        self.assertFalse(response.context["plan_is_draft"])
+        plan = CarePlan.objects.get()
+        self.assertEqual((plan.generated_text, plan.is_draft), ("LLM PLAN", False))
+        self.assertEqual(
+            list(Order.objects.get().care_plan_versions.values_list("mode", flat=True)),
+            ["full", "draft"],
+        )
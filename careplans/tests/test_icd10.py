@@ -0,0 +1,99 @@
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from careplans import icd10
+from careplans.forms import OrderIntakeForm
+from careplans.models import Order, Patient, Provider
+
+
+class TestIcd10Index(SimpleTestCase):
+
+    def test_full_code_set_with_descriptions(self):
+        index = icd10.get_index()
+        self.assertGreater(len(index), 90_000)
+
+        code = icd10.lookup("g7001")
+        self.assertEqual(code.code, "G70.01")
+        self.assertEqual(code.description, "Myasthenia gravis with (acute) exacerbation")
+        self.assertTrue(code.billable)
+        self.assertFalse(icd10.lookup("G70.0").billable)  # valid category, not billable
+
+    def test_unknown_and_malformed_codes(self):
+        for code in ("G70.3", "Z99.999", "", "G70.0000000", "Ä12"):
+            self.assertNotIn(code, icd10.get_index())
+
+    def test_lookup_is_microseconds(self):
+        index = icd10.get_index()
+        start = time.perf_counter()
+        for _ in range(10_000):
+            "S72.001A" in index
+        self.assertLess((time.perf_counter() - start) / 10_000, 50e-6)
+
+    def test_missing_index_fails_loudly_until_built(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "icd.idx"
+            with override_settings(ICD10_INDEX_PATH=path):
+                with self.assertRaisesMessage(ImproperlyConfigured, "build_icd10_index"):
+                    icd10.get_index()
+                self.assertEqual([e.id for e in icd10.check_index(None)], ["careplans.E001"])
+                self.assertFalse(path.exists())  # never built inside a request
+
+                call_command("build_icd10_index", stdout=StringIO())
+
+                self.assertEqual(icd10.check_index(None), [])
+                self.assertIn("I10", icd10.get_index())
+            icd10._indexes.pop(path)
+
+
+class TestIcd10Validation(TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "g7001",
+            "additional_diagnoses": "i10, E11.9",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        }
+
+    def test_form_normalizes_valid_codes(self):
+        order = OrderIntakeForm(data=self.payload).save()
+        self.assertEqual(order.primary_diagnosis_icd10, "G70.01")
+        self.assertEqual(order.additional_diagnoses, ["I10", "E11.9"])
+
+    def test_form_rejects_unknown_codes(self):
+        form = OrderIntakeForm(data={
+            **self.payload, "primary_diagnosis_icd10": "G70.3", "additional_diagnoses": "I10, E99.1",
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn("Unknown ICD-10-CM code: G70.3", str(form.errors["primary_diagnosis_icd10"]))
+        self.assertIn("E99.1", str(form.errors["additional_diagnoses"]))
+
+    def test_model_validation_covers_non_form_paths(self):
+        order = Order(
+            patient=Patient.objects.create(mrn="123456", first_name="A", last_name="B"),
+            provider=Provider.objects.create(npi="1111111111", name="Dr House"),
+            medication_name="IVIG",
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.3",
+            additional_diagnoses=["I10", "XYZ"],
+            patient_records_text="notes",
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            order.full_clean()
+        self.assertEqual(
+            set(ctx.exception.message_dict), {"primary_diagnosis_icd10", "additional_diagnoses"}
+        )
@@ -0,0 +1,132 @@
+import hashlib
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import idempotency
+from careplans.models import CarePlan, IdempotencyKey, Order
+
+
+@patch("careplans.views.generate_care_plan_from_llm", return_value=("PLAN", None, None))
+class TestIntakeIdempotency(TestCase):
+
+    def setUp(self):
+        self.key = idempotency.new_key()
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+            "idempotency_key": self.key,
+        }
+        # Loading the form starts the session the key is scoped to
+        self.client.get(reverse("intake"))
+
+    def stored_key(self, client=None):
+        scope = (client or self.client).session[idempotency.SESSION_SCOPE]
+        return hashlib.sha256(f"{scope}:{self.key}".encode()).hexdigest()
+
+    def test_form_renders_fresh_key(self, _llm):
+        response = self.client.get(reverse("intake"))
+        self.assertContains(response, 'name="idempotency_key"')
+        self.assertNotEqual(response.context["idempotency_key"], idempotency.new_key())
+
+    def test_resubmit_replays_without_second_order_or_llm_call(self, llm):
+        self.client.post(reverse("intake"), self.payload)
+        response = self.client.post(reverse("intake"), self.payload, follow=True)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(CarePlan.objects.count(), 1)
+        self.assertEqual(llm.call_count, 1)
+        # Same outcome as the first submit, not a "Duplicate order" error
+        self.assertEqual(response.context["plan_text"], "PLAN")
+        self.assertIsNone(response.context["integrity_error"])
+
+    def test_header_key_is_honored(self, llm):
+        payload = {k: v for k, v in self.payload.items() if k != "idempotency_key"}
+        for _ in range(2):
+            self.client.post(reverse("intake"), payload, HTTP_IDEMPOTENCY_KEY=self.key)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(llm.call_count, 1)
+
+    def post_request(self):
+        return RequestFactory().post(reverse("intake"), self.payload)
+
+    def test_in_flight_key_is_not_processed_twice(self, llm):
+        self.assertTrue(idempotency.claim(self.stored_key(), idempotency.fingerprint(self.post_request())))
+        response = self.client.post(reverse("intake"), self.payload, follow=True)
+
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertFalse(llm.called)
+        self.assertIn("already being processed", str(response.context["integrity_error"]))
+
+    def test_invalid_submission_releases_key(self, llm):
+        self.client.post(reverse("intake"), {**self.payload, "patient_mrn": "bad"})
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.client.post(reverse("intake"), self.payload)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_can_be_reused(self, llm):
+        self.client.post(reverse("intake"), self.payload)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        Order.objects.all().delete()
+
+        self.client.post(reverse("intake"), self.payload)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(llm.call_count, 2)
+
+    def test_key_reused_for_a_different_patient_is_rejected(self, llm):
+        self.client.post(reverse("intake"), self.payload, follow=True)
+        other = {**self.payload, "patient_mrn": "654321", "patient_first_name": "Bob"}
+
+        response = self.client.post(reverse("intake"), other)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertContains(response, "already used for a different submission", status_code=422)
+        self.assertNotContains(response, "PLAN", status_code=422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_does_not_replay_to_another_session(self, llm):
+        self.client.post(reverse("intake"), self.payload)
+        other_client = Client()
+        other_client.get(reverse("intake"))
+
+        response = other_client.post(
+            reverse("intake"), {**self.payload, "patient_mrn": "654321"}, follow=True
+        )
+
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(llm.call_count, 2)
+        self.assertNotEqual(self.stored_key(other_client), self.stored_key())
+        self.assertIsNone(response.context["integrity_error"])
+
+    def test_abandoned_claim_is_taken_over_after_its_lease(self, llm):
+        idempotency.claim(self.stored_key(), idempotency.fingerprint(self.post_request()))
+        # The worker holding it died; its lease runs out
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        self.client.post(reverse("intake"), self.payload)
+
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_in_flight_lease_is_short_and_recorded_result_is_kept(self, llm):
+        before = timezone.now()
+        self.assertTrue(idempotency.claim(self.stored_key(), "f"))
+        lease_end = IdempotencyKey.objects.get().expires_at
+        self.assertLess(lease_end, before + timedelta(hours=1))
+
+        IdempotencyKey.objects.all().delete()
+        self.client.post(reverse("intake"), self.payload)
+        self.assertGreater(IdempotencyKey.objects.get().expires_at, before + timedelta(hours=23))
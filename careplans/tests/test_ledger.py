@@ -0,0 +1,134 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import ledger
+from careplans.llm_backends import Completion, OpenAIBackend, StubBackend
+from careplans.models import GenerationRun, Order
+from careplans.services import generate_care_plan_from_llm
+
+
+@override_settings(LLM_BACKEND="stub", LLM_MAX_ATTEMPTS=2, LLM_RETRY_BACKOFF=0)
+class TestGenerationRuns(TestCase):
+
+    def test_intake_records_the_run_against_its_order(self):
+        self.client.post(reverse("intake"), {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        })
+
+        run = GenerationRun.objects.get()
+        self.assertEqual(run.order, Order.objects.get())
+        self.assertEqual((run.medication_name, run.priority), ("IVIG", "urgent"))
+        self.assertEqual((run.backend, run.model, run.prompt_version), ("StubBackend", "stub", "care_plan@v2"))
+        self.assertEqual((run.outcome, run.attempt), (GenerationRun.OUTCOME_SUCCESS, 1))
+        self.assertGreater(run.prompt_tokens, 0)
+        self.assertFalse(run.cache_hit)
+
+    @patch.object(StubBackend, "complete")
+    def test_transient_failure_is_retried_and_both_attempts_recorded(self, complete):
+        complete.side_effect = [TimeoutError("slow"), Completion("PLAN", 100, 50, 80, "gpt-4o-2024-08-06")]
+
+        text, error, _ = generate_care_plan_from_llm("notes", "IVIG")
+
+        self.assertEqual((text, error), ("PLAN", None))
+        first, second = GenerationRun.objects.order_by("attempt")
+        self.assertEqual((first.outcome, first.error_type), (GenerationRun.OUTCOME_ERROR, "TimeoutError"))
+        self.assertEqual((second.outcome, second.attempt, second.cache_hit), (GenerationRun.OUTCOME_SUCCESS, 2, True))
+        self.assertIsNone(second.order)
+
+    @patch.object(StubBackend, "complete", side_effect=ValueError("bad request"))
+    def test_permanent_failure_is_not_retried(self, complete):
+        text, error, _ = generate_care_plan_from_llm("notes", "IVIG")
+
+        self.assertIsNone(text)
+        self.assertIn("unavailable", error)
+        self.assertEqual(complete.call_count, 1)
+        self.assertEqual(GenerationRun.objects.get().error_type, "ValueError")
+
+    @override_settings(LLM_TIMEOUT=15, LLM_TOTAL_TIMEOUT=4, LLM_MIN_ATTEMPT_TIMEOUT=2, LLM_RETRY_BACKOFF=3)
+    @patch.object(StubBackend, "complete", side_effect=TimeoutError("slow"))
+    def test_retries_stay_within_the_total_timeout(self, complete):
+        text, error, _ = generate_care_plan_from_llm("notes", "IVIG")
+
+        self.assertIsNone(text)
+        # The attempt gets what's left of the total, and no retry starts
+        # once the backoff would leave less than the minimum attempt
+        self.assertEqual(complete.call_count, 1)
+        self.assertLessEqual(complete.call_args.kwargs["timeout"], 4)
+
+    def test_openai_sdk_does_not_retry_on_its_own(self):
+        with patch("openai.OpenAI") as client:
+            OpenAIBackend()._client("key")
+        client.assert_called_once_with(api_key="key", max_retries=0)
+
+    def test_ledger_write_failure_does_not_fail_generation(self):
+        with patch.object(GenerationRun.objects, "create", side_effect=DatabaseError("down")):
+            with self.assertLogs("careplans.ledger", "ERROR"):
+                text, error, _ = generate_care_plan_from_llm("notes", "IVIG")
+        self.assertIsNotNone(text)
+        self.assertIsNone(error)
+
+
+class TestLLMReport(TestCase):
+
+    def _run(self, medication, latency_ms, outcome=GenerationRun.OUTCOME_SUCCESS, days_ago=0, **fields):
+        run = GenerationRun.objects.create(
+            medication_name=medication,
+            backend="OpenAIBackend",
+            model="gpt-4o-2024-08-06",
+            prompt_version="care_plan@v2",
+            outcome=outcome,
+            latency_ms=latency_ms,
+            **fields,
+        )
+        if days_ago:
+            GenerationRun.objects.filter(pk=run.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return run
+
+    def test_cost_uses_longest_model_prefix(self):
+        cost = ledger.estimate_cost("gpt-4o-2024-08-06", 1_000_000, 400_000, 100_000)
+        self.assertAlmostEqual(cost, 0.6 * 2.50 + 0.4 * 1.25 + 0.1 * 10.00)
+        self.assertIsNone(ledger.estimate_cost("some-other-model", 10, 0, 10))
+
+    def test_summary_per_medication(self):
+        for latency in range(100, 2100, 100):  # 20 runs: 100..2000 ms
+            self._run("IVIG", latency, prompt_tokens=1000, cached_tokens=500, completion_tokens=200)
+        self._run("ivig ", 5000, outcome=GenerationRun.OUTCOME_ERROR, attempt=2)
+        self._run("Humira", 300, prompt_tokens=800, completion_tokens=100)
+
+        ivig, humira = sorted(ledger.summarize(GenerationRun.objects.all(), "medication"), key=lambda s: s.key != "ivig")
+        self.assertEqual((ivig.runs, ivig.failures, ivig.retries), (21, 1, 1))
+        self.assertEqual((ivig.p50_ms, ivig.p95_ms), (1100, 2000))
+        self.assertAlmostEqual(ivig.cache_rate, 0.5)
+        self.assertEqual(humira.key, "humira")
+
+    def test_report_per_day_within_range(self):
+        self._run("IVIG", 400, prompt_tokens=1000, completion_tokens=200)
+        self._run("IVIG", 900, outcome=GenerationRun.OUTCOME_ERROR, days_ago=1)
+        self._run("IVIG", 100, days_ago=60)
+
+        out = StringIO()
+        call_command("llm_report", days=7, stdout=out)
+        report = out.getvalue()
+
+        self.assertIn(timezone.localdate().isoformat(), report)
+        self.assertIn((timezone.localdate() - timedelta(days=1)).isoformat(), report)
+        self.assertNotIn((timezone.localdate() - timedelta(days=60)).isoformat(), report)
+        self.assertRegex(report, r"total\s+2\s+50\.0%")
+        self.assertRegex(report, r"ivig\s+2\s+50\.0%\s+0\s+400\s+900")
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from careplans import llm_backends
+from careplans.services import generate_care_plan_from_llm
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+class TestLazySDKImport(SimpleTestCase):
+
+    def test_app_startup_does_not_import_openai(self):
+        code = (
+            "import sys, django; django.setup();"
+            "import careplans.urls, careplans.services;"
+            "print('openai' in sys.modules)"
+        )
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "lamar_project.settings",
+            "SECRET_KEY": "test",
+            "DATABASE_URL": "sqlite://:memory:",
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+class TestBackendSelection(TestCase):
+
+    @override_settings(LLM_BACKEND="stub", OPENAI_API_KEY=None)
+    def test_stub_backend_needs_no_key_or_network(self):
+        text, error, usage = generate_care_plan_from_llm("clinical text", "IVIG")
+
+        self.assertIsNone(error)
+        self.assertIn("Monitoring Plan", text)
+        self.assertEqual(usage["prompt_version"], "care_plan@v2")
+
+    @override_settings(LLM_BACKEND="careplans.llm_backends.StubBackend")
+    def test_dotted_path_and_alias_share_an_instance(self):
+        backend = llm_backends.get_backend()
+        with override_settings(LLM_BACKEND="stub"):
+            self.assertIs(llm_backends.get_backend(), backend)
+
+    def test_backend_must_implement_complete(self):
+        class Incomplete(llm_backends.LLMBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    @override_settings(LLM_BACKEND="openai-async")
+    @patch("careplans.llm_backends.AsyncOpenAIBackend._client")
+    def test_async_backend_serves_sync_callers(self, client_factory):
+        client = MagicMock()
+        client.__aenter__ = AsyncMock(return_value=client)
+        client.__aexit__ = AsyncMock(return_value=False)
+        client.chat.completions.create = AsyncMock(return_value=SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ASYNC PLAN"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None),
+        ))
+        client_factory.return_value = client
+
+        text, error, usage = generate_care_plan_from_llm("clinical text", "IVIG")
+
+        self.assertEqual((text, error), ("ASYNC PLAN", None))
+        self.assertEqual((usage["prompt_tokens"], usage["cached_tokens"]), (10, None))
@@ -1,14 +1,20 @@
-from django.test import TestCase
+from types import SimpleNamespace
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from unittest.mock import patch, MagicMock
+from careplans import prompts
+from careplans.models import CarePlan, Order, Patient, Provider
+from careplans.regeneration import save_care_plan
 from careplans.services import generate_care_plan_from_llm
 
 class TestLLMIntegration(TestCase):
 
-    @patch('careplans.services.OpenAI')
-    def test_llm_success(self, mock_openai_class):
+    @patch('careplans.llm_backends.OpenAIBackend._client')
+    def test_llm_success(self, mock_client_factory):
         # 1. Setup the mock client instance
         mock_client = MagicMock()
-        mock_openai_class.return_value = mock_client
+        mock_client_factory.return_value = mock_client
 
         # 2. Mock the nested response path for Chat Completions
         # This mirrors: response.choices[0].message.content
@@ -19,24 +25,69 @@ class TestLLMIntegration(TestCase):
         mock_client.chat.completions.create.return_value = mock_response
 
         # 3. Call the service
-        text, error = generate_care_plan_from_llm("clinical text", "IVIG")
+        text, error, usage = generate_care_plan_from_llm("clinical text", "IVIG")
 
         # 4. Assertions
         self.assertEqual(text, "CARE PLAN")
         self.assertIsNone(error)
+        self.assertEqual(usage["prompt_version"], "care_plan@v2")
 
-    @patch('careplans.services.OpenAI')
-    def test_llm_failure(self, mock_openai_class):
+    @patch('careplans.llm_backends.OpenAIBackend._client')
+    def test_llm_failure(self, mock_client_factory):
         # 1. Setup mock
         mock_client = MagicMock()
-        mock_openai_class.return_value = mock_client
+        mock_client_factory.return_value = mock_client
 
         # 2. Add "[TEST]" prefix to the simulated error
         mock_client.chat.completions.create.side_effect = Exception("[TEST] Simulated Connection Failure")
 
         # 3. Call the service
-        text, error = generate_care_plan_from_llm("clinical text", "IVIG")
+        text, error, usage = generate_care_plan_from_llm("clinical text", "IVIG")
 
         # 4. Assertions
         self.assertIsNone(text)
-        self.assertIn("unavailable", error.lower())
\ No newline at end of file
+        self.assertIn("unavailable", error.lower())
+        self.assertIsNone(usage)
+
+class TestPromptTemplates(TestCase):
+
+    def test_static_prefix_is_identical_across_orders(self):
+        template = prompts.get_template(prompts.CARE_PLAN)
+        a = template.render(patient_records_text="notes A", medication_name="IVIG")
+        b = template.render(patient_records_text="notes B", medication_name="Rituximab")
+
+        self.assertEqual(a[0], b[0])
+        self.assertNotIn("IVIG", a[0]["content"])
+        # Per-order values only appear at the tail of the last message
+        self.assertTrue(a[1]["content"].rstrip().endswith("notes A"))
+
+    @override_settings(PROMPT_VERSIONS={prompts.CARE_PLAN: 1})
+    def test_pinning_an_unregistered_version_fails_loudly(self):
+        with self.assertRaises(prompts.UnknownPrompt):
+            prompts.get_template(prompts.CARE_PLAN)
+
+    @patch('careplans.llm_backends.OpenAIBackend._client')
+    def test_cached_tokens_recorded_on_care_plan(self, mock_client_factory):
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="CARE PLAN"))]
+        mock_response.usage = SimpleNamespace(
+            prompt_tokens=1400,
+            completion_tokens=600,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=1280),
+        )
+        mock_client_factory.return_value.chat.completions.create.return_value = mock_response
+
+        text, _, usage = generate_care_plan_from_llm("clinical text", "IVIG")
+        order = Order.objects.create(
+            patient=Patient.objects.create(mrn="123456", first_name="A", last_name="B"),
+            provider=Provider.objects.create(npi="1111111111", name="Dr House"),
+            medication_name="IVIG",
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text="clinical text",
+        )
+        save_care_plan(order, text, usage)
+
+        plan = CarePlan.objects.get(order=order)
+        self.assertEqual((plan.prompt_version, plan.cached_tokens), ("care_plan@v2", 1280))
+        self.assertEqual(order.care_plan_versions.get().prompt_tokens, 1400)
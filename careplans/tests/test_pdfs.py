@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import pdfs
+from careplans.models import CarePlan, Order
+
+
+def make_pdf(pages):
+    """A minimal PDF with one line of Helvetica text per page (None = blank page)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = b"" if text is None else b"BT /F1 12 Tf 72 720 Td (%s) Tj ET" % text.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def upload(content, name="chart.pdf"):
+    return SimpleUploadedFile(name, content, content_type="application/pdf")
+
+
+@override_settings(PDF_WORKERS=0, PDF_PAGES_PER_TASK=2)
+class TestPdfExtraction(TestCase):
+
+    def setUp(self):
+        caches[pdfs.CACHE_ALIAS].clear()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, content, name="chart.pdf"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_pages_are_extracted_in_order(self):
+        extracted = pdfs.extract_path(self.write(make_pdf(["Page one", "Page two", None, "Page four", "Page five"])))
+
+        self.assertEqual(extracted.text, "Page one\n\nPage two\n\nPage four\n\nPage five")
+        self.assertEqual((extracted.pages, extracted.empty_pages, extracted.cached_pages), (5, 1, 0))
+
+    def test_second_upload_of_same_file_is_served_from_cache(self):
+        content = make_pdf(["Cached page", "Another"])
+        pdfs.extract_path(self.write(content))
+
+        with patch("careplans.pdfs._extract_pages") as extract:
+            extracted = pdfs.extract_path(self.write(content, "again.pdf"))
+
+        extract.assert_not_called()
+        self.assertEqual((extracted.text, extracted.cached_pages), ("Cached page\n\nAnother", 2))
+
+    def test_too_many_pages_is_rejected(self):
+        with override_settings(PDF_MAX_PAGES=2), self.assertRaisesMessage(pdfs.PdfError, "at most 2"):
+            pdfs.extract_path(self.write(make_pdf(["a", "b", "c"])))
+
+    def test_ranges_split_contiguous_runs(self):
+        self.assertEqual(list(pdfs._ranges([0, 1, 2, 3, 4, 7, 8], 2)), [(0, 2), (2, 4), (4, 5), (7, 9)])
+
+    @override_settings(PDF_WORKERS=1)
+    def test_process_pool(self):
+        extracted = pdfs.extract_path(self.write(make_pdf(["From a worker", "process"])))
+        self.assertEqual(extracted.text, "From a worker\n\nprocess")
+
+    @override_settings(PDF_WORKERS=1)
+    def test_timeout_only_stops_its_own_extraction(self):
+        # Opening a FIFO blocks until something writes to it: a worker
+        # stuck mid-task, for as long as the test likes
+        stuck, waiting = os.path.join(self.tmp, "stuck.pdf"), os.path.join(self.tmp, "waiting.pdf")
+        os.mkfifo(stuck)
+        os.mkfifo(waiting)
+        # Page text already cached, so the waiting extraction opens its file once
+        caches[pdfs.CACHE_ALIAS].set(pdfs.CACHE_KEY.format("fifo", 0), "Still here")
+        results = {}
+
+        def extract_waiting():
+            results["waiting"] = pdfs.extract_path(waiting, timeout=60)
+
+        with patch("careplans.pdfs.sha256_file", return_value="fifo"):
+            thread = threading.Thread(target=extract_waiting)
+            thread.start()
+            with self.assertRaisesMessage(pdfs.PdfError, "took too long"):
+                pdfs.extract_path(stuck, timeout=1)
+            # The other upload's worker is still there to read its file
+            with open(waiting, "wb") as f:
+                f.write(make_pdf(["Still here"]))
+            thread.join(60)
+
+        self.assertEqual(results["waiting"].text, "Still here")
+        # The stuck worker was killed with its pool (it would never return)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+
+@override_settings(PDF_WORKERS=0)
+@patch("careplans.regeneration.generate_care_plan_from_llm", return_value=("LLM PLAN", None, None))
+class TestPdfIntake(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches[pdfs.CACHE_ALIAS].clear()
+        self.addCleanup(shutil.rmtree, settings.PDF_PENDING_DIR, ignore_errors=True)
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "",
+        }
+
+    def _errors(self):
+        return " ".join(str(e) for e in self.client.session.get("integrity_error") or [])
+
+    def _generate(self):
+        out = StringIO()
+        call_command("generate_deferred_plans", workers=1, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_pdf_notes_are_read_after_the_request(self, llm):
+        with patch("careplans.pdfs.extract_path") as extract:
+            response = self.client.post(
+                reverse("intake"),
+                {**self.payload, "patient_records_pdf": upload(make_pdf(["Tolerated IVIG well", "Vitals stable"]))},
+            )
+
+        self.assertEqual(response.status_code, 302)
+        extract.assert_not_called()
+        self.assertEqual(self.client.session["plan_queued"], pdfs.NOTES_QUEUED)
+        order = Order.objects.get()
+        path = order.notes_pdf.path
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(order.patient_records_text, "")
+        self.assertTrue(order.care_plan.generation_deferred)
+
+        self.assertIn("Generated 1 deferred plan(s), 0 failed.", self._generate())
+        order.refresh_from_db()
+        self.assertEqual(order.patient_records_text, "Tolerated IVIG well\n\nVitals stable")
+        self.assertIsNotNone(order.records_signature)
+        self.assertFalse(order.notes_pdf)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(order.care_plan.generated_text, "LLM PLAN")
+        llm.assert_called_once_with("Tolerated IVIG well\n\nVitals stable", "IVIG")
+
+    def test_unreadable_pdf_keeps_the_draft_and_shows_why(self, llm):
+        self.client.post(reverse("intake"), {**self.payload, "patient_records_pdf": upload(make_pdf([None]))})
+        order = Order.objects.get()
+
+        self.assertIn("1 failed", self._generate())
+        order.refresh_from_db()
+        self.assertEqual(order.notes_pdf_error, pdfs.NO_TEXT)
+        self.assertFalse(order.notes_pdf)
+        plan = CarePlan.objects.get(order=order)
+        self.assertEqual((plan.is_draft, plan.generation_deferred), (True, False))
+        llm.assert_not_called()
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        response = self.client.get(reverse("care_plan_fragment", args=[order.pk]))
+        self.assertContains(response, "Notes PDF not read")
+        # Not retried: the file is gone and a retry would fail the same way
+        self.assertIn("Generated 0 deferred plan(s)", self._generate())
+
+    def test_oversized_upload_is_rejected(self, llm):
+        with override_settings(PDF_MAX_UPLOAD_BYTES=100):
+            self.client.post(reverse("intake"), {**self.payload, "patient_records_pdf": upload(make_pdf(["x" * 500]))})
+
+        self.assertIn("larger than", self._errors())
+        self.assertFalse(Order.objects.exists())
+
+    def test_not_a_pdf_is_rejected(self, llm):
+        self.client.post(reverse("intake"), {**self.payload, "patient_records_pdf": upload(b"hello", "notes.pdf")})
+        self.assertIn("not a PDF", self._errors())
+        self.assertFalse(Order.objects.exists())
+
+    def test_notes_are_required_one_way_or_the_other(self, llm):
+        self.client.post(reverse("intake"), self.payload)
+        self.assertIn("Clinical notes are required", self._errors())
+
+        self.client.post(
+            reverse("intake"),
+            {**self.payload, "patient_records_text": "pasted", "patient_records_pdf": upload(make_pdf(["pdf"]))},
+        )
+        self.assertIn("not both", self._errors())
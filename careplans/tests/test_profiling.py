@@ -0,0 +1,93 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import profiling
+
+
+class TestProfilingMiddleware(TestCase):
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(PROFILING_DIR=str(self.dir), PROFILING_SAMPLE_RATE=0))
+        self.staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Zyxwv clinical notes",
+        }
+
+    def _captures(self):
+        return [json.loads(p.read_text()) for p in sorted(self.dir.glob("*.json"))]
+
+    @patch("careplans.views.generate_care_plan_from_llm", return_value=("LLM PLAN", None, None))
+    def test_staff_header_captures_intake_by_stage_without_phi(self, _llm):
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse("intake"), self.payload, HTTP_X_PROFILE="1")
+
+        capture = json.loads((self.dir / f"{response[profiling.RESPONSE_HEADER]}.json").read_text())
+        self.assertEqual((capture["method"], capture["path"], capture["status"]), ("POST", "/intake/", 302))
+        for name in ("clean", "save", "draft", "queue", "llm", "save_plan", "other"):
+            self.assertIn(name, capture["stages"])
+        self.assertGreater(capture["stages"]["save"]["queries"], 0)
+        self.assertTrue(capture["top_functions"])
+        self.assertTrue((self.dir / f"{capture['id']}.prof").exists())
+
+        raw = (self.dir / f"{capture['id']}.json").read_text()
+        for phi in ("Alice", "Gray", "123456", "Zyxwv"):
+            self.assertNotIn(phi, raw)
+
+    def test_header_is_ignored_for_non_staff(self):
+        response = self.client.get(reverse("intake"), HTTP_X_PROFILE="1")
+
+        self.assertNotIn(profiling.RESPONSE_HEADER, response)
+        self.assertEqual(self._captures(), [])
+
+    def test_sampled_requests_are_captured(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            self.client.get(reverse("intake"))
+
+        (capture,) = self._captures()
+        self.assertIn("render", capture["stages"])
+
+    def test_disabled_without_directory(self):
+        self.client.force_login(self.staff)
+        with override_settings(PROFILING_DIR=""):
+            response = self.client.get(reverse("intake"), HTTP_X_PROFILE="1")
+        self.assertNotIn(profiling.RESPONSE_HEADER, response)
+
+    def test_scrub_sql_drops_literals(self):
+        self.assertEqual(
+            profiling.scrub_sql("SELECT 1 FROM t0 WHERE mrn = '123456' AND id = 42"),
+            "SELECT ? FROM t0 WHERE mrn = '?' AND id = ?",
+        )
+
+    def test_report_lists_slowest_requests_by_stage(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            self.client.get(reverse("intake"))
+            self.client.get(reverse("intake"))
+
+        out = StringIO()
+        call_command("profile_report", limit=1, functions=3, stdout=out)
+
+        report = out.getvalue()
+        self.assertIn("Slowest 1 of 2 captured request(s)", report)
+        self.assertIn("GET /intake/ 200", report)
+        self.assertIn("render", report)
+        self.assertIn("Top functions of", report)
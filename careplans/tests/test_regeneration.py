@@ -0,0 +1,117 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import regeneration
+from careplans.models import CarePlan, CarePlanVersion, Order, Patient, Provider
+
+NOTES = "Patient: A.B.\nDOB: 1979-06-08\nWeight 72 kg.\n" + "Stable on home meds. " * 200
+
+
+class TestRecordsDelta(TestCase):
+
+    def test_appended_notes_send_only_the_addition(self):
+        delta = regeneration.records_delta(NOTES, NOTES + "\nLabs 2025-03-01: Cr 1.4")
+        self.assertEqual(delta, "Added:\nLabs 2025-03-01: Cr 1.4")
+
+    def test_edited_line_reports_added_and_removed(self):
+        delta = regeneration.records_delta("a\nWeight 72 kg\nb", "a\nWeight 70 kg\nb")
+        self.assertEqual(delta, "Added:\nWeight 70 kg\n\nRemoved:\nWeight 72 kg")
+
+    def test_extended_last_line_is_an_edit_not_an_addition(self):
+        delta = regeneration.records_delta("BP 120/80\nCr 1.4", "BP 120/80\nCr 1.45")
+        self.assertEqual(delta, "Added:\nCr 1.45\n\nRemoved:\nCr 1.4")
+
+    def test_whitespace_only_change_is_no_change(self):
+        self.assertEqual(regeneration.records_delta(NOTES, NOTES + "\n\n"), "")
+
+
+class TestRegenerateEndpoint(TestCase):
+
+    def setUp(self):
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        self.order = Order.objects.create(
+            patient=Patient.objects.create(mrn="123456", first_name="A", last_name="B"),
+            provider=Provider.objects.create(npi="1111111111", name="Dr House"),
+            medication_name="IVIG",
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text=NOTES,
+        )
+        regeneration.save_care_plan(self.order, "PLAN v1")
+        self.url = reverse("regenerate_care_plan", args=[self.order.pk])
+
+    @patch("careplans.regeneration.update_care_plan_from_llm")
+    def test_sends_delta_and_previous_plan_and_records_version(self, update):
+        update.return_value = ("PLAN v2", None, {"prompt_tokens": 150, "completion_tokens": 90})
+        new_notes = NOTES + "\nLabs 2025-03-01: Cr 1.4"
+
+        response = self.client.post(self.url, {"patient_records_text": new_notes})
+
+        self.assertEqual(response.status_code, 200)
+        update.assert_called_once_with("PLAN v1", "Added:\nLabs 2025-03-01: Cr 1.4", "IVIG")
+        body = response.json()
+        self.assertEqual((body["version"], body["mode"]), (2, "incremental"))
+        self.assertEqual(body["prompt_tokens"], 150)
+        self.assertGreater(body["tokens_saved"], 0)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.patient_records_text, new_notes)
+        self.assertEqual(CarePlan.objects.get(order=self.order).generated_text, "PLAN v2")
+        self.assertEqual(
+            list(self.order.care_plan_versions.values_list("version", "generated_text")),
+            [(2, "PLAN v2"), (1, "PLAN v1")],
+        )
+
+    @patch("careplans.regeneration.update_care_plan_from_llm")
+    def test_unchanged_records_skip_the_model(self, update):
+        response = self.client.post(self.url, {"patient_records_text": NOTES})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(update.called)
+        self.assertEqual(CarePlanVersion.objects.count(), 1)
+
+    @patch(
+        "careplans.regeneration.update_care_plan_from_llm",
+        return_value=(None, "The AI service is currently unavailable.", None),
+    )
+    def test_llm_failure_keeps_current_plan_and_records(self, _update):
+        response = self.client.post(self.url, {"patient_records_text": NOTES + "\nnew"})
+
+        self.assertEqual(response.status_code, 502)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.patient_records_text, NOTES)
+        self.assertEqual(CarePlan.objects.get(order=self.order).generated_text, "PLAN v1")
+
+    def test_requires_staff(self):
+        self.client.logout()
+        response = self.client.post(self.url, {"patient_records_text": NOTES + "\nnew"})
+        self.assertEqual(response.status_code, 302)
+
+    @patch("careplans.regeneration.generate_care_plan_from_llm", return_value=("PLAN v2", None, None))
+    @patch("careplans.regeneration.update_care_plan_from_llm")
+    def test_draft_is_replaced_by_full_generation(self, update, generate):
+        regeneration.save_care_plan(self.order, "DRAFT", mode=CarePlanVersion.MODE_DRAFT)
+
+        response = self.client.post(self.url, {"patient_records_text": NOTES})
+
+        self.assertEqual(response.json()["mode"], "full")
+        self.assertFalse(update.called)
+        self.assertFalse(CarePlan.objects.get(order=self.order).is_draft)
+
+    @patch(
+        "careplans.regeneration.generate_care_plan_from_llm",
+        return_value=("PLAN v2", None, {"prompt_tokens": 10, "completion_tokens": 90}),
+    )
+    def test_full_generation_with_reported_usage_saves_nothing(self, _generate):
+        regeneration.save_care_plan(self.order, "DRAFT", mode=CarePlanVersion.MODE_DRAFT)
+
+        body = self.client.post(self.url, {"patient_records_text": NOTES + "\nnew"}).json()
+
+        # The API's count is kept, but savings compare estimate with estimate
+        self.assertEqual((body["mode"], body["prompt_tokens"]), ("full", 10))
+        self.assertEqual(body["tokens_saved"], 0)
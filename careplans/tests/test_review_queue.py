@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import review
+from careplans.models import Order, Patient, Provider
+
+"""
+Review queue: flagged orders only, newest-first, keyset pagination
+that stays stable when several orders share a created_at timestamp.
+"""
+
+
+class TestReviewQueue(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.patient = Patient.objects.create(mrn="123456", first_name="Alice", last_name="Gray")
+        self.provider = Provider.objects.create(npi="1111111111", name="Dr House")
+        self.today = timezone.localdate()
+
+        self.flagged = [
+            self._order(f"Med {i}", is_possible_duplicate_order=(i % 2 == 0),
+                        duplicate_reason="" if i % 2 == 0 else "Patient MRN exists but name differs.")
+            for i in range(5)
+        ]
+        self._order("Clean Med", duplicate_reason="")
+
+        # Force timestamp ties so pagination must fall back to id ordering
+        Order.objects.update(created_at=timezone.now())
+
+    def _order(self, med, **flags):
+        return Order.objects.create(
+            patient=self.patient,
+            provider=self.provider,
+            medication_name=med,
+            order_date=self.today,
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text="Clinical notes...",
+            **flags,
+        )
+
+    def test_pages_cover_flagged_orders_once_newest_first(self):
+        seen = []
+        cursor = None
+        while True:
+            orders, cursor = review.get_review_page(cursor, limit=2)
+            seen.extend(o.pk for o in orders)
+            if cursor is None:
+                break
+
+        expected = sorted((o.pk for o in self.flagged), reverse=True)
+        self.assertEqual(seen, expected)
+
+    def test_page_defers_records_text_and_joins_related(self):
+        with self.assertNumQueries(1):
+            orders, _ = review.get_review_page(limit=10)
+            [(o.patient.mrn, o.provider.npi) for o in orders]
+        self.assertIn("patient_records_text", orders[0].get_deferred_fields())
+
+    def test_invalid_cursor_rejected(self):
+        with self.assertRaises(review.InvalidCursor):
+            review.get_review_page("not-a-cursor")
+
+    def test_flag_counts_served_from_cache(self):
+        counts = review.flag_counts()
+        self.assertEqual(counts["total"], 5)
+        self.assertEqual(counts["possible_duplicate"], 3)
+        self.assertEqual(counts["patient_name_mismatch"], 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(review.flag_counts(), counts)
+
+    def test_api_requires_staff(self):
+        url = reverse("review_queue_api")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        data = self.client.get(url, {"limit": 3}).json()
+        self.assertEqual(len(data["results"]), 3)
+        self.assertIsNotNone(data["next_cursor"])
+        self.assertEqual(data["counts"]["total"], 5)
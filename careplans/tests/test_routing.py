@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans.forms import OrderIntakeForm
+from careplans.models import CarePlan, CarePlanVersion, Order, Patient, Provider
+from careplans.routers import primary_only, replica_reads
+
+"""
+Two real SQLite databases stand in for primary and replica. Rows are written
+to only one of them, so which rows a read sees proves where it was routed.
+"""
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class TestReplicaRouting(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.payload = {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": "Clinical notes...",
+        }
+
+    def _flagged_order(self, using, mrn):
+        patient = Patient.objects.using(using).create(mrn=mrn, first_name="A", last_name="B")
+        provider = Provider.objects.using(using).create(npi=f"{mrn}0000", name="Dr X")
+        return Order.objects.using(using).create(
+            patient=patient, provider=provider, medication_name="IVIG",
+            order_date=timezone.localdate(), primary_diagnosis_icd10="G70.0",
+            patient_records_text="n", is_possible_duplicate_order=True,
+        )
+
+    def test_reads_default_to_primary(self):
+        Patient.objects.using("replica").create(mrn="999999", first_name="R", last_name="R")
+        self.assertEqual(Patient.objects.count(), 0)
+
+    def test_replica_context_reads_replica_and_writes_primary(self):
+        Patient.objects.using("replica").create(mrn="999999", first_name="R", last_name="R")
+        with replica_reads():
+            self.assertEqual(Patient.objects.count(), 1)
+            Patient.objects.create(mrn="111111", first_name="P", last_name="P")
+            with primary_only():
+                self.assertEqual(list(Patient.objects.values_list("mrn", flat=True)), ["111111"])
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_replica_context_without_replica_falls_back_to_primary(self):
+        Patient.objects.create(mrn="111111", first_name="P", last_name="P")
+        with replica_reads():
+            self.assertEqual(Patient.objects.count(), 1)
+
+    def test_intake_duplicate_check_stays_on_primary(self):
+        OrderIntakeForm(data=self.payload).save()  # exists on the primary only
+
+        with replica_reads():
+            form = OrderIntakeForm(data=self.payload)
+            self.assertFalse(form.is_valid())
+        self.assertIn("Duplicate order", str(form.errors))
+
+    @patch("careplans.views.generate_care_plan_from_llm", return_value=("PLAN", None, None))
+    def test_review_queue_reads_replica_until_session_writes(self, _llm):
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        url = reverse("review_queue_api")
+        self._flagged_order("replica", "555555")
+
+        def queue_mrns():
+            return [r["patient"]["mrn"] for r in self.client.get(url).json()["results"]]
+
+        self.assertEqual(queue_mrns(), ["555555"])
+
+        # A (flagged) write through intake pins this session to the primary
+        Provider.objects.create(npi="1111111111", name="Dr House")
+        self.client.post(reverse("intake"), {**self.payload, "provider_name": "Dr Other"})
+        self.assertEqual(queue_mrns(), ["123456"])
+
+        with override_settings(DATABASE_STICKY_WRITE_SECONDS=0):
+            session = self.client.session
+            session["_db_primary_until"] = 0
+            session.save()
+            self.assertEqual(queue_mrns(), ["555555"])
+
+    @patch("careplans.regeneration.generate_care_plan_from_llm", return_value=("REGENERATED PLAN", None, None))
+    def test_care_plan_reads_replica_until_session_regenerates(self, _llm):
+        cache.clear()
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        for using in ("default", "replica"):
+            order = self._flagged_order(using, "555555")
+            CarePlan.objects.using(using).create(order=order, generated_text=f"{using} plan", is_draft=True)
+            CarePlanVersion.objects.using(using).create(
+                order=order, version=1, generated_text=f"{using} plan", mode=CarePlanVersion.MODE_DRAFT
+            )
+        url = reverse("care_plan_fragment", args=[order.pk])
+
+        self.assertContains(self.client.get(url), "replica plan")
+
+        # v2 exists on the primary only; this session is pinned to it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("regenerate_care_plan", args=[order.pk]), {"patient_records_text": "Updated notes"})
+        response = self.client.get(url)
+        self.assertContains(response, "REGENERATED PLAN")
+        self.assertEqual(response["ETag"], f'"plan-{order.pk}-v2"')
@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import scheduler
+from careplans.models import Order
+
+
+class TestScheduler(SimpleTestCase):
+
+    def _enqueue(self, sched, priority, ran):
+        def work():
+            with sched.slot(priority):
+                ran.append(priority)
+
+        queued = sum(c["queued"] for c in sched.snapshot().values())
+        thread = threading.Thread(target=work)
+        thread.start()
+        # Wait until it is queued, so arrival order is deterministic
+        while sum(c["queued"] for c in sched.snapshot().values()) == queued:
+            time.sleep(0.001)
+        return thread
+
+    def test_urgent_order_overtakes_queued_backlog(self):
+        sched = scheduler.Scheduler(slots=1)
+        held = sched.acquire(scheduler.BACKLOG)
+        ran = []
+        threads = [self._enqueue(sched, scheduler.BACKLOG, ran) for _ in range(3)]
+        threads.append(self._enqueue(sched, scheduler.URGENT, ran))
+
+        sched.release(held)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(ran, [scheduler.URGENT] + [scheduler.BACKLOG] * 3)
+
+    def test_classes_share_slots_by_weight_while_both_queued(self):
+        sched = scheduler.Scheduler(slots=1)
+        held = sched.acquire(scheduler.STANDARD)
+        ran = []
+        threads = [self._enqueue(sched, scheduler.BACKLOG, ran) for _ in range(4)]
+        threads += [self._enqueue(sched, scheduler.STANDARD, ran) for _ in range(8)]
+
+        sched.release(held)
+        for thread in threads:
+            thread.join()
+
+        # Standard (weight 4) gets 4 turns per backlog turn, backlog is not starved
+        self.assertEqual(ran[:5].count(scheduler.BACKLOG), 1)
+        self.assertEqual(ran.count(scheduler.BACKLOG), 4)
+
+    def test_backlog_leaves_a_slot_for_live_orders(self):
+        sched = scheduler.Scheduler(slots=8)
+        live = sched.acquire(scheduler.STANDARD)
+        tickets = [sched.acquire(scheduler.BACKLOG) for _ in range(6)]
+        ran = []
+        waiting = self._enqueue(sched, scheduler.BACKLOG, ran)
+        self.assertEqual(sched.snapshot()[scheduler.BACKLOG]["running"], 6)
+
+        # The eighth slot is free for an urgent order at once
+        urgent = sched.acquire(scheduler.URGENT)
+        self.assertTrue(urgent.granted)
+
+        sched.release(urgent)
+        sched.release(live)
+        waiting.join()
+        self.assertEqual(ran, [scheduler.BACKLOG])
+        for ticket in tickets:
+            sched.release(ticket)
+
+    def test_idle_scheduler_gives_the_backlog_every_slot(self):
+        sched = scheduler.Scheduler(slots=4)
+        tickets = []
+        filling = threading.Thread(
+            target=lambda: tickets.extend(sched.acquire(scheduler.BACKLOG) for _ in range(4)), daemon=True
+        )
+        filling.start()
+        filling.join(5)
+
+        self.assertFalse(filling.is_alive())
+        self.assertEqual(sched.snapshot()[scheduler.BACKLOG]["running"], 4)
+        for ticket in tickets:
+            sched.release(ticket)
+
+    def test_missed_deadlines_are_counted(self):
+        classes = scheduler.priority_classes()
+        classes[scheduler.URGENT] = scheduler.PriorityClass(scheduler.URGENT, weight=8, deadline=0)
+        sched = scheduler.Scheduler(slots=1, classes=classes)
+
+        with self.assertLogs("careplans.scheduler", "WARNING"):
+            with sched.slot(scheduler.URGENT):
+                time.sleep(0.01)
+
+        stats = sched.snapshot()[scheduler.URGENT]
+        self.assertEqual((stats["completed"], stats["deadline_missed"]), (1, 1))
+
+
+@override_settings(SCHEDULER_BACKLOG_AGE_DAYS=7)
+class TestClassify(SimpleTestCase):
+
+    def _order(self, days_ago):
+        return Order(order_date=timezone.localdate() - timedelta(days=days_ago))
+
+    def test_priority_class_from_order_age_and_source(self):
+        self.assertEqual(scheduler.classify(self._order(0)), scheduler.URGENT)
+        self.assertEqual(scheduler.classify(self._order(3)), scheduler.STANDARD)
+        self.assertEqual(scheduler.classify(self._order(30)), scheduler.BACKLOG)
+        self.assertEqual(scheduler.classify(self._order(0), live=False), scheduler.BACKLOG)
+
+
+class TestIntakeScheduling(TestCase):
+
+    @patch("careplans.views.generate_care_plan_from_llm")
+    def test_backdated_intake_runs_in_backlog_class(self, mock_llm):
+        mock_llm.return_value = ("PLAN", None, None)
+        seen = []
+        real_slot = scheduler.generation_slot
+
+        def slot(order, live=True):
+            seen.append(scheduler.classify(order, live))
+            return real_slot(order, live)
+
+        with patch("careplans.scheduler.generation_slot", side_effect=slot):
+            self.client.post(reverse("intake"), {
+                "provider_name": "Dr House",
+                "provider_npi": "1111111111",
+                "patient_first_name": "Alice",
+                "patient_last_name": "Gray",
+                "patient_mrn": "123456",
+                "medication_name": "IVIG",
+                "order_date": timezone.localdate() - timedelta(days=30),
+                "primary_diagnosis_icd10": "G70.0",
+                "additional_diagnoses": "",
+                "medication_history": "",
+                "patient_records_text": "Clinical notes...",
+            })
+
+        self.assertEqual(seen, [scheduler.BACKLOG])
+        mock_llm.assert_called_once()
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans.models import CarePlan, Order, Patient, Provider
+from careplans.search import search_clinical_text
+
+"""
+Full-text search runs against the SQLite FTS5 fallback in tests; the index
+must follow inserts, updates and deletes without any app-level bookkeeping.
+"""
+
+
+class TestClinicalSearch(TestCase):
+
+    def setUp(self):
+        self.provider = Provider.objects.create(npi="1111111111", name="Dr House")
+        self.notes = self._order("111111", "IVIG", "Pre-infusion hydration before IVIG, 500 mL NS.")
+        self.other = self._order("222222", "Humira", "Injection site training completed.")
+        CarePlan.objects.create(
+            order=self.other,
+            generated_text="Interventions: ensure hydration before IVIG is considered later.",
+        )
+
+    def _order(self, mrn, med, notes):
+        patient = Patient.objects.create(mrn=mrn, first_name="A", last_name="B")
+        return Order.objects.create(
+            patient=patient,
+            provider=self.provider,
+            medication_name=med,
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text=notes,
+        )
+
+    def test_matches_notes_and_care_plans_with_highlights(self):
+        hits = search_clinical_text("hydration before IVIG")
+        self.assertEqual(
+            {(h.order_id, h.source) for h in hits},
+            {(self.notes.pk, "notes"), (self.other.pk, "care_plan")},
+        )
+        self.assertIn("<mark>hydration</mark>", hits[0].snippet)
+        self.assertTrue(all(h.order is not None for h in hits))
+
+    def test_index_follows_updates_and_deletes(self):
+        Order.objects.filter(pk=self.notes.pk).update(patient_records_text="Renal panel ordered.")
+        self.assertEqual([h.order_id for h in search_clinical_text("renal")], [self.notes.pk])
+        self.assertFalse([h for h in search_clinical_text("infusion") if h.source == "notes"])
+
+        CarePlan.objects.filter(order=self.other).delete()
+        self.assertEqual(search_clinical_text("hydration"), [])
+
+    def test_query_syntax_and_html_are_neutralised(self):
+        Order.objects.filter(pk=self.notes.pk).update(
+            patient_records_text="<script>alert(1)</script> hydration"
+        )
+        hits = search_clinical_text('hydration* ("^(')
+        self.assertEqual(len(hits), 2)
+        notes_hit = next(h for h in hits if h.source == "notes")
+        self.assertNotIn("<script>", notes_hit.snippet)
+
+    def test_search_page_requires_staff(self):
+        url = reverse("search_records")
+        self.assertEqual(self.client.get(url, {"q": "IVIG"}).status_code, 302)
+
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {"q": "IVIG"})
+        self.assertContains(response, "<mark>IVIG</mark>")
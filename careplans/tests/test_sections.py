@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import drafts, regeneration, sections
+from careplans.models import CarePlan, CarePlanVersion, Order, Patient, Provider
+
+LLM_PLAN = """Here is the care plan.
+
+### 1. Problem List / Drug Therapy Problems (DTPs)
+- **Infusion reaction risk** with IVIG
+- Renal impairment: creatinine
+  trending up since last infusion
+
+### 2. SMART Goals (Primary, Safety, and Process goals)
+1. Primary: improve ptosis within 4 weeks.
+2. Safety: no infusion reactions.
+
+### 3. Pharmacist Interventions (Dosing, Premeds, Titration, Hydration, Interactions)
+- Premedicate with acetaminophen and diphenhydramine.
+- Monitoring renal function before each dose; hydrate with 500 mL NS.
+
+### 4. Monitoring Plan & Lab Schedule
+- BUN and creatinine before each infusion.
+"""
+
+
+class TestSectionParser(TestCase):
+
+    def test_llm_plan_is_split_into_the_four_sections(self):
+        parsed = sections.parse(LLM_PLAN)
+
+        self.assertFalse(parsed.failed)
+        self.assertEqual(
+            parsed.sections["problems"],
+            ["Infusion reaction risk with IVIG", "Renal impairment: creatinine trending up since last infusion"],
+        )
+        self.assertEqual(len(parsed.sections["goals"]), 2)
+        # "Monitoring renal function" inside interventions doesn't open the monitoring section
+        self.assertEqual(len(parsed.sections["interventions"]), 2)
+        self.assertEqual(parsed.sections["monitoring"], ["BUN and creatinine before each infusion."])
+
+        terms = parsed.as_json()["terms"]
+        self.assertIn("renal", terms["interventions"])
+        self.assertNotIn("renal", terms["monitoring"])
+
+    def test_streamed_chunks_parse_the_same_as_whole_text(self):
+        parser = sections.SectionParser()
+        for i in range(0, len(LLM_PLAN), 7):
+            parser.feed(LLM_PLAN[i:i + 7])
+        self.assertEqual(parser.close().sections, sections.parse(LLM_PLAN).sections)
+
+    def test_rules_based_draft_parses(self):
+        draft = drafts.build_draft("IVIG", "G70.00", [], ["Prednisone"])
+        self.assertFalse(sections.parse(draft).failed)
+
+    def test_missing_headings_are_reported(self):
+        parsed = sections.parse("Problem List:\n- none.\nMonitor renal function.")
+        self.assertTrue(parsed.failed)
+        self.assertEqual(parsed.missing, ["goals", "interventions", "monitoring"])
+
+
+class TestStoredSections(TestCase):
+
+    def setUp(self):
+        patient = Patient.objects.create(mrn="123456", first_name="Alice", last_name="Gray")
+        provider = Provider.objects.create(name="Dr House", npi="1111111111")
+        self.order = Order.objects.create(
+            patient=patient,
+            provider=provider,
+            medication_name="IVIG",
+            order_date=timezone.localdate(),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text="Clinical notes...",
+        )
+
+    def test_saved_plans_store_sections_and_can_be_queried_by_term(self):
+        regeneration.save_care_plan(self.order, LLM_PLAN)
+
+        plan = CarePlan.objects.get()
+        self.assertFalse(plan.sections_parse_failed)
+        self.assertEqual(plan.sections["monitoring"], ["BUN and creatinine before each infusion."])
+        self.assertEqual(list(sections.plans_with_term("interventions", "Renal")), [plan])
+        self.assertFalse(sections.plans_with_term("monitoring", "renal").exists())
+        self.assertFalse(sections.plans_with_term("interventions", "ren").exists())
+
+    def test_unparseable_plan_is_flagged(self):
+        regeneration.save_care_plan(self.order, "Sorry, I can't help with that.")
+
+        plan = CarePlan.objects.get()
+        self.assertTrue(plan.sections_parse_failed)
+        self.assertEqual(plan.sections["problems"], [])
+
+    def test_backfill_command(self):
+        CarePlan.objects.create(order=self.order, generated_text=LLM_PLAN)
+
+        out = StringIO()
+        call_command("parse_care_plan_sections", stdout=out)
+
+        self.assertIn("Parsed 1 care plan(s); 0 failed", out.getvalue())
+        self.assertEqual(len(CarePlan.objects.get().sections["goals"]), 2)
+
+    @override_settings(LLM_BACKEND="stub")
+    @patch("careplans.regeneration.generate_care_plan_from_llm", return_value=(LLM_PLAN, None, None))
+    def test_regenerate_response_serves_parsed_sections(self, _llm):
+        staff = get_user_model().objects.create_user("pharm", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        regeneration.save_care_plan(self.order, "draft", mode=CarePlanVersion.MODE_DRAFT)
+
+        response = self.client.post(
+            reverse("regenerate_care_plan", args=[self.order.pk]),
+            {"patient_records_text": "Clinical notes...\nNew labs."},
+        )
+
+        data = response.json()
+        self.assertFalse(data["sections_parse_failed"])
+        self.assertEqual(data["sections"]["monitoring"], ["BUN and creatinine before each infusion."])
@@ -0,0 +1,135 @@
+import random
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from careplans import similarity
+from careplans.models import CarePlan, NoteBand, Order, Patient, Provider
+
+rng = random.Random(7)
+VOCAB = [f"word{n}" for n in range(3000)]
+CHART = "\n".join(" ".join(rng.choice(VOCAB) for _ in range(12)) for _ in range(40))
+
+
+class TestSignatures(TestCase):
+
+    def test_small_edit_scores_high_and_unrelated_low(self):
+        sig = similarity.signature(CHART)
+        edited = similarity.signature(CHART + "\nVitals 2025-03-01: BP 128/82 HR 74")
+        unrelated = similarity.signature(" ".join(rng.choice(VOCAB) for _ in range(480)))
+
+        self.assertEqual(similarity.similarity(sig, similarity.signature(CHART)), 1.0)
+        self.assertGreater(similarity.similarity(sig, edited), 0.9)
+        self.assertLess(similarity.similarity(sig, unrelated), 0.1)
+
+    def test_short_notes_still_get_full_signatures(self):
+        self.assertEqual(len(similarity.signature("Clinical notes")), similarity.SLOTS * 4)
+
+
+class TestNearDuplicateLookup(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(mrn="123456", first_name="Alice", last_name="Gray")
+        self.provider = Provider.objects.create(npi="1111111111", name="Dr House")
+
+    def _order(self, text, patient=None, days_ago=30):
+        order = Order.objects.create(
+            patient=patient or self.patient,
+            provider=self.provider,
+            medication_name="IVIG",
+            order_date=timezone.localdate() - timezone.timedelta(days=days_ago),
+            primary_diagnosis_icd10="G70.0",
+            patient_records_text=text,
+        )
+        similarity.index_order(order)
+        return order
+
+    def test_finds_prior_order_for_same_patient_only(self):
+        prior = self._order(CHART)
+        other = Patient.objects.create(mrn="654321", first_name="B", last_name="C")
+        self._order(CHART, patient=other)
+
+        matches = similarity.find_similar_orders(CHART + "\nNew vitals line", patient_id=self.patient.pk)
+
+        self.assertEqual([m.order for m in matches], [prior])
+        self.assertEqual(NoteBand.objects.filter(order=prior).count(), similarity.BANDS)
+
+    def test_backfill_indexes_unsigned_orders(self):
+        order = self._order(CHART)
+        Order.objects.filter(pk=order.pk).update(records_signature=None)
+        NoteBand.objects.all().delete()
+
+        self.assertEqual(similarity.index_orders(Order.objects.all()), 1)
+        self.assertTrue(similarity.find_similar_orders(CHART))
+
+    def _payload(self, **fields):
+        return {
+            "provider_name": "Dr House",
+            "provider_npi": "1111111111",
+            "patient_first_name": "Alice",
+            "patient_last_name": "Gray",
+            "patient_mrn": "123456",
+            "medication_name": "IVIG",
+            "order_date": timezone.localdate(),
+            "primary_diagnosis_icd10": "G70.0",
+            "additional_diagnoses": "",
+            "medication_history": "",
+            "patient_records_text": CHART,
+            **fields,
+        }
+
+    @patch("careplans.views.generate_care_plan_from_llm")
+    @patch("careplans.regeneration.update_care_plan_from_llm", return_value=("UPDATED", None, None))
+    def test_intake_updates_plan_of_near_duplicate_chart(self, update, generate):
+        prior = self._order(CHART)
+        CarePlan.objects.create(order=prior, generated_text="PRIOR PLAN")
+        payload = self._payload(patient_records_text=CHART + "\nVitals 2025-03-01: BP 128/82")
+
+        response = self.client.post(reverse("intake"), payload, follow=True)
+
+        self.assertFalse(generate.called)
+        update.assert_called_once_with("PRIOR PLAN", "Added:\nVitals 2025-03-01: BP 128/82", "IVIG")
+        self.assertEqual(response.context["plan_text"], "UPDATED")
+        version = Order.objects.latest("id").care_plan_versions.first()
+        self.assertEqual((version.mode, version.source_order), ("incremental", prior))
+
+    @patch("careplans.views.generate_care_plan_from_llm")
+    @patch("careplans.regeneration.update_care_plan_from_llm")
+    def test_identical_chart_and_fields_copy_the_plan(self, update, generate):
+        prior = self._order(CHART)
+        CarePlan.objects.create(order=prior, generated_text="PRIOR PLAN")
+
+        response = self.client.post(reverse("intake"), self._payload(), follow=True)
+
+        self.assertFalse(generate.called)
+        self.assertFalse(update.called)
+        self.assertEqual(response.context["plan_text"], "PRIOR PLAN")
+        version = Order.objects.latest("id").care_plan_versions.first()
+        self.assertEqual((version.mode, version.source_order), ("reused", prior))
+
+    @patch("careplans.views.generate_care_plan_from_llm")
+    @patch("careplans.regeneration.update_care_plan_from_llm", return_value=("UPDATED", None, None))
+    def test_identical_chart_with_changed_fields_is_not_copied(self, update, generate):
+        prior = self._order(CHART)
+        CarePlan.objects.create(order=prior, generated_text="PRIOR PLAN")
+        payload = self._payload(
+            primary_diagnosis_icd10="G70.01",
+            additional_diagnoses="I10",
+            medication_history="Prednisone 10mg",
+        )
+
+        response = self.client.post(reverse("intake"), payload, follow=True)
+
+        self.assertFalse(generate.called)
+        update.assert_called_once_with(
+            "PRIOR PLAN",
+            "Changed fields:\n"
+            "Primary diagnosis: G70.01 (was G70.0)\n"
+            "Additional diagnoses: I10 (was none)\n"
+            "Medication history: Prednisone 10mg (was none)",
+            "IVIG",
+        )
+        self.assertEqual(response.context["plan_text"], "UPDATED")
+        self.assertEqual(Order.objects.latest("id").care_plan_versions.first().mode, "incremental")
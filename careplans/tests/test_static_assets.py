@@ -0,0 +1,101 @@
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from careplans import assets
+
+COMPRESSED_MANIFEST = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
+
+class TestStaticAssets(TestCase):
+
+    def test_pages_load_no_third_party_assets(self):
+        self.client.force_login(get_user_model().objects.create_user("pharm", is_staff=True))
+        for name in ("intake", "review_queue", "search_records"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                self.assertNotContains(response, "cdn.jsdelivr.net")
+                self.assertContains(response, '<link href="/static/careplans/css/careplans.css" rel="stylesheet">')
+
+    def test_every_vendored_file_is_committed(self):
+        self.assertEqual(assets.missing_assets(), [])
+        self.assertEqual(assets.check_vendor_assets(None), [])
+
+    def test_committed_bundle_matches_its_pin(self):
+        js = assets.get_asset("careplans/vendor/bootstrap/bootstrap.bundle.min.js")
+        content = js.file.read_bytes()
+        # Vendored with the trailing sourceMappingURL comment dropped
+        self.assertEqual(assets.sri_hash(content[:-1] + b"\n//# sourceMappingURL=bootstrap.bundle.min.js.map"), js.integrity)
+
+    def test_intake_script_is_a_static_file(self):
+        response = self.client.get(reverse("intake"))
+        self.assertContains(response, '<script src="/static/careplans/js/intake.js">')
+        self.assertNotContains(response, "pageshow")
+
+    def test_collected_files_are_precompressed_and_served_immutable(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root, STORAGES=COMPRESSED_MANIFEST, WHITENOISE_AUTOREFRESH=False
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name("careplans/js/intake.js")
+            self.assertNotEqual(hashed, "careplans/js/intake.js")
+            self.assertTrue((Path(root) / f"{hashed}.gz").exists())
+            self.assertTrue((Path(root) / f"{hashed}.br").exists())
+
+            response = self.client.get(f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertIn("Accept-Encoding", response["Vary"])
+            self.assertIn("immutable", response["Cache-Control"])
+
+            # Unhashed names may change content, so they get a short max-age
+            response = self.client.get("/static/careplans/js/intake.js")
+            self.assertNotIn("immutable", response["Cache-Control"])
+
+            # With DEBUG off every page renders from the manifest, vendored or not
+            with override_settings(DEBUG=False):
+                self.assertEqual(self.client.get(reverse("intake")).status_code, 200)
+
+
+class TestVendorAssets(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch("careplans.assets.STATIC_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("careplans.assets.urllib.request.urlopen")
+    def test_fetched_file_is_verified_and_source_map_dropped(self, urlopen):
+        content = b"body{color:red}\n/*# sourceMappingURL=bootstrap.min.css.map */"
+        urlopen.return_value = BytesIO(content)
+        asset = assets.VendorAsset("careplans/vendor/x.css", "https://example.test/x.css", assets.sri_hash(content))
+
+        assets.fetch(asset)
+
+        self.assertEqual(asset.file.read_bytes(), b"body{color:red}\n")
+
+    @patch("careplans.assets.urllib.request.urlopen")
+    def test_tampered_file_is_rejected(self, urlopen):
+        urlopen.return_value = BytesIO(b"alert(1)")
+        asset = assets.VENDOR_ASSETS[0]
+
+        with self.assertRaises(assets.VendorError):
+            assets.fetch(asset)
+        self.assertFalse(asset.file.exists())
+
+    def test_missing_files_are_system_check_errors(self):
+        errors = assets.check_vendor_assets(None)
+        self.assertEqual([e.id for e in errors], ["careplans.E002"] * len(assets.VENDOR_ASSETS))
+        self.assertTrue(all(e.is_serious() for e in errors))
@@ -1,6 +1,22 @@
 from django.urls import path
-from .views import intake_order
+from .views import (
+    intake_order,
+    review_queue,
+    review_queue_api,
+    search_records,
+    export_orders,
+    regenerate_care_plan,
+    care_plan_fragment,
+    admission_metrics,
+)
 
 urlpatterns = [
     path("intake/", intake_order, name="intake"),
+    path("review/", review_queue, name="review_queue"),
+    path("api/review/", review_queue_api, name="review_queue_api"),
+    path("search/", search_records, name="search_records"),
+    path("export/orders/", export_orders, name="export_orders"),
+    path("orders/<int:order_id>/regenerate/", regenerate_care_plan, name="regenerate_care_plan"),
+    path("orders/<int:order_id>/care-plan/", care_plan_fragment, name="care_plan_fragment"),
+    path("metrics/admission/", admission_metrics, name="admission_metrics"),
 ]
@@ -1,53 +1,314 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.cache import never_cache
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import IntegrityError
 
-from .forms import OrderIntakeForm
+from .forms import DUPLICATE_ORDER, OrderIntakeForm, ExportFilterForm, RegenerateCarePlanForm
 from .services import generate_care_plan_from_llm
-from .models import CarePlan
+from .models import CarePlanVersion, Order
+from . import admission, drafts, exports, idempotency, pdfs, plan_cache, profiling, regeneration, review, scheduler
+from .routers import replica_reads
+from .search import search_clinical_text
+
+SUBMISSION_IN_PROGRESS = "This submission is already being processed. Please wait before resubmitting."
+SUBMISSION_KEY_REUSED = (
+    "This submission key was already used for a different submission. "
+    "Reload the form and submit again."
+)
+
+
+def _submit_order(form, defer=False):
+    """
+    Save a valid intake and generate its care plan. Returns (order, session messages).
+    With `defer` (admission control under load), or notes uploaded as a PDF
+    (read by generate_deferred_plans, off the request), only the draft is saved.
+    """
+    with profiling.stage("save"):
+        order = form.save()
+    outcome = {}
+    notes_pending = bool(order.notes_pdf)
+
+    # Rules-based draft first: it is the plan on record until the LLM's arrives
+    with profiling.stage("draft"):
+        draft_text = drafts.render_draft(order)
+        regeneration.save_care_plan(
+            order, draft_text, deferred=defer or notes_pending, mode=CarePlanVersion.MODE_DRAFT
+        )
+
+    if defer or notes_pending:
+        outcome["plan_text"] = draft_text
+        outcome["plan_is_draft"] = True
+        outcome["plan_queued"] = pdfs.NOTES_QUEUED if notes_pending else admission.PLAN_QUEUED
+        return order, _flag_outcome(order, outcome)
+
+    # Same chart pasted again for a new order: reuse/update that order's plan
+    with profiling.stage("reuse"):
+        reused = regeneration.reuse_similar_plan(order)
+    if reused is not None:
+        outcome["plan_text"] = reused.generated_text
+        return order, _flag_outcome(order, outcome)
+
+    # LLM generation, queued behind higher-priority orders if slots are full
+    with profiling.stage("queue"), scheduler.generation_slot(order), profiling.stage("llm"):
+        plan_text, error_msg, usage = generate_care_plan_from_llm(
+            order.patient_records_text,
+            order.medication_name,
+        )
+
+    if plan_text:
+        baseline = regeneration.full_prompt_tokens(order.patient_records_text, order.medication_name)
+        with profiling.stage("save_plan"):
+            regeneration.save_care_plan(
+                order, plan_text, usage, prompt_tokens=baseline, full_prompt_tokens=baseline
+            )
+        outcome["plan_text"] = plan_text
+    else:
+        outcome["llm_error"] = error_msg
+        outcome["plan_text"] = draft_text
+        outcome["plan_is_draft"] = True
+
+    return order, _flag_outcome(order, outcome)
+
+
+def _flag_outcome(order, outcome):
+    # Flags
+    if order.duplicate_reason:
+        outcome["integrity_warning"] = order.duplicate_reason
+
+    if order.is_possible_duplicate_order or order.duplicate_reason:
+        review.invalidate_flag_counts()
+
+    return outcome
+
+
+def _intake_context(request):
+    return {
+        "form": OrderIntakeForm(),
+        "idempotency_key": idempotency.new_key(),
+        "plan_text": request.session.pop("plan_text", None),
+        "plan_is_draft": request.session.pop("plan_is_draft", False),
+        "integrity_error": request.session.pop("integrity_error", None),
+        "integrity_warning": request.session.pop("integrity_warning", None),
+        "llm_error": request.session.pop("llm_error", None),
+        "plan_queued": request.session.pop("plan_queued", None),
+    }
+
 
 @never_cache
 def intake_order(request):
 
     # ===== POST =====
     if request.method == "POST":
-        form = OrderIntakeForm(request.POST)
+        idem_key = idempotency.key_from_request(request)
+        if idem_key:
+            fingerprint = idempotency.fingerprint(request)
+            previous = idempotency.lookup(idem_key)
+            if previous is not None or not idempotency.claim(idem_key, fingerprint):
+                # Lost a race for the claim: look at the winner's record
+                previous = previous or idempotency.lookup(idem_key)
+                if previous is not None and previous.fingerprint != fingerprint:
+                    # Never replay (or block on) a different submission under a reused key
+                    context = {**_intake_context(request), "integrity_error": [SUBMISSION_KEY_REUSED]}
+                    return render(request, "careplans/intake.html", context, status=422)
+                if previous is not None and previous.result is not None:
+                    # Retry / double-click: replay the original outcome
+                    request.session.update(idempotency.replay(previous))
+                else:
+                    request.session["integrity_error"] = [SUBMISSION_IN_PROGRESS]
+                return redirect("intake")
+
+        form = OrderIntakeForm(request.POST, request.FILES)
 
-        if not form.is_valid():
+        with profiling.stage("clean"):
+            valid = form.is_valid()
+        if not valid:
+            idempotency.release(idem_key)
             # Store errors only (NO PHI)
             request.session["integrity_error"] = form.non_field_errors()
             return redirect("intake")
 
         # ----- VALID -----
-        order = form.save()
+        try:
+            defer = getattr(request, "admission", admission.ACCEPT) == admission.DEFER
+            order, outcome = _submit_order(form, defer=defer)
+        except IntegrityError:
+            # A duplicate saved (or archived) after clean() checked: the
+            # unique constraint or save()'s archive re-check caught it
+            idempotency.release(idem_key)
+            request.session["integrity_error"] = [DUPLICATE_ORDER]
+            return redirect("intake")
+        except Exception:
+            idempotency.release(idem_key)
+            raise
 
-        # LLM generation
-        plan_text, error_msg = generate_care_plan_from_llm(
-            order.patient_records_text,
-            order.medication_name,
+        # The plan itself is replayed from the (possibly since replaced) CarePlan row
+        idempotency.record(
+            idem_key,
+            order,
+            {k: v for k, v in outcome.items() if k not in ("plan_text", "plan_is_draft", "plan_queued")},
         )
+        request.session.update(outcome)
+        return redirect("intake")
 
-        if plan_text:
-            CarePlan.objects.create(order=order, generated_text=plan_text)
-            request.session["plan_text"] = plan_text
-        else:
-            request.session["llm_error"] = error_msg
+    # ===== GET =====
+    context = _intake_context(request)
+    # Creates the session (and its cookie) that scopes this form's key
+    idempotency.session_scope(request)
 
-        # Flags
-        if order.duplicate_reason:
-            request.session["integrity_warning"] = order.duplicate_reason
+    with profiling.stage("render"):
+        return render(request, "careplans/intake.html", context)
 
-        return redirect("intake")
 
-    # ===== GET =====
-    form = OrderIntakeForm()
+def _review_page(request):
+    try:
+        limit = int(request.GET.get("limit", review.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = review.DEFAULT_PAGE_SIZE
+    return review.get_review_page(request.GET.get("cursor"), limit)
+
+
+@never_cache
+@staff_member_required
+@require_GET
+@replica_reads()
+def review_queue(request):
+    try:
+        orders, next_cursor = _review_page(request)
+    except review.InvalidCursor as e:
+        return HttpResponseBadRequest(str(e))
 
     context = {
-        "form": form,
-        "plan_text": request.session.pop("plan_text", None),
-        "integrity_error": request.session.pop("integrity_error", None),
-        "integrity_warning": request.session.pop("integrity_warning", None),
-        "llm_error": request.session.pop("llm_error", None),
+        "orders": orders,
+        "next_cursor": next_cursor,
+        "counts": review.flag_counts(),
     }
+    return render(request, "careplans/review_queue.html", context)
+
+
+@never_cache
+@staff_member_required
+@require_GET
+@replica_reads()
+def review_queue_api(request):
+    try:
+        orders, next_cursor = _review_page(request)
+    except review.InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "results": [review.serialize_order(o) for o in orders],
+        "next_cursor": next_cursor,
+        "counts": review.flag_counts(),
+    })
+
+
+@never_cache
+@staff_member_required
+@require_GET
+@replica_reads()
+def search_records(request):
+    query = request.GET.get("q", "").strip()
+    hits = search_clinical_text(query) if query else []
+    return render(request, "careplans/search.html", {"query": query, "hits": hits})
+
+
+@never_cache
+@staff_member_required
+@require_GET
+@replica_reads()
+def export_orders(request):
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    cd = form.cleaned_data
+    qs = exports.export_queryset(cd["start"], cd["end"], cd["flag"])
+    # Bind the alias now: the stream is consumed after this view (and its
+    # replica_reads context) has returned
+    qs = qs.using(qs.db)
+    stream = exports.export_stream(exports.iter_rows(qs), cd["format"], cd["gzip"])
 
-    return render(request, "careplans/intake.html", context)
+    content_type = "application/gzip" if cd["gzip"] else exports.FORMATS[cd["format"]][0]
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    filename = exports.export_filename(cd["format"], cd["gzip"])
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@never_cache
+@staff_member_required
+@require_POST
+def regenerate_care_plan(request, order_id):
+    order = get_object_or_404(Order, pk=order_id)
+    form = RegenerateCarePlanForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    version, error = regeneration.regenerate(order, form.cleaned_data["patient_records_text"])
+    if version is None:
+        status = 400 if error == regeneration.NO_CHANGES else 502
+        return JsonResponse({"error": error}, status=status)
+
+    return JsonResponse({
+        "order_id": order.pk,
+        "version": version.version,
+        "mode": version.mode,
+        "plan_text": version.generated_text,
+        "sections": order.care_plan.sections,
+        "sections_parse_failed": order.care_plan.sections_parse_failed,
+        "prompt_tokens": version.prompt_tokens,
+        "full_prompt_tokens": version.full_prompt_tokens,
+        "tokens_saved": version.tokens_saved,
+    })
+
+
+def _plan_state(request, order_id):
+    # condition() asks for the ETag and Last-Modified separately; look up once
+    if not hasattr(request, "_plan_state"):
+        request._plan_state = plan_cache.plan_state(order_id)
+    return request._plan_state
+
+
+def _plan_etag(request, order_id):
+    state = _plan_state(request, order_id)
+    return state.etag if state else None
+
+
+def _plan_last_modified(request, order_id):
+    state = _plan_state(request, order_id)
+    return state.modified if state else None
+
+
+# PHI: never stored by browsers or proxies (never_cache), but polling
+# clients can revalidate with If-None-Match / If-Modified-Since and get a
+# 304 from the cached plan state, before any care plan query or rendering.
+# Plans render from the replica; a session that just regenerated a plan is
+# pinned to the primary (ReplicaStickinessMiddleware), so it sees its own.
+@never_cache
+@staff_member_required
+@require_GET
+@replica_reads()
+@condition(etag_func=_plan_etag, last_modified_func=_plan_last_modified)
+def care_plan_fragment(request, order_id):
+    state = _plan_state(request, order_id)
+    if state is not None:
+        html, state = plan_cache.render_fragment(order_id, state)
+    if state is None:
+        raise Http404("No care plan for this order.")
+    response = HttpResponse(html)
+    # Set here (condition() only fills in missing headers) in case the
+    # cached state was behind the plan just rendered
+    response["ETag"] = quote_etag(state.etag)
+    response["Last-Modified"] = http_date(state.modified.timestamp())
+    return response
+
+
+@never_cache
+@staff_member_required
+@require_GET
+def admission_metrics(request):
+    return JsonResponse(admission.metrics())
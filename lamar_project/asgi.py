@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lamar_project.settings")
 
 application = get_asgi_application()
+
+# Map the ICD-10-CM index as the worker boots: a missing index (see
+# `manage.py build_icd10_index`) fails the deploy instead of an intake
+from careplans import icd10  # noqa: E402
+
+icd10.get_index()
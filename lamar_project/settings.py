@@ -24,9 +24,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "true").lower() == "true"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get("ALLOWED_HOSTS", "").split(",") if host]
 
 
 # Application definition
@@ -43,10 +43,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Static files are answered here, before sessions, auth or the database
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "careplans.middleware.AdmissionControlMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "careplans.middleware.ProfilingMiddleware",
+    "careplans.middleware.ReplicaStickinessMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -74,15 +79,58 @@ WSGI_APPLICATION = "lamar_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+import importlib.util
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+# Connection reuse. Either persistent connections (DB_CONN_MAX_AGE seconds,
+# health-checked before reuse) or, with DB_POOL=true, psycopg 3's native pool
+# (psycopg[binary,pool] in requirements.txt; Django forbids combining both).
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+DB_CONN_HEALTH_CHECKS = os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+DB_POOL = os.environ.get("DB_POOL", "false").lower() == "true"
+DB_POOL_OPTIONS = {
+    "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+    "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+    "timeout": int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+}
 
-DATABASES = {
-    "default": dj_database_url.config(
-        default=os.environ.get("DATABASE_URL")
+
+def _database_config(url):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
+    if DB_POOL and config["ENGINE"] == "django.db.backends.postgresql":
+        # Fail here, not at the first connect, if the pool isn't installed
+        # (psycopg2 has no native pool)
+        if importlib.util.find_spec("psycopg_pool") is None:
+            raise ImproperlyConfigured(
+                'DB_POOL=true needs psycopg 3 with its pool: pip install "psycopg[binary,pool]"'
+            )
+        config["CONN_MAX_AGE"] = 0
+        config["CONN_HEALTH_CHECKS"] = False  # the pool checks connections itself
+        config.setdefault("OPTIONS", {})["pool"] = dict(DB_POOL_OPTIONS)
+    return config
+
+
+DATABASES = {
+    "default": _database_config(os.environ["DATABASE_URL"]) if os.environ.get("DATABASE_URL") else {}
 }
 
+# Optional read replica for review/export/search/care plan traffic (see careplans/routers.py)
+DATABASE_REPLICA_ALIAS = None
+if os.environ.get("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = _database_config(os.environ["DATABASE_REPLICA_URL"])
+    DATABASE_REPLICA_ALIAS = "replica"
+
+DATABASE_ROUTERS = ["careplans.routers.PrimaryReplicaRouter"]
+
+# After a session writes, its reads stay on the primary this long (replication lag)
+DATABASE_STICKY_WRITE_SECONDS = int(os.environ.get("DATABASE_STICKY_WRITE_SECONDS", "5"))
+
 
 
 # Password validation
@@ -120,6 +168,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = "static/"
+# `manage.py collectstatic` output. Hashed names + precompressed .gz/.br
+# copies (careplans/assets.py); WhiteNoise serves the hashed ones as immutable
+STATIC_ROOT = Path(os.environ.get("STATIC_ROOT", BASE_DIR / "staticfiles"))
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -128,6 +184,137 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# "openai", "openai-async", "stub" (offline canned plans) or a dotted class path
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai")
+# Attempts per generation; transient errors back off LLM_RETRY_BACKOFF * 2^n seconds.
+# The only retry policy: the OpenAI SDK's own retries are turned off.
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "2"))
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", "0.5"))
+# Seconds per attempt, and for the whole generation including retries and
+# backoff; no retry is started with less than LLM_MIN_ATTEMPT_TIMEOUT left
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "15"))
+LLM_TOTAL_TIMEOUT = float(os.environ.get("LLM_TOTAL_TIMEOUT", "30"))
+LLM_MIN_ATTEMPT_TIMEOUT = float(os.environ.get("LLM_MIN_ATTEMPT_TIMEOUT", "5"))
+# USD per million tokens, by model name prefix, for `manage.py llm_report`
+LLM_PRICES = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+}
+
+# Compiled ICD-10-CM code index (memory-mapped), built from careplans/data at
+# deploy time with `manage.py build_icd10_index`; point it anywhere writable
+ICD10_INDEX_PATH = Path(os.environ.get("ICD10_INDEX_PATH", BASE_DIR / "var" / "icd10cm.idx"))
+
+# Estimated Jaccard similarity (word 3-shingles) at which an earlier order's
+# notes count as the same chart and its care plan is reused
+NOTE_SIMILARITY_THRESHOLD = float(os.environ.get("NOTE_SIMILARITY_THRESHOLD", "0.9"))
+
+# Pin a prompt template to a version, e.g. {"care_plan": 2}; unpinned
+# templates use the latest registered version (see careplans/prompts.py)
+PROMPT_VERSIONS = {}
+
+# How long an intake idempotency key replays its original result (seconds)
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", str(24 * 60 * 60)))
+# How long an in-flight submission holds its key before a retry may take it
+# over (a crashed worker never records a result); keep above the slowest intake
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "120"))
+
+# LLM generation slots per process, shared by weighted fair queueing between
+# urgent (same-day), standard and backlog orders (see careplans/scheduler.py)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+# Orders dated more than this many days back are generated as backlog
+SCHEDULER_BACKLOG_AGE_DAYS = int(os.environ.get("SCHEDULER_BACKLOG_AGE_DAYS", "7"))
+# Most of the slots backlog generations may hold while live orders are
+# running or waiting (all of them when the scheduler is otherwise idle)
+SCHEDULER_BACKLOG_SHARE = float(os.environ.get("SCHEDULER_BACKLOG_SHARE", "0.75"))
+
+# Intake admission control (careplans/admission.py): defer LLM generation
+# when this process has ADMISSION_DEFER_QUEUED generations waiting for a slot
+# or ADMISSION_DEFER_IN_FLIGHT are running/queued across all processes (all
+# processes sharing CACHE_URL; without one, this process alone);
+# answer 503 only when ADMISSION_REJECT_DEFERRED plans are already deferred
+# or ADMISSION_REJECT_ACTIVE_REQUESTS intake POSTs are in progress here
+ADMISSION_DEFER_QUEUED = int(os.environ.get("ADMISSION_DEFER_QUEUED", "2"))
+ADMISSION_DEFER_IN_FLIGHT = int(os.environ.get("ADMISSION_DEFER_IN_FLIGHT", "16"))
+ADMISSION_REJECT_DEFERRED = int(os.environ.get("ADMISSION_REJECT_DEFERRED", "1000"))
+ADMISSION_REJECT_ACTIVE_REQUESTS = int(os.environ.get("ADMISSION_REJECT_ACTIVE_REQUESTS", "32"))
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "30"))
+# Lifetime of the cross-process in-flight counters (bounds drift from killed workers)
+ADMISSION_COUNTER_TTL = int(os.environ.get("ADMISSION_COUNTER_TTL", "600"))
+
+# Opt-in request profiling (careplans/profiling.py): PHI-scrubbed captures are
+# written here for staff requests sent with `X-Profile: 1`, plus a random
+# PROFILING_SAMPLE_RATE fraction of all requests. Empty disables profiling.
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "")
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+
+# Orders dated more than this many days back may be moved to the archive
+# table by `manage.py archive_orders` (careplans/archive.py)
+ORDER_RETENTION_DAYS = int(os.environ.get("ORDER_RETENTION_DAYS", str(3 * 365)))
+
+# Clinical notes uploaded as PDF (careplans/pdfs.py). Uploads are streamed
+# to temporary files, never held in memory, then kept in PDF_PENDING_DIR
+# until `manage.py generate_deferred_plans` extracts them, off the request.
+# Text is extracted in a pool of PDF_WORKERS processes per upload (0 = in
+# the calling thread), PDF_PAGES_PER_TASK pages per task
+FILE_UPLOAD_HANDLERS = ["careplans.pdfs.BoundedTemporaryFileUploadHandler"]
+PDF_PENDING_DIR = Path(os.environ.get("PDF_PENDING_DIR", BASE_DIR / "var" / "pdf_pending"))
+PDF_MAX_UPLOAD_BYTES = int(os.environ.get("PDF_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "2000"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "32"))
+# Give up on one upload's extraction after this many seconds (its pool's
+# workers are killed; other uploads' extractions carry on)
+PDF_EXTRACT_TIMEOUT = float(os.environ.get("PDF_EXTRACT_TIMEOUT", "120"))
+
+# Shared cache (CACHE_URL): redis://host:6379/0, rediss://..., or
+# memcached://host:11211. It holds the admission/scheduler in-flight counters,
+# which only add up across processes when every worker shares one cache; the
+# per-process default is fine for a single process (runserver, one worker).
+_CACHE_BACKENDS = {
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis"),
+    "rediss": ("django.core.cache.backends.redis.RedisCache", "redis"),
+    "memcached": ("django.core.cache.backends.memcached.PyMemcacheCache", "pymemcache"),
+}
+
+
+def _cache_config(url):
+    scheme = url.split("://", 1)[0]
+    if scheme not in _CACHE_BACKENDS:
+        raise ImproperlyConfigured(f"CACHE_URL scheme must be one of {sorted(_CACHE_BACKENDS)}, got {scheme!r}")
+    backend, module = _CACHE_BACKENDS[scheme]
+    if importlib.util.find_spec(module) is None:
+        raise ImproperlyConfigured(f"CACHE_URL={scheme}://... needs the {module} package: pip install {module}")
+    return {
+        "BACKEND": backend,
+        "LOCATION": url.split("://", 1)[1] if scheme == "memcached" else url,
+        "KEY_PREFIX": "careplans",
+    }
+
+
+CACHES = {
+    "default": (
+        _cache_config(os.environ["CACHE_URL"])
+        if os.environ.get("CACHE_URL")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+    # Extracted PDF pages, kept apart so a long packet can't evict the
+    # admission/review counters; roughly 4 KB of text per entry
+    "pdf_pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pdf-pages",
+        "TIMEOUT": int(os.environ.get("PDF_PAGE_CACHE_TTL", str(7 * 24 * 60 * 60))),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("PDF_PAGE_CACHE_ENTRIES", "10000"))},
+    },
+}
+
+# Care plan re-fetch endpoint (careplans/plan_cache.py): how long a cached
+# plan version/ETag is trusted before re-reading it (bounds staleness across
+# processes with a per-process cache), and how long rendered plans are kept
+CARE_PLAN_STATE_TTL = int(os.environ.get("CARE_PLAN_STATE_TTL", "10"))
+CARE_PLAN_FRAGMENT_TTL = int(os.environ.get("CARE_PLAN_FRAGMENT_TTL", str(24 * 60 * 60)))
+
+# Pharmacist review queue: how long the per-flag counts may be served from cache
+REVIEW_QUEUE_COUNTS_TTL = int(os.environ.get("REVIEW_QUEUE_COUNTS_TTL", "60"))
 
 
 import sys
@@ -138,6 +325,21 @@ if 'test' in sys.argv:
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
     }
+    # Separate database so routing tests can tell primary and replica apart;
+    # routing to it is switched on per test via DATABASE_REPLICA_ALIAS.
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+    DATABASE_REPLICA_ALIAS = None
+    # No collectstatic before tests: no manifest of hashed names, and no
+    # STATIC_ROOT for WhiteNoise to index at startup
+    STORAGES["staticfiles"] = {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}
+    WHITENOISE_AUTOREFRESH = True
+    # Built by the test runner, away from a deployment's index
+    TEST_RUNNER = "careplans.tests.runner.TestRunner"
+    ICD10_INDEX_PATH = BASE_DIR / "var" / "test" / "icd10cm.idx"
+    PDF_PENDING_DIR = BASE_DIR / "var" / "test" / "pdf_pending"
 
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True